@@ -0,0 +1,101 @@
+# LLM/analysis_cache.py
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from LLM.gemini_nlp import prompt_version
+from utils.bulk_load import begin, in_chunks, upsert_bulk
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(description, version, model_name):
+    """Hash of a description (whitespace normalized), prompt version and model name."""
+    normalized = ' '.join((description or "").split())
+    return hashlib.sha1(f"{normalized}\0{version}\0{model_name}".encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """LLM analyses of job descriptions, cached in the database by content.
+
+    Entries are keyed by `cache_key`, so the same description cross-posted or
+    scraped again is only analyzed once per prompt version and model, and a
+    change to the prompts or JOB_CATEGORIES misses the older entries.
+    `stats` counts hits, misses and stored analyses.
+    """
+
+    def __init__(self, engine, model_name, table='llm_analysis_cache', version=None):
+        self.engine = engine
+        self.model_name = model_name
+        self.table = table
+        self.version = version or prompt_version()
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+        self._lock = threading.Lock()
+
+    def _lookup(self, keys):
+        if not keys or not inspect(self.engine).has_table(self.table):
+            return {}
+        found = {}
+        query = f'SELECT "Key", "Analysis" FROM {self.table} WHERE "Key" IN :keys'
+        with self.engine.connect() as conn:
+            for statement, params in in_chunks(query, 'keys', keys):
+                found.update((row[0], json.loads(row[1])) for row in conn.execute(statement, params))
+        return found
+
+    def store(self, analyses):
+        """Save analyses given as a {key: analysis} dict."""
+        if not analyses:
+            return
+        df = pd.DataFrame({'Key': list(analyses),
+                           'Analysis': [json.dumps(a, ensure_ascii=False) for a in analyses.values()]})
+        df['PromptVersion'] = self.version
+        df['Model'] = self.model_name
+        df['Created'] = datetime.now()
+        with begin(self.engine) as conn:
+            upsert_bulk(df, self.table, conn, key='Key')
+        with self._lock:
+            self.stats['stored'] += len(df)
+
+    def analyze(self, postings, analyze_missing):
+        """Return the analysis of each (ID, description) posting as an {ID: analysis} dict.
+
+        Cached analyses are read from the database; the other postings, one per
+        distinct description, are passed to `analyze_missing`, which returns an
+        {ID: analysis or None} dict. Its analyses are cached, failures are not.
+        """
+        keys = {job_id: cache_key(description, self.version, self.model_name) for job_id, description in postings}
+        cached = self._lookup(sorted(set(keys.values())))
+
+        missing = {}
+        for job_id, description in postings:
+            if keys[job_id] not in cached:
+                missing.setdefault(keys[job_id], (job_id, description))
+        with self._lock:
+            self.stats['hits'] += sum(key in cached for key in keys.values())
+            self.stats['misses'] += len(keys) - sum(key in cached for key in keys.values())
+
+        if missing:
+            results = analyze_missing(list(missing.values()))
+            analyzed = {key: results.get(job_id) for key, (job_id, _) in missing.items()}
+            analyzed = {key: analysis for key, analysis in analyzed.items() if analysis is not None}
+            self.store(analyzed)
+            cached.update(analyzed)
+        logger.info(f"Analysis cache: {len(postings) - len(missing)} of {len(postings)} postings served "
+                    f"without a new analysis.")
+        return {job_id: cached.get(key) for job_id, key in keys.items()}
+
+    def prune(self):
+        """Delete the entries cached under another prompt version, returning their number."""
+        if not inspect(self.engine).has_table(self.table):
+            return 0
+        with self.engine.begin() as conn:
+            result = conn.execute(text(f'DELETE FROM {self.table} WHERE "PromptVersion" <> :version'),
+                                  {'version': self.version})
+        if result.rowcount:
+            logger.info(f"Pruned {result.rowcount} analyses cached under older prompts.")
+        return result.rowcount
@@ -0,0 +1,300 @@
+# LLM/analysis_schema.py
+import json
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+COMPANY_SIZES = ["Startup", "Small", "Medium", "Large"]
+CONTRACT_TYPES = ["Full-time", "Part-time", "Internship"]
+EDUCATION_LEVELS = ["Bachelors", "Masters", "Other"]
+
+# Allowed values of the enum fields
+ENUM_FIELDS = {
+    "company_size": COMPANY_SIZES,
+    "Contract_type": CONTRACT_TYPES,
+    "educational_qualifications": EDUCATION_LEVELS,
+}
+
+# Other spellings of enum values seen in model outputs, lowercased without punctuation
+ENUM_ALIASES = {
+    "company_size": {"meduim": "Medium", "mediumsized": "Medium", "midsize": "Medium", "sme": "Small",
+                     "pme": "Small", "big": "Large", "enterprise": "Large", "start up": "Startup"},
+    "Contract_type": {"fulltime": "Full-time", "full time": "Full-time", "cdi": "Full-time", "cdd": "Full-time",
+                      "parttime": "Part-time", "part time": "Part-time", "intern": "Internship",
+                      "stage": "Internship", "pfe": "Internship"},
+    "educational_qualifications": {"bachelor": "Bachelors", "bachelors degree": "Bachelors",
+                                   "licence": "Bachelors", "bac3": "Bachelors", "master": "Masters",
+                                   "masters degree": "Masters", "bac5": "Masters", "engineering degree": "Masters"},
+}
+
+TEXT_FIELDS = ["company_sector", "job_category"]
+NUMBER_FIELDS = ["years_of_experience"]
+LIST_FIELDS = ["technical_skills", "certifications", "behavioral_skills", "languages"]
+
+# Fields of an analysis, in the order of the prompt's output format
+FIELDS = ["company_sector", "company_size", "Contract_type", "job_category", "years_of_experience",
+          "educational_qualifications", "technical_skills", "certifications", "behavioral_skills", "languages"]
+
+# Values the model uses for missing information
+NULL_VALUES = {"", "null", "none", "n/a", "na", "nan", "not mentioned", "not specified", "unknown", "-"}
+
+_DECODER = json.JSONDecoder()
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+class SchemaError(ValueError):
+    """An LLM output that cannot be turned into an analysis."""
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, str) and value.strip().lower() in NULL_VALUES)
+
+
+def _enum_value(field, value):
+    if _is_null(value):
+        return None
+    key = re.sub(r"[^a-z0-9 ]", "", str(value).lower()).strip()
+    for allowed in ENUM_FIELDS[field]:
+        if key in (allowed.lower(), re.sub(r"[^a-z0-9 ]", "", allowed.lower())):
+            return allowed
+    return ENUM_ALIASES[field].get(key) or ENUM_ALIASES[field].get(key.replace(" ", ""))
+
+
+def _number_value(value):
+    if _is_null(value) or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value))  # e.g. "3-5 years" gives 3
+    return float(match.group().replace(',', '.')) if match else None
+
+
+def _list_value(value):
+    if _is_null(value):
+        return []
+    if isinstance(value, str):
+        value = re.split(r'[,;/]', value)
+    elif not isinstance(value, list):
+        value = [value]
+    return [str(item).strip() for item in value if not _is_null(item) and not isinstance(item, (list, dict))]
+
+
+def _text_value(value):
+    if _is_null(value):
+        return None
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value if not _is_null(item))
+    return str(value).strip() or None
+
+
+def validate_analysis(item):
+    """Return an analysis coerced to the schema and whether any value had to be changed.
+
+    Enum values are matched case-insensitively and through ENUM_ALIASES (unknown
+    ones become None), years are parsed to a float, list fields are lists of
+    strings and null-like values are None. Raises SchemaError if `item` is not
+    an object holding any of the fields.
+    """
+    if not isinstance(item, dict) or not any(field in item for field in FIELDS):
+        raise SchemaError(f"Not an analysis: {str(item)[:100]}")
+    analysis = {}
+    for field in FIELDS:
+        value = item.get(field)
+        if field in ENUM_FIELDS:
+            analysis[field] = _enum_value(field, value)
+        elif field in NUMBER_FIELDS:
+            analysis[field] = _number_value(value)
+        elif field in LIST_FIELDS:
+            analysis[field] = _list_value(value)
+        else:
+            analysis[field] = _text_value(value)
+    if analysis["job_category"] is None:
+        analysis["job_category"] = "Other"
+    repaired = any(item.get(field) != analysis[field] for field in FIELDS if field not in TEXT_FIELDS) or \
+        any(field not in item for field in FIELDS)
+    return analysis, repaired
+
+
+def _value_end(text, start):
+    """Return the index after the bracketed value starting at `start`, or None if it is not closed."""
+    depth, in_string, escaped = 0, False, False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '[{':
+            depth += 1
+        elif char in ']}':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return None
+
+
+def _close_brackets(text):
+    # Close the strings and brackets left open by a truncated output
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '[{':
+            stack.append(']' if char == '[' else '}')
+        elif char in ']}' and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = re.sub(r'[,:]\s*$', '', text.rstrip())
+    text = re.sub(r',\s*"[^"]*"\s*$', '', text) if stack and stack[-1] == '}' else text
+    return text + ''.join(reversed(stack))
+
+
+def repair_json(text):
+    """Fix the common defects of JSON written by a model.
+
+    Handles code fences, smart quotes, Python literals, single quotes, missing
+    commas between values, trailing commas and truncated output.
+    """
+    text = re.sub(r'```(?:json)?', '', text).strip()
+    text = text.replace('“', '"').replace('”', '"').replace('‘', "'").replace('’', "'")
+    if '"' not in text:
+        text = text.replace("'", '"')
+    text = re.sub(r'\bNone\b', 'null', text)
+    text = re.sub(r'\bTrue\b', 'true', text)
+    text = re.sub(r'\bFalse\b', 'false', text)
+    text = re.sub(r'([}\]"])\s*\n\s*(["{\[])', r'\1,\n\2', text)
+    text = re.sub(r'}\s*{', '},{', text)
+    text = _close_brackets(text)
+    return re.sub(r',\s*([\]\}])', r'\1', text)
+
+
+def parse_json(text):
+    """Return the first JSON object or array in a model output and whether it had to be repaired.
+
+    The text around the value (prose, code fences) is ignored. Raises SchemaError
+    if no value can be decoded, even after `repair_json`.
+    """
+    text = text or ""
+    starts = [index for index in (text.find('{'), text.find('[')) if index >= 0]
+    if not starts:
+        raise SchemaError("No JSON value in the output")
+    start = min(starts)
+    try:
+        return _DECODER.raw_decode(text, start)[0], False
+    except ValueError:
+        pass
+    try:
+        return _DECODER.raw_decode(repair_json(text[start:]))[0], True
+    except ValueError as e:
+        raise SchemaError(f"Invalid JSON: {e}") from e
+
+
+def iter_array_items(text):
+    """Yield (item or None, repaired) for each element of the first JSON array in a model output.
+
+    Elements are decoded one at a time, so a broken element (None) does not
+    lose the others. An output holding a single object yields it alone. Raises
+    SchemaError if the output holds no JSON value.
+    """
+    text = text or ""
+    start = text.find('[')
+    brace = text.find('{')
+    if start < 0 or (0 <= brace < start):
+        yield parse_json(text)
+        return
+    position = start + 1
+    while position < len(text):
+        next_object = text.find('{', position)
+        close = text.find(']', position)
+        if next_object < 0 or (0 <= close < next_object):
+            return
+        try:
+            item, position = _DECODER.raw_decode(text, next_object)
+            yield item, False
+            continue
+        except ValueError:
+            pass
+        end = _value_end(text, next_object) or len(text)
+        try:
+            yield _DECODER.raw_decode(repair_json(text[next_object:end]))[0], True
+        except ValueError:
+            yield None, False
+        position = end
+
+
+class AnalysisParser:
+    """Parses and validates LLM analyses, counting the outcomes.
+
+    `stats` counts the items parsed, those repaired locally, the invalid ones,
+    the postings re-prompted and the postings left without an analysis;
+    `failure_rate` is the share of analyzed postings that failed.
+    """
+
+    def __init__(self):
+        self.stats = {'postings': 0, 'parsed': 0, 'repaired': 0, 'invalid': 0, 'reprompted': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    @property
+    def failure_rate(self):
+        return self.stats['failed'] / self.stats['postings'] if self.stats['postings'] else 0.0
+
+    def _validate(self, item, repaired):
+        try:
+            analysis, coerced = validate_analysis(item)
+        except SchemaError as e:
+            logger.warning(f"Invalid analysis: {e}")
+            self.count('invalid')
+            return None
+        self.count('parsed')
+        if repaired or coerced:
+            self.count('repaired')
+        return analysis
+
+    def parse_one(self, text):
+        """Return the analysis in a single-posting output, or None."""
+        try:
+            item, repaired = parse_json(text)
+        except SchemaError as e:
+            logger.warning(f"Unparseable analysis: {e}")
+            self.count('invalid')
+            return None
+        if isinstance(item, list) and len(item) == 1:
+            item = item[0]
+        return self._validate(item, repaired)
+
+    def parse_batch(self, text, ids):
+        """Return the valid analyses of `ids` in a batched output, as an {ID: analysis} dict.
+
+        Items that are broken, invalid, unknown or missing are left out. Raises
+        SchemaError if the output holds no JSON value.
+        """
+        wanted = set(ids)
+        results = {}
+        for item, repaired in iter_array_items(text):
+            if not isinstance(item, dict) or str(item.get("id")) not in wanted:
+                self.count('invalid')
+                continue
+            job_id = str(item.pop("id"))
+            analysis = self._validate(item, repaired)
+            if analysis is not None:
+                results[job_id] = analysis
+        return results
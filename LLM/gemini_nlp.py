@@ -1,9 +1,15 @@
 import google.generativeai as genai
+import hashlib
 import time
 import json
-import re
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+from config.config import LLM_BATCH_SIZE, LLM_BATCH_TOKENS
+from LLM.analysis_schema import (AnalysisParser, SchemaError, COMPANY_SIZES, CONTRACT_TYPES, EDUCATION_LEVELS,
+                                 parse_json)
+from LLM.llm_executor import EXPECTED_OUTPUT_TOKENS
+from utils.text_utils import estimate_tokens
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -36,6 +42,33 @@ JOB_CATEGORIES = {
     ]
 }
 
+# Extraction rules shared by the single and batched analysis prompts
+ANALYSIS_GUIDELINES = f"""- Ensure all extracted information is in English, regardless of the job description's language.
+- For 'job_category', return only the specific job role (e.g., "auditor", "Business Analyst"), not the major category (e.g., "Accounting").
+- Keep "company_sector" concise max 2 words,
+- Keep "company_size" a choice between {len(COMPANY_SIZES)} options {json.dumps(COMPANY_SIZES)}
+- Keep "Contract_type" a choice between {len(CONTRACT_TYPES)} options {json.dumps(CONTRACT_TYPES)}
+- Keep "educational_qualifications" a choice between {len(EDUCATION_LEVELS)} options {json.dumps(EDUCATION_LEVELS)}
+- Extract "technical_skills" and "behavioral_skills" as lists, with each skill described in 1-2 words (e.g., "Python", "Teamwork").
+- For "years_of_experience", extract a specific number (float in years) if provided; otherwise, use "null".
+- For "certifications" and "languages", list specific entries (e.g., "AWS Certified", "French") or use "null" if none are mentioned.
+- If the job description is empty, vague, or missing details, return "null" for all fields except "job_category", which should be "Other".
+- Ensure the output is valid JSON without code block markers."""
+
+# Fields extracted from each job description
+OUTPUT_FORMAT = """{
+  "company_sector": "...",
+  "company_size": "...",
+  "Contract_type": "...",
+  "job_category": "...",
+  "years_of_experience": "...",
+  "educational_qualifications": "...",
+  "technical_skills": ["...", "..."],
+  "certifications": ["...", "..."],
+  "behavioral_skills": ["...", "..."],
+  "languages": ["...", "..."]
+}"""
+
 def setup_gemini(api_key: str, model_name: str = 'gemma-3-27b-it') -> genai.GenerativeModel:
     """Set up Gemini API client."""
     logger.info("Setting up Gemini API client")
@@ -52,46 +85,32 @@ def setup_gemini(api_key: str, model_name: str = 'gemma-3-27b-it') -> genai.Gene
         logger.error(f"Failed to setup Gemini API client: {str(e)}")
         raise
 
-def job_analysis(job_description: str, model: genai.GenerativeModel) -> str:
-    """Analyze job description using Gemini API."""
-    logger.info(f"Starting job analysis for description: {job_description[:50]}...")
-    if not job_description.strip():
-        logger.error("Job description is empty")
-        raise ValueError("Job description cannot be empty")
-
-    try:
-        prompt = f"""Analyze the provided job description and extract the specified information. Return the results in a structured JSON format. If a piece of information is not explicitly mentioned, use "null" as its value. For 'job_category', classify the job as one specific job role from the provided reference dictionary: {json.dumps(JOB_CATEGORIES, indent=2)}. The dictionary maps major categories (e.g., "Accounting") to lists of specific job roles (e.g., "auditor", "financial accountant"). Select the most relevant job role based on the job description. If no specific job role matches, use "Other".
+def analysis_prompt(job_description: str) -> str:
+    """Build the prompt analyzing one job description."""
+    return f"""Analyze the provided job description and extract the specified information. Return the results in a structured JSON format. If a piece of information is not explicitly mentioned, use "null" as its value. For 'job_category', classify the job as one specific job role from the provided reference dictionary: {json.dumps(JOB_CATEGORIES, indent=2)}. The dictionary maps major categories (e.g., "Accounting") to lists of specific job roles (e.g., "auditor", "financial accountant"). Select the most relevant job role based on the job description. If no specific job role matches, use "Other".
 
 **Guidelines:**
-- Ensure all extracted information is in English, regardless of the job description's language.
-- For 'job_category', return only the specific job role (e.g., "auditor", "Business Analyst"), not the major category (e.g., "Accounting").
-- Keep "company_sector" concise max 2 words,
-- Keep  "company_size" a choice between 4 options ["Startup", "Small", "Meduim","Large"]
-- Keep "Contract_type" a choice between 3 options ["Full-time", "Part-time","Internship]
-- Keep educational_qualifications" choice between 3 options []"Bachelors" ,"Masters" , "Other"]
-- Extract "technical_skills" and "behavioral_skills" as lists, with each skill described in 1-2 words (e.g., "Python", "Teamwork").
-- For "years_of_experience", extract a specific number (float in years) if provided; otherwise, use "null".
-- For "certifications" and "languages", list specific entries (e.g., "AWS Certified", "French") or use "null" if none are mentioned.
-- If the job description is empty, vague, or missing details, return "null" for all fields except "job_category", which should be "Other".
-- Ensure the output is valid JSON without code block markers.
+{ANALYSIS_GUIDELINES}
 
 **Job Description:**
 {job_description}
 
 **Expected JSON Output Format:**
-{{
-  "company_sector": "...",
-  "company_size": "...",
-  "Contract_type": "...",
-  "job_category": "...",
-  "years_of_experience": "...",
-  "educational_qualifications": "...",
-  "technical_skills": ["...", "..."],
-  "certifications": ["...", "..."],
-  "behavioral_skills": ["...", "..."],
-  "languages": ["...", "..."]
-}}
+{OUTPUT_FORMAT}
 """
+
+def job_analysis(job_description: str, model: genai.GenerativeModel) -> str:
+    """Analyze job description using Gemini API.
+
+    `model` may also be an LLMExecutor wrapping the model, to share its rate limits.
+    """
+    logger.info(f"Starting job analysis for description: {job_description[:50]}...")
+    if not job_description.strip():
+        logger.error("Job description is empty")
+        raise ValueError("Job description cannot be empty")
+
+    try:
+        prompt = analysis_prompt(job_description)
         logger.debug("Sending prompt to Gemini API")
         response = model.generate_content(prompt)
         logger.info("Received response from Gemini API")
@@ -100,22 +119,135 @@ def job_analysis(job_description: str, model: genai.GenerativeModel) -> str:
         logger.error(f"Error in job analysis: {str(e)}")
         raise
 
+def batch_prompt(postings: List[Tuple[str, str]]) -> str:
+    """Build one prompt analyzing several (ID, description) postings."""
+    descriptions = "\n\n".join(
+        f"### Job ID: {job_id}\n{description}\n### End of job {job_id}" for job_id, description in postings
+    )
+    item_format = '{\n  "id": "<Job ID>",' + OUTPUT_FORMAT[1:]
+    return f"""Analyze each of the job descriptions below and extract the specified information. Return the results as a JSON array with one object per job, each with an "id" field holding its Job ID. If a piece of information is not explicitly mentioned, use "null" as its value. For 'job_category', classify the job as one specific job role from the provided reference dictionary: {json.dumps(JOB_CATEGORIES, separators=(',', ':'))}. The dictionary maps major categories (e.g., "Accounting") to lists of specific job roles (e.g., "auditor", "financial accountant"). Select the most relevant job role based on the job description. If no specific job role matches, use "Other".
+
+**Guidelines:**
+{ANALYSIS_GUIDELINES}
+- Analyze each job on its own and return exactly one object for every Job ID, in the given order.
+
+**Job Descriptions:**
+{descriptions}
+
+**Expected JSON Output Format:**
+[
+{item_format},
+  ...
+]
+"""
+
+def prompt_version() -> str:
+    """Short hash of the analysis prompt templates, including JOB_CATEGORIES.
+
+    It changes whenever the prompts do, so results cached under an older version
+    are not reused.
+    """
+    templates = analysis_prompt("{job_description}") + batch_prompt([("{job_id}", "{job_description}")])
+    return hashlib.sha1(templates.encode('utf-8')).hexdigest()[:12]
+
+def plan_batches(postings: List[Tuple[str, str]], max_tokens: int = LLM_BATCH_TOKENS,
+                 max_items: int = LLM_BATCH_SIZE) -> List[List[Tuple[str, str]]]:
+    """Split (ID, description) postings into batches of at most `max_items` fitting `max_tokens`.
+
+    The budget counts the shared prompt once, and each posting's description and
+    expected response; a posting larger than the budget gets a batch of its own.
+    """
+    base = estimate_tokens(batch_prompt([]))
+    batches, batch, used = [], [], base
+    for job_id, description in postings:
+        cost = estimate_tokens(f"{job_id}{job_id}{description}") + 10 + EXPECTED_OUTPUT_TOKENS
+        if batch and (len(batch) >= max_items or used + cost > max_tokens):
+            batches.append(batch)
+            batch, used = [], base
+        batch.append((job_id, description))
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _single_analysis(job_id: str, description: str, model, parser: AnalysisParser) -> Optional[Dict]:
+    try:
+        text = job_analysis(description, model)
+    except Exception as e:
+        logger.error(f"Error analyzing job {job_id}: {str(e)}")
+        return None
+    return parser.parse_one(text)
+
+def _analyze_batch(postings: List[Tuple[str, str]], model, parser: AnalysisParser,
+                   reprompt: bool = True) -> Dict[str, Optional[Dict]]:
+    ids = [str(job_id) for job_id, _ in postings]
+    if len(postings) == 1:
+        return {ids[0]: _single_analysis(ids[0], postings[0][1], model, parser)}
+
+    try:
+        response = model.generate_content(batch_prompt(postings))
+    except Exception as e:
+        # Splitting would only multiply the requests failing the same way (quota, outage)
+        logger.error(f"Error analyzing a batch of {len(postings)} jobs: {str(e)}")
+        return {}
+    try:
+        results = parser.parse_batch(response.text, ids)
+    except ValueError as e:  # SchemaError, or a response without text
+        middle = len(postings) // 2
+        logger.warning(f"Batched analysis of {len(postings)} jobs unreadable ({str(e)}), splitting it")
+        results = _analyze_batch(postings[:middle], model, parser, reprompt)
+        results.update(_analyze_batch(postings[middle:], model, parser, reprompt))
+        return results
+
+    failing = [(job_id, description) for job_id, (_, description) in zip(ids, postings) if job_id not in results]
+    if failing:
+        logger.warning(f"{len(failing)} of {len(postings)} jobs missing or invalid in the batched analysis, "
+                       f"analyzing them again")
+        parser.count('reprompted', len(failing))
+        if reprompt and len(failing) > 1:
+            results.update(_analyze_batch(failing, model, parser, reprompt=False))
+        else:
+            for job_id, description in failing:
+                results[job_id] = _single_analysis(job_id, description, model, parser)
+    logger.info(f"Analyzed a batch of {len(postings)} jobs")
+    return results
+
+def batch_job_analysis(postings: List[Tuple[str, str]], model,
+                       parser: Optional[AnalysisParser] = None) -> Dict[str, Optional[Dict]]:
+    """Analyze (ID, description) postings with one request, returning the analysis of each ID.
+
+    Analyses are validated against the schema of LLM.analysis_schema (`parser`
+    counts the outcomes). If the response holds no JSON, the batch is split in
+    two and each half is analyzed again; if the request itself fails, its
+    postings are not retried here (LLMExecutor retries transient errors). Only
+    the postings missing or invalid in a response are re-prompted, together once
+    and then one by one. Postings that still fail map to None, so the result
+    always has every ID.
+    """
+    parser = parser or AnalysisParser()
+    results = _analyze_batch(postings, model, parser)
+    results = {str(job_id): results.get(str(job_id)) for job_id, _ in postings}
+    parser.count('postings', len(results))
+    parser.count('failed', sum(analysis is None for analysis in results.values()))
+    return results
+
 def process_json_list(analysis_results: List[str]) -> List[Dict]:
-    """Process a list of JSON strings and clean/load them."""
+    """Process a list of JSON strings and clean/load them.
+
+    Strings that cannot be parsed, even after local repair, are skipped; use
+    AnalysisParser for results aligned with their inputs and checked against
+    the schema.
+    """
     logger.info(f"Processing {len(analysis_results)} JSON analysis results")
     cleaned_json_data = []
     
     for i, json_str in enumerate(analysis_results, 1):
         logger.debug(f"Processing JSON string {i}")
         try:
-            # Remove code block markers and extra whitespace
-            clean_str = re.sub(r'```(?:json)?\n?', '', json_str).strip()
-            # Remove trailing commas before closing braces/brackets
-            clean_str = re.sub(r',\s*([\]\}])', r'\1', clean_str)
-            json_data = json.loads(clean_str)
+            json_data, _ = parse_json(json_str)
             logger.info(f"Successfully parsed JSON string {i}")
             cleaned_json_data.append(json_data)
-        except json.JSONDecodeError as e:
+        except SchemaError as e:
             logger.error(f"JSON decode error in string {i}: {str(e)}")
             logger.debug(f"Problematic string: {json_str}")
             continue
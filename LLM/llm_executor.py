@@ -0,0 +1,217 @@
+# LLM/llm_executor.py
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config import LLM_RPM, LLM_TPM, LLM_MAX_IN_FLIGHT, LLM_RETRIES, LLM_BACKOFF
+from utils.text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses of LLM API errors worth retrying after a backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Tokens reserved for the response of a request, before its actual usage is known
+EXPECTED_OUTPUT_TOKENS = 300
+
+
+def error_status(error):
+    """Return the HTTP status of an LLM API error, or None."""
+    code = getattr(error, 'code', None)
+    if code is None:
+        code = getattr(error, 'status_code', None)
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled with `per_minute` tokens per minute, holding at most `burst`.
+
+    `acquire` takes an amount up front; `adjust` settles the difference once the
+    actual amount is known, and may leave the bucket in debt.
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available and take them."""
+        amount = min(amount, self.capacity)  # A request larger than the bucket would wait forever
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount):
+        """Take `amount` more tokens (give them back if negative) without waiting."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class LLMExecutor:
+    """Runs LLM requests concurrently within a requests and tokens per minute quota.
+
+    The executor wraps a model and exposes the same `generate_content`, so it can
+    be passed wherever a model is expected (e.g. `job_analysis`). At most
+    `max_in_flight` requests run at once. Errors with a 429/5xx status are retried
+    `retries` times with exponential backoff; the backoff pauses every request,
+    since they share the quota.
+    """
+
+    def __init__(self, model, rpm=LLM_RPM, tpm=LLM_TPM, max_in_flight=LLM_MAX_IN_FLIGHT,
+                 retries=LLM_RETRIES, backoff=LLM_BACKOFF):
+        self.model = model
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.retries = retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='llm')
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'tokens': 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _wait_pause(self):
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _pause(self, attempt):
+        delay = self.backoff * 2 ** attempt * random.uniform(1, 1.5)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def generate_content(self, prompt):
+        """Send a prompt to the model within the quota, retrying 429/5xx errors, and return its response."""
+        estimated = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        for attempt in range(self.retries + 1):
+            self._wait_pause()
+            if self.requests:
+                self.requests.acquire()
+            if self.tokens:
+                self.tokens.acquire(estimated)
+            self._count('requests')
+            try:
+                response = self.model.generate_content(prompt)
+            except Exception as e:
+                if error_status(e) not in RETRY_STATUSES or attempt == self.retries:
+                    self._count('failures')
+                    raise
+                delay = self._pause(attempt)
+                self._count('retries')
+                logger.warning(f"LLM request failed with {error_status(e)}, retrying in {delay:.1f}s "
+                               f"(attempt {attempt + 1})")
+                continue
+            used = getattr(getattr(response, 'usage_metadata', None), 'total_token_count', None)
+            if self.tokens and isinstance(used, int):
+                self.tokens.adjust(used - estimated)
+            self._count('tokens', used if isinstance(used, int) else estimated)
+            return response
+
+    def map(self, func, items):
+        """Call `func(item, self)` for each item concurrently.
+
+        Returns a list aligned with `items` holding either the result or the
+        exception raised for that item.
+        """
+        futures = [self._executor.submit(func, item, self) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        """Wait for the running requests and release the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeResponse:
+    def __init__(self, text, total_token_count=None):
+        self.text = text
+        self.usage_metadata = type('UsageMetadata', (), {'total_token_count': total_token_count})()
+
+
+class FakeAPIError(Exception):
+    """An LLM API error with an HTTP status `code`."""
+
+    def __init__(self, code, message="fake API error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeModel:
+    """Local stand-in for a Gemini model, for tests and benchmarks.
+
+    `respond(prompt)` builds the response text (a fixed analysis by default),
+    each call takes `latency` seconds, and the first `fail_first` calls raise
+    a FakeAPIError with status `fail_code`.
+    """
+
+    DEFAULT_RESPONSE = (
+        '{"company_sector": "null", "company_size": "null", "Contract_type": "null", "job_category": "Other", '
+        '"years_of_experience": "null", "educational_qualifications": "null", "technical_skills": [], '
+        '"certifications": [], "behavioral_skills": [], "languages": []}'
+    )
+
+    model_name = 'fake'
+
+    def __init__(self, respond=None, latency=0.0, fail_first=0, fail_code=429):
+        self.respond = respond or (lambda prompt: self.DEFAULT_RESPONSE)
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_code = fail_code
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            calls = len(self.prompts)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if calls <= self.fail_first:
+                raise FakeAPIError(self.fail_code)
+            text = self.respond(prompt)
+            return FakeResponse(text, total_token_count=estimate_tokens(prompt) + estimate_tokens(text))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
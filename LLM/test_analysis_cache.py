@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from LLM.analysis_cache import AnalysisCache, cache_key
+from LLM.gemini_nlp import prompt_version
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        self.calls = []
+
+    def analyze_missing(self, postings):
+        self.calls.append(postings)
+        return {job_id: {"job_category": description.split()[0]} for job_id, description in postings}
+
+    def test_same_description_is_analyzed_once(self):
+        cache = AnalysisCache(self.engine, 'fake')
+        postings = [('a', 'Accountant in Tunis'), ('b', 'Accountant  in\nTunis'), ('c', 'Developer')]
+
+        results = cache.analyze(postings, self.analyze_missing)
+
+        self.assertEqual(results, {'a': {"job_category": "Accountant"}, 'b': {"job_category": "Accountant"},
+                                   'c': {"job_category": "Developer"}})
+        self.assertEqual(self.calls, [[('a', 'Accountant in Tunis'), ('c', 'Developer')]])
+        self.assertEqual(cache.stats, {'hits': 0, 'misses': 3, 'stored': 2})
+
+        # A later run, e.g. a repost under another ID, reads the database
+        later = AnalysisCache(self.engine, 'fake')
+        self.assertEqual(later.analyze([('d', 'Developer')], self.analyze_missing), {'d': {"job_category": "Developer"}})
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(later.stats['hits'], 1)
+
+    def test_failures_are_not_cached(self):
+        cache = AnalysisCache(self.engine, 'fake')
+        self.assertEqual(cache.analyze([('a', 'Accountant')], lambda postings: {'a': None}), {'a': None})
+        cache.analyze([('a', 'Accountant')], self.analyze_missing)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_prompt_or_model_change_invalidates(self):
+        AnalysisCache(self.engine, 'fake', version='old').analyze([('a', 'Accountant')], self.analyze_missing)
+
+        cache = AnalysisCache(self.engine, 'fake')
+        cache.analyze([('a', 'Accountant')], self.analyze_missing)
+        AnalysisCache(self.engine, 'other-model').analyze([('a', 'Accountant')], self.analyze_missing)
+        self.assertEqual(len(self.calls), 3)
+
+        self.assertEqual(cache.prune(), 1)
+        self.assertNotEqual(cache_key('x', prompt_version(), 'fake'), cache_key('x', prompt_version(), 'other'))
+
+    def test_prompt_version_follows_categories(self):
+        version = prompt_version()
+        with patch.dict('LLM.gemini_nlp.JOB_CATEGORIES', {'Law': ['lawyer']}):
+            self.assertNotEqual(prompt_version(), version)
+        self.assertEqual(prompt_version(), version)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import re
+import unittest
+from LLM.analysis_schema import AnalysisParser, SchemaError, iter_array_items, parse_json, validate_analysis
+from LLM.gemini_nlp import batch_job_analysis
+from LLM.llm_executor import FakeModel
+
+def broken_batch_response(prompt, broken_ids=()):
+    """A batched answer whose items for `broken_ids` are cut short, or a single analysis."""
+    ids = re.findall(r'### Job ID: (\S+)', prompt)
+    if not ids:
+        return '{"job_category": "Other", "company_size": "Small"}'
+    items = [f'{{"id": "{job_id}", "job_category": "role {job_id}" "company_size": }}' if job_id in broken_ids
+             else json.dumps({"id": job_id, "job_category": f"role {job_id}"}) for job_id in ids]
+    return "Here are the analyses:\n[" + ",\n".join(items) + "]"
+
+class TestValidateAnalysis(unittest.TestCase):
+    def test_coerces_values_to_the_schema(self):
+        analysis, repaired = validate_analysis({
+            "company_size": "meduim", "Contract_type": "Stage", "educational_qualifications": "Bac+5",
+            "years_of_experience": "3-5 years", "technical_skills": "Python, SQL", "certifications": "null",
+            "languages": ["French", "null"], "job_category": "null", "company_sector": "IT",
+        })
+        self.assertTrue(repaired)
+        self.assertEqual(analysis["company_size"], "Medium")
+        self.assertEqual(analysis["Contract_type"], "Internship")
+        self.assertEqual(analysis["educational_qualifications"], "Masters")
+        self.assertEqual(analysis["years_of_experience"], 3.0)
+        self.assertEqual(analysis["technical_skills"], ["Python", "SQL"])
+        self.assertEqual(analysis["certifications"], [])
+        self.assertEqual(analysis["languages"], ["French"])
+        self.assertEqual(analysis["job_category"], "Other")
+        self.assertEqual(analysis["behavioral_skills"], [])
+
+    def test_unknown_enum_values_become_null(self):
+        analysis, _ = validate_analysis({"company_size": "Huge", "Contract_type": "full-time"})
+        self.assertIsNone(analysis["company_size"])
+        self.assertEqual(analysis["Contract_type"], "Full-time")
+
+    def test_rejects_non_analyses(self):
+        for item in (["a"], "text", {"unrelated": 1}):
+            with self.assertRaises(SchemaError):
+                validate_analysis(item)
+
+class TestParseJson(unittest.TestCase):
+    def test_ignores_surrounding_text(self):
+        self.assertEqual(parse_json('Sure!\n```json\n{"a": [1, 2]}\n```\nDone.'), ({"a": [1, 2]}, False))
+
+    def test_repairs_common_defects(self):
+        self.assertEqual(parse_json('{"a": [1, 2,], "b": None,}')[0], {"a": [1, 2], "b": None})
+        self.assertEqual(parse_json("{'a': 'x'}")[0], {"a": "x"})
+        self.assertEqual(parse_json('{“a”: “x”}')[0], {"a": "x"})
+        self.assertEqual(parse_json('{"a": "x"\n"b": "y"}')[0], {"a": "x", "b": "y"})
+
+    def test_repairs_truncated_output(self):
+        value, repaired = parse_json('{"skills": ["Python", "SQ')
+        self.assertTrue(repaired)
+        self.assertEqual(value, {"skills": ["Python", "SQ"]})
+        self.assertEqual(parse_json('{"a": 1, "b"')[0], {"a": 1})
+
+    def test_no_json(self):
+        with self.assertRaises(SchemaError):
+            parse_json('invalid json')
+
+    def test_array_items_are_decoded_one_by_one(self):
+        items = list(iter_array_items('[{"id": 1}, {"id": 2 "x": }, {"id": 3}]'))
+        self.assertEqual([item for item, _ in items], [{"id": 1}, None, {"id": 3}])
+
+class TestAnalysisParser(unittest.TestCase):
+    def setUp(self):
+        self.postings = [(f'id{i}', f'Description {i}') for i in range(5)]
+
+    def test_only_failing_items_are_reprompted(self):
+        model = FakeModel(respond=lambda prompt: broken_batch_response(prompt, broken_ids={'id1', 'id3'}))
+        parser = AnalysisParser()
+        first = model.respond
+        # The re-prompt of the failing items gets a clean answer
+        model.respond = lambda prompt: first(prompt) if len(model.prompts) == 1 else broken_batch_response(prompt)
+
+        results = batch_job_analysis(self.postings, model, parser=parser)
+
+        self.assertEqual(list(results), [job_id for job_id, _ in self.postings])
+        self.assertEqual(results['id3']['job_category'], "role id3")
+        self.assertEqual(len(model.prompts), 2)
+        self.assertEqual(re.findall(r'### Job ID: (\S+)', model.prompts[1]), ['id1', 'id3'])
+        self.assertEqual(parser.stats['reprompted'], 2)
+        self.assertEqual(parser.failure_rate, 0.0)
+
+    def test_failures_are_counted(self):
+        model = FakeModel(respond=lambda prompt: broken_batch_response(prompt, broken_ids={'id0', 'id1'})
+                          if '### Job ID' in prompt else 'no analysis')
+        parser = AnalysisParser()
+
+        results = batch_job_analysis(self.postings[:3], model, parser=parser)
+
+        self.assertEqual(results['id0'], None)
+        self.assertEqual(results['id2']['job_category'], "role id2")
+        self.assertEqual(parser.stats['failed'], 2)
+        self.assertAlmostEqual(parser.failure_rate, 2 / 3)
+
+    def test_single_analysis_is_validated(self):
+        parser = AnalysisParser()
+        self.assertEqual(parser.parse_one('```json\n{"company_size": "small",}\n```')["company_size"], "Small")
+        self.assertIsNone(parser.parse_one('["not", "an", "analysis"]'))
+        self.assertEqual(parser.stats['invalid'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
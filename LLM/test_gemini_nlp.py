@@ -1,7 +1,18 @@
 import unittest
 import json
+import re
 from unittest.mock import patch, MagicMock
-from nlp.gemini_nlp import setup_gemini, job_analysis, process_json_list
+from LLM.gemini_nlp import (setup_gemini, job_analysis, process_json_list, batch_job_analysis, batch_prompt,
+                            plan_batches)
+from LLM.llm_executor import FakeModel, estimate_tokens
+
+def batch_response(prompt, broken_ids=()):
+    """Answer a prompt like the model would: an array for batched prompts, an object otherwise."""
+    ids = re.findall(r'### Job ID: (\S+)', prompt)
+    if not ids:
+        return '{"job_category": "Other", "technical_skills": ["Python"]}'
+    items = [{"id": job_id, "job_category": f"role {job_id}"} for job_id in ids if job_id not in broken_ids]
+    return '```json\n' + json.dumps(items) + '\n```'
 
 class TestGeminiNLP(unittest.TestCase):
     def setUp(self):
@@ -26,7 +37,7 @@ class TestGeminiNLP(unittest.TestCase):
         }
         ```'''
 
-    @patch('gemini_nlp.genai')
+    @patch('LLM.gemini_nlp.genai')
     def test_setup_gemini(self, mock_genai):
         mock_genai.GenerativeModel.return_value = self.mock_model
         result = setup_gemini(self.api_key)
@@ -63,5 +74,45 @@ class TestGeminiNLP(unittest.TestCase):
         result = process_json_list(analysis_results)
         self.assertEqual(result, [])
 
+class TestBatchAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.postings = [(f'id{i}', f'Description {i}') for i in range(6)]
+
+    def test_one_request_per_batch(self):
+        model = FakeModel(respond=batch_response)
+        results = batch_job_analysis(self.postings, model)
+        self.assertEqual(len(model.prompts), 1)
+        self.assertEqual(results['id3']['job_category'], "role id3")
+        self.assertEqual(set(results), {job_id for job_id, _ in self.postings})
+
+    def test_missing_items_fall_back_to_single_calls(self):
+        model = FakeModel(respond=lambda prompt: batch_response(prompt, broken_ids={'id2'}))
+        results = batch_job_analysis(self.postings, model)
+        self.assertEqual(len(model.prompts), 2)
+        self.assertEqual(results['id2']['technical_skills'], ["Python"])
+
+    def test_unparseable_batches_are_split(self):
+        respond = lambda prompt: 'not json' if prompt.count('### Job ID') > 2 else batch_response(prompt)
+        results = batch_job_analysis(self.postings, FakeModel(respond=respond))
+        self.assertEqual(results['id5']['job_category'], "role id5")
+        self.assertEqual(len(results), 6)
+
+    def test_failed_items_map_to_none(self):
+        results = batch_job_analysis(self.postings[:2], FakeModel(respond=lambda prompt: 'not json'))
+        self.assertEqual(results, {'id0': None, 'id1': None})
+
+    def test_request_errors_are_not_split(self):
+        model = FakeModel(fail_first=100, fail_code=403)
+        results = batch_job_analysis(self.postings, model)
+        self.assertEqual(len(model.prompts), 1)
+        self.assertEqual(set(results.values()), {None})
+
+    def test_plan_batches_by_token_budget(self):
+        base = estimate_tokens(batch_prompt([]))
+        batches = plan_batches(self.postings, max_tokens=base + 1000, max_items=10)
+        self.assertEqual([len(batch) for batch in batches], [3, 3])
+        self.assertEqual(plan_batches(self.postings, max_items=4)[1], self.postings[4:])
+        self.assertEqual(len(plan_batches([('big', 'x' * 100000)] + self.postings[:1], max_tokens=5000)), 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,51 @@
+import time
+import unittest
+from LLM.gemini_nlp import job_analysis
+from LLM.llm_executor import FakeAPIError, FakeModel, LLMExecutor, TokenBucket
+
+class TestTokenBucket(unittest.TestCase):
+    def test_limits_rate(self):
+        bucket = TokenBucket(per_minute=1200, burst=1)  # 20 per second
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_oversized_amount_does_not_block_forever(self):
+        bucket = TokenBucket(per_minute=6000, burst=10)
+        bucket.acquire(50)
+        bucket.adjust(-100)
+        bucket.acquire(10)
+
+class TestLLMExecutor(unittest.TestCase):
+    def test_map_keeps_order_and_bounds_in_flight(self):
+        model = FakeModel(respond=lambda prompt: prompt.upper(), latency=0.02)
+        with LLMExecutor(model, rpm=None, tpm=None, max_in_flight=3) as llm:
+            results = llm.map(lambda item, llm: llm.generate_content(item).text, [f'p{i}' for i in range(12)])
+        self.assertEqual(results, [f'P{i}' for i in range(12)])
+        self.assertEqual(model.max_in_flight, 3)
+
+    def test_retries_rate_limit_errors(self):
+        model = FakeModel(fail_first=2, fail_code=429)
+        with LLMExecutor(model, rpm=None, tpm=None, backoff=0.01) as llm:
+            self.assertEqual(llm.generate_content('prompt').text, FakeModel.DEFAULT_RESPONSE)
+        self.assertEqual(llm.stats['retries'], 2)
+        self.assertEqual(len(model.prompts), 3)
+
+    def test_other_errors_are_returned_in_place(self):
+        model = FakeModel(fail_first=1, fail_code=400)
+        with LLMExecutor(model, rpm=None, tpm=None, backoff=0.01) as llm:
+            results = llm.map(lambda item, llm: llm.generate_content(item).text, ['a', 'b'])
+        errors = [result for result in results if isinstance(result, FakeAPIError)]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(llm.stats['failures'], 1)
+
+    def test_job_analysis_through_executor(self):
+        model = FakeModel()
+        with LLMExecutor(model, rpm=6000, tpm=1_000_000) as llm:
+            results = llm.map(job_analysis, ['Comptable à Tunis', 'Python developer'])
+        self.assertEqual(results, [FakeModel.DEFAULT_RESPONSE] * 2)
+        self.assertIn('Python developer', model.prompts[0] + model.prompts[1])
+
+if __name__ == '__main__':
+    unittest.main()
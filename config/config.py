@@ -5,4 +5,70 @@ load_dotenv()  # Load variables from .env file
 
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
\ No newline at end of file
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# HTTP fetching
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "16"))
+FETCH_MAX_PER_HOST = int(os.getenv("FETCH_MAX_PER_HOST", "4"))
+FETCH_DELAY = float(os.getenv("FETCH_DELAY", "0.5"))  # Seconds between requests to the same host
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+
+# On-disk HTTP response cache, set HTTP_CACHE_DIR to an empty string to disable it
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Worker processes of the parse stage, 0 or 1 parses inline
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Scrape scheduling: global request budget (requests per second, 0 for unlimited),
+# per-request retries and concurrent (source, Major) tasks
+FETCH_GLOBAL_RATE = float(os.getenv("FETCH_GLOBAL_RATE", "8"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "2"))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", "1"))
+SCRAPE_MAX_TASKS = int(os.getenv("SCRAPE_MAX_TASKS", "6"))
+SCRAPE_TASK_RETRIES = int(os.getenv("SCRAPE_TASK_RETRIES", "2"))
+
+# Scraped postings are written in batches of DB_FLUSH_SIZE or every DB_FLUSH_INTERVAL seconds
+DB_FLUSH_SIZE = int(os.getenv("DB_FLUSH_SIZE", "200"))
+DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "60"))
+
+# Language identification of job descriptions: backend ("langdetect", or "langid"
+# if installed) and number of leading characters it looks at
+LANGUAGE_BACKEND = os.getenv("LANGUAGE_BACKEND", "langdetect")
+LANGUAGE_PREFIX_CHARS = int(os.getenv("LANGUAGE_PREFIX_CHARS", "1000"))
+
+# Worker processes of the deduplication, 0 or 1 runs it in the main process
+DEDUP_JOBS = int(os.getenv("DEDUP_JOBS", str(os.cpu_count() or 1)))
+
+# Share of the words of new postings missing from the stored TF-IDF vocabulary above which it is refitted
+DEDUP_REFIT_UNSEEN = float(os.getenv("DEDUP_REFIT_UNSEEN", "0.2"))
+
+# Rows per bulk write (one COPY on PostgreSQL, one batched INSERT elsewhere)
+DB_WRITE_CHUNK_SIZE = int(os.getenv("DB_WRITE_CHUNK_SIZE", "10000"))
+
+# Partition job_postings by month of 'Scraped' (PostgreSQL only), applied when the table is created
+DB_PARTITION_JOB_POSTINGS = os.getenv("DB_PARTITION_JOB_POSTINGS", "").lower() in ("1", "true", "yes")
+
+# Rows per chunk when streaming tables out of the database
+DB_READ_CHUNK_SIZE = int(os.getenv("DB_READ_CHUNK_SIZE", "5000"))
+
+# Database connection pool of each process (ignored by in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced, -1 never
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# LLM analysis quota (requests and tokens per minute), concurrent requests and retries of 429/5xx responses
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))
+LLM_TPM = float(os.getenv("LLM_TPM", "15000"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "5"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "2"))  # Seconds before the first retry, doubled on each one
+
+# Postings analyzed per LLM request, and estimated token budget (prompt and response) of a batched request
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "10"))
+LLM_BATCH_TOKENS = int(os.getenv("LLM_BATCH_TOKENS", "8000"))
+
+# Estimated token budget of a job description sent to the LLM, longer ones are shortened (0 disables it)
+LLM_DESCRIPTION_TOKENS = int(os.getenv("LLM_DESCRIPTION_TOKENS", "1000"))
@@ -1,8 +1,16 @@
+import argparse
+from functools import partial
 import pandas as pd
 from config.config import DATABASE_URL, GOOGLE_API_KEY
-from LLM.gemini_nlp import setup_gemini, job_analysis, process_json_list
+from LLM.gemini_nlp import setup_gemini, batch_job_analysis, plan_batches
+from LLM.llm_executor import LLMExecutor
+from LLM.analysis_cache import AnalysisCache
+from LLM.analysis_schema import AnalysisParser
 from utils.db_utils import get_engine
-import time
+from utils.text_utils import prepare_descriptions
+from utils.processing_state import count_pending, pending_batches
+from utils.bulk_load import delete_by_ids, to_sql_bulk, upsert_bulk
+from utils.schema import conform, migrate
 
 def melt_dataframe_columns(df, columns_to_explode):
     """Melt specified columns of a DataFrame, handling lists."""
@@ -27,72 +35,97 @@ def melt_dataframe_columns(df, columns_to_explode):
     return pd.concat(melted_dfs, ignore_index=True)
 
 def save_batch_data(merged_df, melted_df, engine, batch_number, merged_table='merged_data_processed', melted_table='melted_data_processed'):
-    """Save merged and melted data for a batch to the database."""
+    """Save merged and melted data for a batch to the database.
+
+    Postings processed again replace their earlier merged and melted rows.
+    """
     try:
-        # Save merged data
-        if not merged_df.empty:
-            print(f"Saving merged batch {batch_number} to database...")
-            merged_df.to_sql(merged_table, engine, if_exists='append', index=False)
-            print(f"Merged batch {batch_number} saved to '{merged_table}' table.")
-        
-        # Save melted data
-        if not melted_df.empty:
-            print(f"Saving melted batch {batch_number} to database...")
-            melted_df.to_sql(melted_table, engine, if_exists='append', index=False)
-            print(f"Melted batch {batch_number} saved to '{melted_table}' table.")
+        with engine.begin() as conn:
+            # Save merged data
+            if not merged_df.empty:
+                print(f"Saving merged batch {batch_number} to database...")
+                upsert_bulk(conform(merged_df, conn, merged_table), merged_table, conn)
+                print(f"Merged batch {batch_number} saved to '{merged_table}' table.")
+            
+            # Save melted data
+            if not melted_df.empty:
+                print(f"Saving melted batch {batch_number} to database...")
+                delete_by_ids(conn, melted_table, melted_df['ID'].unique())
+                to_sql_bulk(conform(melted_df, conn, melted_table), melted_table, conn)
+                print(f"Melted batch {batch_number} saved to '{melted_table}' table.")
     except Exception as e:
         print(f"Error saving batch {batch_number}: {str(e)}")
         import traceback
         print(traceback.format_exc())
 
-def process_job_data(batch_size=100):
-    """Process job data with NLP and store results in batches."""
+def analyze_postings(postings, llm, parser):
+    """Analyze (ID, description) postings concurrently, within the API quota, several per request."""
+    analyses = {}
+    for result in llm.map(partial(batch_job_analysis, parser=parser), plan_batches(postings)):
+        if isinstance(result, Exception):
+            print(f"Error analyzing job descriptions: {str(result)}")
+            continue
+        analyses.update(result)
+    return analyses
+
+def process_job_data(batch_size=100, reprocess=False):
+    """Process job data with NLP and store results in batches.
+
+    Only postings that were not processed yet, or whose description changed
+    since, are analyzed; `reprocess` analyzes all of them again.
+    """
     try:
         engine = get_engine(DATABASE_URL)
+        migrate(engine)
         model = setup_gemini(GOOGLE_API_KEY)
+        cache = AnalysisCache(engine, model.model_name)
+        cache.prune()
+        parser = AnalysisParser()
         
-        # Load job postings using SQLAlchemy engine
-        df = pd.read_sql_table('job_postings', engine)
+        if not reprocess:
+            print(f"{count_pending(engine)} job postings to process.")
         
-        if df.empty:
-            print("No job postings found in database!")
-            return
+        # Read deduplicated job postings still to process from the database in batches
+        batches = pending_batches(engine, batch_size=batch_size, reprocess=reprocess)
         
-        # Process data in batches
-        total_rows = len(df)
-        for batch_start in range(0, total_rows, batch_size):
-            batch_end = min(batch_start + batch_size, total_rows)
-            batch_df = df.iloc[batch_start:batch_end]
-            batch_number = batch_start // batch_size + 1
+        with LLMExecutor(model) as llm:
+            rows_read = 0
+            tokens_saved = 0
+            for batch_number, batch_df in enumerate(batches, 1):
+                batch_start, rows_read = rows_read, rows_read + len(batch_df)
             
-            print(f"Processing batch {batch_number} (rows {batch_start} to {batch_end-1})...")
+                print(f"Processing batch {batch_number} (rows {batch_start} to {rows_read-1})...")
             
-            # Perform NLP analysis with rate limiting
-            analysis_results = []
-            for desc in batch_df['Description']:
-                try:
-                    result = job_analysis(desc, model)
-                    analysis_results.append(result)
-                    time.sleep(3)  # Rate limiting between API calls
-                except Exception as e:
-                    print(f"Error analyzing job description: {str(e)}")
-                    analysis_results.append(None)
+                # Strip boilerplate and shorten long descriptions before the analysis
+                descriptions, text_stats = prepare_descriptions(batch_df['Description'].fillna('').tolist())
+                tokens_saved += text_stats['tokens_saved']
+                print(f"Description preprocessing saved about {text_stats['tokens_saved']} of "
+                      f"{text_stats['tokens_before']} tokens.")
             
-            cleaned_json_data = process_json_list([r for r in analysis_results if r is not None])
+                # Perform NLP analysis of the descriptions not analyzed before
+                postings = list(zip(batch_df['ID'], descriptions))
+                analyses = cache.analyze(postings, lambda missing: analyze_postings(missing, llm, parser))
             
-            # Merge and melt data
-            df_a = pd.DataFrame(cleaned_json_data)
-            if df_a.empty:
-                print(f"No valid analysis results for batch {batch_number}!")
-                continue
+                # Merge and melt data
+                df_a = pd.DataFrame([dict(analysis, ID=job_id) for job_id, analysis in analyses.items() if analysis])
+                if df_a.empty:
+                    print(f"No valid analysis results for batch {batch_number}!")
+                    continue
                 
-            merged_dataframe = batch_df.reset_index(drop=True).merge(df_a, right_index=True, left_index=True)
+                merged_dataframe = batch_df.merge(df_a, on='ID')
             
-            columns_to_explode = ["technical_skills", "certifications", "behavioral_skills", "languages"]
-            final_melted = melt_dataframe_columns(merged_dataframe, columns_to_explode)
+                columns_to_explode = ["technical_skills", "certifications", "behavioral_skills", "languages"]
+                final_melted = melt_dataframe_columns(merged_dataframe, columns_to_explode)
             
-            # Save batch data
-            save_batch_data(merged_dataframe, final_melted, engine, batch_number)
+                # Save batch data
+                save_batch_data(merged_dataframe, final_melted, engine, batch_number)
+        
+            if rows_read == 0:
+                print("No job postings to process!")
+            print(f"LLM requests: {llm.stats}")
+            print(f"Analysis cache: {cache.stats}")
+            print(f"Analysis parsing: {parser.stats}, failure rate {parser.failure_rate:.1%}")
+            print(f"Description preprocessing saved about {tokens_saved} tokens.")
             
     except Exception as e:
         print(f"An error occurred during processing: {str(e)}")
@@ -100,4 +133,9 @@ def process_job_data(batch_size=100):
         print(traceback.format_exc())
 
 if __name__ == "__main__":
-    process_job_data(batch_size=100)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyze the deduplicated job postings with the LLM.")
+    parser.add_argument('--batch-size', type=int, default=100, help="Postings analyzed and saved per batch")
+    parser.add_argument('--reprocess', action='store_true',
+                        help="Analyze every posting again, not only new or changed ones")
+    args = parser.parse_args()
+    process_job_data(batch_size=args.batch_size, reprocess=args.reprocess)
@@ -1,51 +1,126 @@
+import argparse
 import json
-import pandas as pd
-from config.config import DATABASE_URL
+from config.config import DATABASE_URL, PARSE_WORKERS, DB_FLUSH_SIZE, DB_FLUSH_INTERVAL, DEDUP_JOBS
 from utils.logging_utils import setup_logging
-from utils.db_utils import get_engine, save_to_db, save_to_db_non_dupe
-from scrapers.optioncarriere import scrape_optioncarriere
-from scrapers.keejob import scrape_keejob
-from utils.deduplicate_jobs import deduplicate_jobs_by_description
+from utils.db_utils import get_engine, pool_stats, JobWriter
+from scrapers.optioncarriere import iter_optioncarriere, parse_optioncarriere_job
+from scrapers.keejob import iter_keejob, parse_keejob_job
+from scrapers.fetcher import get_fetcher
+from scrapers.parse_pool import ParsePool
+from scrapers.scheduler import ScrapeScheduler
+from utils.dedup_index import DedupIndex
+from utils.seen_index import SeenIndex
+from utils.checkpoint import CheckpointStore
+from utils.schema import migrate
 
-def main():
-    """Main function to run the scraper."""
-    logger = setup_logging()
-    engine = get_engine(DATABASE_URL)
+# Scraper of each source, called as scraper(logger, Major, **kwargs) and yielding (page, jobs)
+SOURCES = {
+    'Optioncarriere': iter_optioncarriere,
+    'Keejob': iter_keejob,
+}
 
-    try:
-        Majors = ["Business", "Finance", "Marketing", "Information Technology", "Accounting", "comptabilité"]
-        all_jobs = []  # Initialize once outside the loop
+# Job page parser of each source, used to retry failed job URLs
+PARSERS = {
+    'Optioncarriere': parse_optioncarriere_job,
+    'Keejob': parse_keejob_job,
+}
+
+def scrape_to_writer(logger, Major, scraper, writer, source_name, **kwargs):
+    """Stream the pages of one (source, Major) scrape into the writer and return the job count."""
+    count = 0
+    for page, jobs in scraper(logger, Major, **kwargs):
+        writer.add(jobs, page=(source_name, Major, page))
+        count += len(jobs)
+    return count
+
+def retry_failed_urls(logger, checkpoint, writer, fetcher=None):
+    """Scrape the job URLs left in the retry table by earlier runs and return how many succeeded."""
+    retries = checkpoint.pending_retries()
+    if not retries:
+        return 0
+    fetcher = fetcher or get_fetcher()
+    logger.info(f"Retrying {len(retries)} failed job URLs")
 
-        # Step 1: Scrape job postings from all sources for each major
-        for Major in Majors:
-            logger.info(f" Currently working on {Major}  Major ")
-            optioncarriere_jobs = scrape_optioncarriere(logger,Major)
-            keejob_jobs = scrape_keejob(logger,Major)
-            all_jobs.extend(keejob_jobs + optioncarriere_jobs)  # Accumulate
+    # A URL failing under several Majors is fetched once
+    urls = sorted({url for _, _, url in retries})
+    pages = dict(zip(urls, fetcher.fetch_all(urls)))
+    recovered = []
+    for source, Major, url in retries:
+        job_html = pages[url]
+        if isinstance(job_html, Exception):
+            logger.error(f"Retry of {url} failed: {job_html}")
+            checkpoint.record_failure(source, Major, url, job_html)
+            continue
+        meta = PARSERS[source](job_html)
+        meta['Source'] = source
+        meta['Major'] = Major
+        meta['URL'] = url
+        writer.add([meta])
+        recovered.append((url, Major))
 
+    writer.flush()  # Only drop URLs from the retry table once their jobs are saved
+    for url, Major in recovered:
+        checkpoint.resolve(url, Major)
+    checkpoint.flush()
+    return len(recovered)
 
-        if not all_jobs:
-            logger.info("No jobs scraped. Exiting.")
-            return {"status": "success", "new_jobs_added": 0}
+def main(resume=False, parse_workers=PARSE_WORKERS, flush_size=DB_FLUSH_SIZE, flush_interval=DB_FLUSH_INTERVAL,
+         rebuild_dedup=False, dedup_jobs=DEDUP_JOBS):
+    """Main function to run the scraper.
 
-        # Step 2: Append all raw jobs to job_postings table
-        save_to_db(all_jobs, engine)
+    With `resume`, pages completed by the previous (interrupted) run are skipped.
+    With `rebuild_dedup`, every posting is deduplicated again instead of only the new ones.
+    Deduplication runs on `dedup_jobs` worker processes.
+    """
+    logger = setup_logging()
+    engine = get_engine(DATABASE_URL)
+
+    try:
+        migrate(engine)
+        seen = SeenIndex(engine)
+        checkpoint = CheckpointStore(engine, resume=resume)
+        Majors = ["Business", "Finance", "Marketing", "Information Technology", "Accounting", "comptabilité"]
 
-        # Step 3: Read all raw jobs from database
-        all_jobs_df = pd.read_sql("SELECT * FROM job_postings", engine)
+        # Steps 1-2: Scrape job postings from all sources for each major concurrently,
+        # appending them to the job_postings table in micro-batches as they come in
+        writer = JobWriter(engine, flush_size=flush_size, flush_interval=flush_interval,
+                           seen=seen, checkpoint=checkpoint)
+        with ParsePool(workers=parse_workers) as parse_pool, writer:
+            if retry_failed_urls(logger, checkpoint, writer):
+                seen.load()  # Treat the recovered URLs as known for the scrape below
+            scheduler = ScrapeScheduler(logger)
+            for Major in Majors:
+                for source, scraper in SOURCES.items():
+                    scheduler.add(source, Major, scrape_to_writer, scraper=scraper, writer=writer, source_name=source,
+                                  seen=seen, parse_pool=parse_pool, checkpoint=checkpoint)
+            scheduler.run()
+        checkpoint.flush()
 
-        # Step 4: Deduplicate based on job description
-        non_dupe_jobs = deduplicate_jobs_by_description(all_jobs_df)
+        if not writer.saved:
+            logger.info("No jobs scraped.")
 
-        # Step 5: Replace deduplicated results in another table
-        save_to_db_non_dupe(non_dupe_jobs, engine)
+        # Steps 3-5: Deduplicate the new postings by description against the persisted
+        # index of earlier runs and append the ones to keep to the non-dupe table. This
+        # runs even when nothing was scraped, so postings saved by an interrupted run, or
+        # by a run whose deduplication failed, are deduplicated now
+        dedup_index = DedupIndex(engine, n_jobs=dedup_jobs)
+        dedup = dedup_index.rebuild() if rebuild_dedup else dedup_index.update()
 
-        return {"status": "success", "new_jobs_added": len(all_jobs)}
+        logger.info(f"Database pool: {pool_stats(engine)}")
+        return {"status": "success", "new_jobs_added": writer.saved, "non_dupe_jobs_added": dedup['kept']}
 
     except Exception as e:
         logger.error(f"Error in main function: {e}")
         return {"status": "error", "message": str(e)}
 
 if __name__ == "__main__":
-    result = main()
+    parser = argparse.ArgumentParser(description="Scrape job postings and deduplicate them.")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip pages completed by the previous, interrupted run")
+    parser.add_argument('--rebuild-dedup', action='store_true',
+                        help="deduplicate every stored posting again instead of only the new ones")
+    parser.add_argument('--dedup-jobs', type=int, default=DEDUP_JOBS,
+                        help="worker processes used to deduplicate postings (default: %(default)s)")
+    args = parser.parse_args()
+    result = main(resume=args.resume, rebuild_dedup=args.rebuild_dedup, dedup_jobs=args.dedup_jobs)
     print(json.dumps(result, default=str))
@@ -0,0 +1,172 @@
+# scrapers/fetcher.py
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import (FETCH_MAX_CONNECTIONS, FETCH_MAX_PER_HOST, FETCH_DELAY, FETCH_TIMEOUT,
+                           FETCH_GLOBAL_RATE, FETCH_RETRIES, FETCH_BACKOFF,
+                           HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES)
+from scrapers.http_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying after a backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` acquisitions per second with bursts of `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """Shared HTTP fetch layer with a pooled session, per-host concurrency limits and politeness delays.
+
+    `get` is a blocking call; `fetch`/`gather` are the asyncio entry points and
+    `fetch_all` runs a batch of URLs concurrently from synchronous code.
+    An optional ResponseCache serves fresh pages locally and revalidates stale ones.
+
+    `delay` is the per-host rate budget and `rate` the global one (requests per
+    second across all hosts, None for unlimited). Connection errors, timeouts and
+    429/5xx responses are retried `retries` times with exponential backoff.
+    """
+
+    def __init__(self, max_connections=FETCH_MAX_CONNECTIONS, max_per_host=FETCH_MAX_PER_HOST,
+                 delay=FETCH_DELAY, timeout=FETCH_TIMEOUT, session=None, cache=None,
+                 rate=FETCH_GLOBAL_RATE, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+        self.cache = cache
+        self.rate_limiter = RateLimiter(rate) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.session = session or self._build_session(max_connections)
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='fetch')
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._host_next_request = {}
+
+    @staticmethod
+    def _build_session(max_connections):
+        """Create a keep-alive session whose connection pool matches the concurrency."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @contextmanager
+    def _host_slot(self, host):
+        """Hold one of the `max_per_host` slots of a host and wait for its politeness delay."""
+        with self._lock:
+            slot = self._host_slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        with slot:
+            with self._lock:
+                now = time.monotonic()
+                start_at = max(now, self._host_next_request.get(host, now))
+                self._host_next_request[host] = start_at + self.delay
+            if start_at > now:
+                time.sleep(start_at - now)
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            yield
+
+    def get(self, url):
+        """Fetch a URL and return its body, raising requests.RequestException on failure."""
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and self.cache.is_fresh(url, entry):
+            logger.debug(f"Cache hit {url}")
+            return entry['body']
+
+        headers = ResponseCache.revalidation_headers(entry)
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            try:
+                with self._host_slot(host):
+                    logger.debug(f"GET {url}")
+                    response = self.session.get(url, timeout=self.timeout, headers=headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    break
+                logger.warning(f"HTTP {response.status_code} for {url}, retrying (attempt {attempt + 1})")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"{e} for {url}, retrying (attempt {attempt + 1})")
+            time.sleep(self.backoff * 2 ** attempt)
+        if entry and response.status_code == 304:
+            logger.debug(f"Not modified {url}")
+            self.cache.refresh(url, entry)
+            return entry['body']
+        response.raise_for_status()
+        if self.cache:
+            self.cache.store(url, response.text,
+                             etag=response.headers.get('ETag'),
+                             last_modified=response.headers.get('Last-Modified'))
+        return response.text
+
+    async def fetch(self, url):
+        """Fetch a URL without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get, url)
+
+    async def gather(self, urls):
+        """Fetch URLs concurrently; failures are returned in place of the body."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+
+    def fetch_all(self, urls):
+        """Fetch URLs concurrently from synchronous code.
+
+        Returns a list aligned with `urls` holding either the page body or the
+        exception raised while fetching it.
+        """
+        urls = list(urls)
+        if not urls:
+            return []
+        return asyncio.run(self.gather(urls))
+
+    def close(self):
+        """Release the worker threads and pooled connections."""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Return the process-wide fetcher shared by all scrapers."""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            cache = ResponseCache(HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES) if HTTP_CACHE_DIR else None
+            _default_fetcher = Fetcher(cache=cache)
+        return _default_fetcher
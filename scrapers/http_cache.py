@@ -0,0 +1,130 @@
+# scrapers/http_cache.py
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# (URL pattern, seconds a cached response is used without revalidation).
+# Listing pages change as postings come and go; a detail page rarely changes.
+DEFAULT_TTL_RULES = [
+    (r'keejob\.com/offres-emploi/\?', HOUR),
+    (r'optioncarriere\.tn/emploi\?', HOUR),
+    (r'.*', 30 * DAY),
+]
+
+
+class ResponseCache:
+    """On-disk HTTP response cache with per-pattern TTLs, conditional revalidation and size-based eviction.
+
+    Entries younger than their TTL are served without a request. Older entries
+    are revalidated with If-None-Match / If-Modified-Since so an unchanged page
+    costs a 304 instead of a full download. When the cache grows beyond
+    `max_bytes` the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, ttl_rules=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in (ttl_rules or DEFAULT_TTL_RULES)]
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = {
+            entry.path: entry.stat().st_size
+            for entry in os.scandir(directory)
+            if entry.name.endswith('.json')
+        }
+        self._total_bytes = sum(self._sizes.values())
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def ttl_for(self, url):
+        """Return the TTL in seconds of the first rule matching the URL."""
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return 0
+
+    def lookup(self, url):
+        """Return the cached entry for a URL, or None."""
+        path = self._path(url)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # Mark as recently used for eviction
+        return entry
+
+    def is_fresh(self, url, entry):
+        """Return True if the entry can be used without revalidation."""
+        return time.time() - entry['stored_at'] < self.ttl_for(url)
+
+    @staticmethod
+    def revalidation_headers(entry):
+        """Return the conditional request headers for a cached entry."""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Cache a response body."""
+        self._write(url, {
+            'url': url,
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time(),
+        })
+
+    def refresh(self, url, entry):
+        """Restart the TTL of an entry after a 304 Not Modified."""
+        self._write(url, dict(entry, stored_at=time.time()))
+
+    def _write(self, url, entry):
+        path = self._path(url)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += os.path.getsize(path) - self._sizes.get(path, 0)
+            self._sizes[path] = os.path.getsize(path)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        by_age = sorted(self._sizes, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in by_age:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._total_bytes -= self._sizes.pop(path)
+            logger.debug(f"Evicted cached response {path}")
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            for path in list(self._sizes):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._sizes.clear()
+            self._total_bytes = 0
@@ -1,7 +1,9 @@
 import requests
-from bs4 import BeautifulSoup
 import dateparser
 from utils.text_utils import remove_extra_spaces
+from scrapers.fetcher import get_fetcher
+from scrapers.parsing import TagStrainer, make_soup
+from scrapers.listing import iter_listing_jobs
 import re
 import logging
 from datetime import datetime
@@ -10,72 +12,77 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def scrape_keejob(logger,Major):
+SOURCE = 'Keejob'
+
+# Only the subtrees read by scrape_keejob and extract_keejob_meta are built
+LISTING_STRAINER = TagStrainer({'nav': ['nav-pagination'], 'div': ['block_b row-fluid']})
+JOB_STRAINER = TagStrainer({
+    'h1': None,
+    'div': ['span9 content', 'block_a span12 no-margin-left', 'meta'],
+})
+SECTOR_LABEL = re.compile('Secteur:')
+SIZE_LABEL = re.compile('Taille:')
+
+def scrape_keejob(logger,Major, **kwargs):
     """Scrape job postings from Keejob."""
+    job_data = [meta for _, jobs in iter_keejob(logger, Major, **kwargs) for meta in jobs]
+    logger.info(f"Scraping completed. Total jobs collected: {len(job_data)}")
+    return job_data
+
+def iter_keejob(logger,Major, fetcher=None, seen=None, parse_pool=None, checkpoint=None):
+    """Scrape job postings from Keejob, yielding (page number, jobs) as each listing page completes.
+
+    See `iter_listing_jobs` for the fetch and parse stages, the SeenIndex and the CheckpointStore.
+    """
+    fetcher = fetcher or get_fetcher()
     parent_url = f"https://www.keejob.com/offres-emploi/?keywords={Major}&page={{i}}"
     logger.info("Starting Keejob scraping process")
     
     try:
         logger.debug(f"Fetching first page: {parent_url.format(i=1)}")
-        response = requests.get(parent_url.format(i=1), timeout=10 ,    )
-        response.raise_for_status()
-        parent_soup = BeautifulSoup(response.text, 'html5lib')
-        
-        pagination_nav = parent_soup.find("nav", class_="nav-pagination")
-        num_pages = 1
-        if pagination_nav:
-            page_links = pagination_nav.find('a', class_='page-link')
-            if page_links:
-                last_page_text = page_links.get("aria-label", "").split()[-1]
-                try:
-                    num_pages = int(last_page_text)
-                    logger.info(f"Found {num_pages} pages to scrape")
-                except ValueError:
-                    logger.warning("Could not extract number of pages from Keejob")
+        parent_soup = make_soup(fetcher.get(parent_url.format(i=1)), LISTING_STRAINER)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching initial page: {str(e)}")
+        return
         
-        job_data = []
-
-        for i in range(1, num_pages + 1):
-            url = parent_url.format(i=i)
-            logger.info(f"Scraping page {i}/{num_pages}: {url}")
+    pagination_nav = parent_soup.find("nav", class_="nav-pagination")
+    num_pages = 1
+    if pagination_nav:
+        page_links = pagination_nav.find('a', class_='page-link')
+        if page_links:
+            last_page_text = page_links.get("aria-label", "").split()[-1]
             try:
-                response = requests.get(url, timeout=10,  )
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html5lib')
-                job_container = soup.find("div", class_="block_b row-fluid")
-                
-                if job_container:
-                    job_links = job_container.find_all("a", style="color: #005593;")
-                    logger.debug(f"Found {len(job_links)} job links on page {i}")
-                    for anchor in job_links:
-                        abs_url = 'https://www.keejob.com' + anchor['href']
-                        logger.debug(f"Fetching job posting: {abs_url}")
-                        try:
-                            job_response = requests.get(abs_url, timeout=10,   )
-                            job_response.raise_for_status()
-                            job_soup = BeautifulSoup(job_response.text, 'html5lib')
-                            meta = extract_keejob_meta(job_soup)
-                            meta['Source'] = 'Keejob'
-                            meta['Major'] = Major
-                          
+                num_pages = int(last_page_text)
+                logger.info(f"Found {num_pages} pages to scrape")
+            except ValueError:
+                logger.warning("Could not extract number of pages from Keejob")
 
-                            job_data.append(meta)
-                            logger.info(f"Successfully scraped job posting: {meta.get('JobTitle', 'Unknown')}")
-                        except requests.RequestException as e:
-                            logger.error(f"Error fetching job URL {abs_url}: {str(e)}")
-                            continue
-                else:
-                    logger.warning(f"No job container found on page {i}")
-            except requests.RequestException as e:
-                logger.error(f"Error fetching page {url}: {str(e)}")
-                continue
-        
-        logger.info(f"Scraping completed. Total jobs collected: {len(job_data)}")
-        return job_data
-    
-    except requests.RequestException as e:
-        logger.error(f"Error fetching initial page: {str(e)}")
-        return []
+    def listing_urls(i):
+        url = parent_url.format(i=i)
+        logger.info(f"Scraping page {i}/{num_pages}: {url}")
+        try:
+            soup = parent_soup if i == 1 else make_soup(fetcher.get(url), LISTING_STRAINER)
+        except requests.RequestException as e:
+            logger.error(f"Error fetching page {url}: {str(e)}")
+            return None
+        job_container = soup.find("div", class_="block_b row-fluid")
+        if not job_container:
+            logger.warning(f"No job container found on page {i}")
+            return None
+
+        job_links = job_container.find_all("a", style="color: #005593;")
+        logger.debug(f"Found {len(job_links)} job links on page {i}")
+        return ['https://www.keejob.com' + anchor['href'] for anchor in job_links]
+
+    for i, job_data in iter_listing_jobs(logger, SOURCE, Major, num_pages, listing_urls, parse_keejob_job, fetcher,
+                                         seen=seen, parse_pool=parse_pool, checkpoint=checkpoint):
+        for meta in job_data:
+            logger.info(f"Successfully scraped job posting: {meta.get('JobTitle', 'Unknown')}")
+        yield i, job_data
+
+def parse_keejob_job(html):
+    """Parse a Keejob job page into its meta information (runs in parse workers)."""
+    return extract_keejob_meta(make_soup(html, JOB_STRAINER))
 
 def extract_keejob_meta(soup):
     """Extract meta information from Keejob job posting."""
@@ -85,21 +92,22 @@ def extract_keejob_meta(soup):
     try:
         content_div = soup.find('div', class_='span9 content')
         if content_div:
-            entreprise = content_div.find('b').find('a') if content_div.find('b') else None
+            first_b = content_div.find('b')
+            entreprise = first_b.find('a') if first_b else None
             meta_info['Entreprise'] = remove_extra_spaces(entreprise.text if entreprise else None)
             logger.debug(f"Extracted entreprise: {meta_info.get('Entreprise')}")
             
-            sector_b = content_div.find("b", text=re.compile('Secteur:')) if content_div else None
+            sector_b = content_div.find("b", string=SECTOR_LABEL)
             meta_info['Sector'] = remove_extra_spaces(sector_b.next_sibling.strip() if sector_b else None)
             logger.debug(f"Extracted sector: {meta_info.get('Sector')}")
             
-            size_b = content_div.find("b", text=re.compile('Taille:')) if content_div else None
+            size_b = content_div.find("b", string=SIZE_LABEL)
             meta_info['Size'] = remove_extra_spaces(size_b.next_sibling.strip() if size_b else None)
             logger.debug(f"Extracted size: {meta_info.get('Size')}")
         
         description_div = soup.find('div', class_="block_a span12 no-margin-left")
         meta_info['Description'] = remove_extra_spaces(description_div.get_text().replace('\xa0', ' ') if description_div else None)
-        logger.debug(f"Extracted description length: {len(meta_info.get('Description', ''))}")
+        logger.debug(f"Extracted description length: {len(meta_info['Description'] or '')}")
         
         meta_divs = soup.find_all("div", class_="meta")
         for meta_div in meta_divs:
@@ -0,0 +1,56 @@
+# scrapers/listing.py
+from itertools import groupby
+
+import requests
+
+from scrapers.parse_pool import ParsePool
+
+
+def iter_listing_jobs(logger, source, Major, num_pages, listing_urls, parse_job, fetcher,
+                      seen=None, parse_pool=None, checkpoint=None):
+    """Scrape the job pages linked from listing pages 1 to `num_pages`, yielding (page number, jobs) per page.
+
+    `listing_urls(i)` returns the job URLs of listing page i, or None if the page
+    cannot be read. Job pages are fetched concurrently and parsed by
+    `parse_job` in `parse_pool` (inline if None). If a SeenIndex is given, job
+    URLs already scraped for `Major` are skipped and pagination stops at the
+    first listing page that only contains known jobs. If a CheckpointStore is
+    given, pages completed by a resumed run are skipped and job URLs that
+    cannot be fetched go to its retry table.
+    """
+    parse_pool = parse_pool or ParsePool(workers=0)
+
+    def fetch_job_pages():
+        """Fetch stage: yield ((page, job URL), html) for every job page to parse."""
+        for i in range(1, num_pages + 1):
+            if checkpoint is not None and checkpoint.is_done(source, Major, i):
+                logger.info(f"Page {i} already completed, skipping")
+                continue
+            job_urls = listing_urls(i)
+            if job_urls is None:
+                continue
+            if seen is not None:
+                new_urls = [job_url for job_url in job_urls if (job_url, Major) not in seen]
+                if job_urls and not new_urls:
+                    logger.info(f"Page {i} only contains known jobs, stopping")
+                    return
+                job_urls = new_urls
+            for abs_url, job_html in zip(job_urls, fetcher.fetch_all(job_urls)):
+                if isinstance(job_html, requests.RequestException):
+                    logger.error(f"Error fetching job URL {abs_url}: {job_html}")
+                    if checkpoint is not None:
+                        checkpoint.record_failure(source, Major, abs_url, job_html)
+                    continue
+                if isinstance(job_html, Exception):
+                    raise job_html
+                yield (i, abs_url), job_html
+
+    parsed = parse_pool.map(parse_job, fetch_job_pages())
+    for i, page_jobs in groupby(parsed, key=lambda item: item[0][0]):
+        job_data = []
+        for (_, abs_url), meta in page_jobs:
+            meta['Source'] = source
+            meta['Major'] = Major
+            meta['URL'] = abs_url
+            job_data.append(meta)
+        yield i, job_data
@@ -1,39 +1,82 @@
 # scrapers/optioncarriere.py
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import re
 from utils.text_utils import remove_extra_spaces
+from scrapers.fetcher import get_fetcher
+from scrapers.parsing import TagStrainer, make_soup
+from scrapers.listing import iter_listing_jobs
 from datetime import datetime
 
 today_date = datetime.now()
-def find_number_of_pages(parent_url, logger):
-    """Find the number of pages to scrape."""
-    page_number = 1
-    while True:
-        url = parent_url.format(i=page_number)
+
+SOURCE = 'Optioncarriere'
+
+# Only the subtrees read by the scraper and extract_optioncarriere_meta are built
+LISTING_STRAINER = TagStrainer({'p': ['mb-2'], 'article': ['job clicky']})
+JOB_STRAINER = TagStrainer({
+    'h1': None,
+    'p': ['company'],
+    'section': ['content'],
+    'ul': ['details', 'tags'],
+})
+DAYS_AGO = re.compile(r'Il y a (\d+) jours?(?:\s|$)')
+HOURS_AGO = re.compile(r'Il y a (\d+) heures?(?:\s|$)')
+MONTHS_AGO = re.compile(r'Il y a (\d+) mois')
+
+def has_job_results(soup):
+    """Return True if a listing page contains job postings."""
+    no_results = soup.find('p', class_='mb-2', string='Aucun résultat. Veuillez modifier votre recherche.')
+    return not no_results and bool(soup.find_all('article', class_='job clicky'))
+
+def find_number_of_pages(parent_url, logger, fetcher=None, pages=None):
+    """Find the number of pages to scrape.
+
+    Probes pages 1, 2, 4, 8... until one comes back empty, then binary searches
+    between the last full and the first empty page. Every listing page found
+    with results is kept in `pages` (page number -> soup) so it is not fetched twice.
+    """
+    fetcher = fetcher or get_fetcher()
+    pages = {} if pages is None else pages
+
+    def probe(page_number):
+        logger.info(f"Checking page {page_number}..   ")
         try:
-            response = requests.get(url, timeout=10,  )
-            response.raise_for_status()
-            parent_soup = BeautifulSoup(response.text, 'html5lib')
-            no_results = parent_soup.find('p', class_='mb-2', string='Aucun résultat. Veuillez modifier votre recherche.')
-            if no_results or not parent_soup.find_all('article', class_='job clicky'):
-                return page_number - 1
-            page_number += 1
-            logger.info(f"Checking page {page_number}..   ")
+            soup = make_soup(fetcher.get(parent_url.format(i=page_number)), LISTING_STRAINER)
         except requests.RequestException as e:
             logger.error(f"Error fetching page {page_number}: {e}")
-            return page_number - 1
+            return False
+        if not has_job_results(soup):
+            return False
+        pages[page_number] = soup
+        return True
+
+    if not probe(1):
+        return 0
+
+    last_full, first_empty = 1, 2
+    while probe(first_empty):
+        last_full, first_empty = first_empty, first_empty * 2
+
+    while first_empty - last_full > 1:
+        middle = (last_full + first_empty) // 2
+        if probe(middle):
+            last_full = middle
+        else:
+            first_empty = middle
+    return last_full
 
 def extract_optioncarriere_meta(soup):
     """Extract meta information from Optioncarriere job posting."""
     meta_info = {}
-    meta_info['Entreprise'] = remove_extra_spaces(soup.find('p', class_='company').text if soup.find('p', class_='company') else None)
+    company = soup.find('p', class_='company')
+    meta_info['Entreprise'] = remove_extra_spaces(company.text if company else None)
     meta_info['Sector'] = None
     meta_info['Size'] = None
-    description = soup.find('section', class_="content").get_text()
-    meta_info['Description'] = remove_extra_spaces(description.replace('\xa0', ' '))
-    meta_info['JobTitle'] = remove_extra_spaces(soup.find('h1').text if soup.find('h1') else None)
+    description = soup.find('section', class_="content")
+    meta_info['Description'] = remove_extra_spaces(description.get_text().replace('\xa0', ' ') if description else None)
+    job_title = soup.find('h1')
+    meta_info['JobTitle'] = remove_extra_spaces(job_title.text if job_title else None)
     
     details_ul = soup.find('ul', class_='details')
     if details_ul:
@@ -47,12 +90,13 @@ def extract_optioncarriere_meta(soup):
     # Fixed date published parsing section
     tags_ul = soup.find('ul', class_='tags')
     if tags_ul:
-        published_text = tags_ul.find('span', class_='badge badge-r badge-s').text.strip() if tags_ul.find('span', class_='badge badge-r badge-s') else None
+        badge = tags_ul.find('span', class_='badge badge-r badge-s')
+        published_text = badge.text.strip() if badge else None
         if published_text and "Il y a" in published_text:
             # Match different time patterns
-            days_match = re.search(r'Il y a (\d+) jours?(?:\s|$)', published_text)
-            hours_match = re.search(r'Il y a (\d+) heures?(?:\s|$)', published_text)
-            months_match = re.search(r'Il y a (\d+) mois', published_text)
+            days_match = DAYS_AGO.search(published_text)
+            hours_match = HOURS_AGO.search(published_text)
+            months_match = MONTHS_AGO.search(published_text)
             
             if days_match:
                 days = int(days_match.group(1))
@@ -81,31 +125,38 @@ def extract_optioncarriere_meta(soup):
     meta_info['Langues'] = None
     return meta_info
 
-def scrape_optioncarriere(logger,Major):
+def parse_optioncarriere_job(html):
+    """Parse an Optioncarriere job page into its meta information (runs in parse workers)."""
+    return extract_optioncarriere_meta(make_soup(html, JOB_STRAINER))
+
+def scrape_optioncarriere(logger,Major, **kwargs):
     """Scrape job postings from Optioncarriere."""
+    return [meta for _, jobs in iter_optioncarriere(logger, Major, **kwargs) for meta in jobs]
+
+def iter_optioncarriere(logger,Major, fetcher=None, seen=None, parse_pool=None, checkpoint=None):
+    """Scrape job postings from Optioncarriere, yielding (page number, jobs) as each listing page completes.
+
+    See `iter_listing_jobs` for the fetch and parse stages, the SeenIndex and the CheckpointStore.
+    """
+    fetcher = fetcher or get_fetcher()
     parent_url = f"https://www.optioncarriere.tn/emploi?s={Major}&l=Tunisie&p={{i}}"
-    num_pages = find_number_of_pages(parent_url, logger)
+    pages = {}
+    num_pages = find_number_of_pages(parent_url, logger, fetcher, pages)
     logger.info(f"Number of pages to scrape from Optioncarriere: {num_pages}")
-    
-    job_data = []
-    for i in range(1, num_pages + 1):
+
+    def listing_urls(i):
         url = parent_url.format(i=i)
-        try:
-            response = requests.get(url, timeout=10,   )
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html5lib')
-            job_containers = soup.find_all("article", class_="job clicky")
-            for anchor in job_containers:
-                abs_url = 'https://www.optioncarriere.tn' + anchor['data-url']
-                job_response = requests.get(abs_url, timeout=10,  )
-                job_response.raise_for_status()
-                job_soup = BeautifulSoup(job_response.text, 'html5lib')
-                meta = extract_optioncarriere_meta(job_soup)
-                meta['Source'] = 'Optioncarriere'
-                meta['Major'] = Major
-
-                job_data.append(meta)
-        except requests.RequestException as e:
-            logger.error(f"Error fetching URL {url}: {e}")
-            continue
-    return job_data
\ No newline at end of file
+        if i in pages:
+            soup = pages.pop(i)
+        else:
+            # Fetched one at a time, so a page of known jobs ends pagination
+            try:
+                soup = make_soup(fetcher.get(url), LISTING_STRAINER)
+            except requests.RequestException as e:
+                logger.error(f"Error fetching URL {url}: {e}")
+                return None
+        job_containers = soup.find_all("article", class_="job clicky")
+        return ['https://www.optioncarriere.tn' + anchor['data-url'] for anchor in job_containers]
+
+    yield from iter_listing_jobs(logger, SOURCE, Major, num_pages, listing_urls, parse_optioncarriere_job, fetcher,
+                                 seen=seen, parse_pool=parse_pool, checkpoint=checkpoint)
@@ -0,0 +1,65 @@
+# scrapers/parse_pool.py
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config.config import PARSE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class ParsePool:
+    """CPU-bound parse/extract stage of the scrape pipeline.
+
+    With more than one worker the work runs in a ProcessPoolExecutor; otherwise
+    it runs inline. Workers are started by a forkserver where available, since
+    they are created on first use, while fetch, writer and scrape threads hold
+    locks a forked child would copy. At most `max_pending` items are in flight, so the fetch stage
+    feeding `map` is only pulled as fast as pages are parsed and memory stays flat.
+    """
+
+    def __init__(self, workers=PARSE_WORKERS, max_pending=None):
+        self.workers = workers
+        self.max_pending = max_pending or max(workers, 1) * 4
+        self._executor = (ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context())
+                          if workers > 1 else None)
+        if self._executor:
+            logger.info(f"Parsing pages with {workers} worker processes")
+
+    def map(self, func, items):
+        """Apply `func` to the payload of each (key, payload) item.
+
+        Yields (key, func(payload)) in input order. `func` must be a module-level
+        function so it can be sent to the worker processes.
+        """
+        if self._executor is None:
+            for key, payload in items:
+                yield key, func(payload)
+            return
+
+        pending = deque()
+        for key, payload in items:
+            pending.append((key, self._executor.submit(func, payload)))
+            if len(pending) >= self.max_pending:
+                key, future = pending.popleft()
+                yield key, future.result()
+        while pending:
+            key, future = pending.popleft()
+            yield key, future.result()
+
+    def close(self):
+        """Shut the worker processes down."""
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
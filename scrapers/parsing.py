@@ -0,0 +1,38 @@
+# scrapers/parsing.py
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+
+class TagStrainer(SoupStrainer):
+    """SoupStrainer that only builds the subtrees rooted at the given targets.
+
+    `targets` maps a tag name to the class attribute values to keep, or to None
+    to keep every tag with that name. A class value matches either the whole
+    attribute (e.g. "span9 content") or a single class (e.g. "meta"), mirroring
+    how `soup.find(name, class_=...)` matches.
+    """
+
+    def __init__(self, targets):
+        self.targets = {name: set(classes) if classes else None for name, classes in targets.items()}
+        super().__init__(name=list(self.targets))
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        if name not in self.targets:
+            return False
+        classes = self.targets[name]
+        if classes is None:
+            return True
+        value = (attrs or {}).get('class') or ''
+        if isinstance(value, list):
+            value = ' '.join(value)
+        return value in classes or any(c in classes for c in value.split())
+
+
+def make_soup(html, strainer=None):
+    """Parse HTML with the fastest available tree builder, optionally keeping only the strained subtrees."""
+    return BeautifulSoup(html, PARSER, parse_only=strainer)
@@ -0,0 +1,126 @@
+# scrapers/scheduler.py
+import heapq
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config.config import SCRAPE_MAX_TASKS, SCRAPE_TASK_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeTask:
+    """One (source, Major) scrape and its progress."""
+
+    def __init__(self, source, major, func, kwargs=None):
+        self.source = source
+        self.major = major
+        self.func = func
+        self.kwargs = kwargs or {}
+        self.attempts = 0
+        self.status = 'pending'
+        self.started = None
+        self.elapsed = None
+        self.jobs = 0
+        self.error = None
+
+    @property
+    def name(self):
+        return f"{self.source}/{self.major}"
+
+
+class ScrapeScheduler:
+    """Runs scrape tasks concurrently with a retry queue and per-task progress reporting.
+
+    Request rates are enforced by the shared Fetcher (per-host delay and global
+    budget), so running more tasks at once never exceeds what a site is sent.
+    A task that raises is put back in the retry queue and started again after
+    `backoff * 2 ** (attempt - 1)` seconds, up to `max_retries` times.
+    """
+
+    def __init__(self, logger=logger, max_tasks=SCRAPE_MAX_TASKS, max_retries=SCRAPE_TASK_RETRIES, backoff=30):
+        self.logger = logger
+        self.max_tasks = max_tasks
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.tasks = []
+
+    def add(self, source, major, func, **kwargs):
+        """Queue `func(logger, major, **kwargs)` as a task.
+
+        `func` returns either the scraped jobs or, if it streams them elsewhere, their count.
+        """
+        task = ScrapeTask(source, major, func, kwargs)
+        self.tasks.append(task)
+        return task
+
+    def _run_task(self, task):
+        task.attempts += 1
+        task.status = 'running'
+        task.started = time.monotonic()
+        self.logger.info(f"[{task.name}] started (attempt {task.attempts})")
+        return task.func(self.logger, task.major, **task.kwargs)
+
+    def run(self, on_result=None):
+        """Run every queued task and return {task name: result}.
+
+        `on_result(task, result)` is called from the scheduling thread as each
+        task finishes. Tasks that still fail after their retries are reported
+        with status 'failed' and left out of the results.
+        """
+        results = {}
+        retry_queue = []  # heap of (ready at, sequence, task)
+        running = {}
+        ready = list(self.tasks)
+        sequence = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_tasks, thread_name_prefix='scrape') as executor:
+            while ready or retry_queue or running:
+                now = time.monotonic()
+                while retry_queue and retry_queue[0][0] <= now:
+                    ready.append(heapq.heappop(retry_queue)[2])
+                while ready and len(running) < self.max_tasks:
+                    task = ready.pop(0)
+                    running[executor.submit(self._run_task, task)] = task
+
+                timeout = max(retry_queue[0][0] - now, 0) if retry_queue else None
+                if not running:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    task = running.pop(future)
+                    task.elapsed = time.monotonic() - task.started
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        task.error = e
+                        if task.attempts <= self.max_retries:
+                            delay = self.backoff * 2 ** (task.attempts - 1)
+                            task.status = 'retrying'
+                            sequence += 1
+                            heapq.heappush(retry_queue, (time.monotonic() + delay, sequence, task))
+                            self.logger.warning(f"[{task.name}] failed: {e}; retrying in {delay:.0f}s")
+                        else:
+                            task.status = 'failed'
+                            self.logger.error(f"[{task.name}] failed after {task.attempts} attempts: {e}")
+                        continue
+
+                    task.status = 'done'
+                    if isinstance(result, int):
+                        task.jobs = result  # Streaming tasks return their job count
+                    else:
+                        task.jobs = len(result) if result is not None else 0
+                    results[task.name] = result
+                    if on_result:
+                        on_result(task, result)
+                    self.logger.info(
+                        f"[{task.name}] done: {task.jobs} jobs in {task.elapsed:.1f}s "
+                        f"({len(results)}/{len(self.tasks)} tasks done)"
+                    )
+
+        failed = [task.name for task in self.tasks if task.status == 'failed']
+        if failed:
+            self.logger.error(f"Tasks failed: {', '.join(failed)}")
+        return results
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock
+import threading
+import time
+import requests
+from scrapers.fetcher import Fetcher
+
+class TestFetcher(unittest.TestCase):
+    def setUp(self):
+        self.session = MagicMock()
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+        def get(url, timeout, headers=None):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.02)
+            with self.lock:
+                self.active -= 1
+            response = MagicMock(text=f"body of {url}")
+            if url.endswith('/missing'):
+                response.raise_for_status.side_effect = requests.HTTPError("404")
+            return response
+
+        self.session.get.side_effect = get
+
+    def test_fetch_all_preserves_order_and_returns_errors(self):
+        fetcher = Fetcher(max_connections=4, max_per_host=4, delay=0, session=self.session)
+        urls = ['https://a.example/1', 'https://a.example/missing', 'https://b.example/2']
+        result = fetcher.fetch_all(urls)
+
+        self.assertEqual(result[0], 'body of https://a.example/1')
+        self.assertIsInstance(result[1], requests.HTTPError)
+        self.assertEqual(result[2], 'body of https://b.example/2')
+
+    def test_per_host_limit(self):
+        fetcher = Fetcher(max_connections=8, max_per_host=2, delay=0, session=self.session)
+        fetcher.fetch_all([f'https://a.example/{i}' for i in range(8)])
+
+        self.assertEqual(self.peak, 2)
+
+    def test_politeness_delay(self):
+        fetcher = Fetcher(max_connections=4, max_per_host=4, delay=0.05, session=self.session)
+        start = time.monotonic()
+        fetcher.fetch_all([f'https://a.example/{i}' for i in range(3)])
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_retries_server_errors(self):
+        statuses = [503, 503, 200]
+        self.session.get.side_effect = lambda url, timeout, headers=None: MagicMock(
+            status_code=statuses.pop(0), text='ok')
+        fetcher = Fetcher(delay=0, session=self.session, retries=2, backoff=0)
+
+        self.assertEqual(fetcher.get('https://a.example/1'), 'ok')
+        self.assertEqual(self.session.get.call_count, 3)
+
+    def test_global_rate(self):
+        fetcher = Fetcher(max_connections=4, max_per_host=4, delay=0, session=self.session, rate=20)
+        fetcher.rate_limiter._tokens = 0
+        start = time.monotonic()
+        fetcher.fetch_all([f'https://host{i}.example/' for i in range(3)])
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_fetch_all_empty(self):
+        fetcher = Fetcher(delay=0, session=self.session)
+        self.assertEqual(fetcher.fetch_all([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import tempfile
+import time
+from scrapers.http_cache import ResponseCache, HOUR, DAY
+from scrapers.fetcher import Fetcher
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmpdir.name)
+        self.listing_url = "https://www.keejob.com/offres-emploi/?keywords=Business&page=1"
+        self.job_url = "https://www.keejob.com/offres-emploi/123/detail/"
+        self.session = MagicMock()
+        self.fetcher = Fetcher(delay=0, session=self.session, cache=self.cache)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def response(self, status_code=200, text='<html>page</html>', headers=None):
+        return MagicMock(status_code=status_code, text=text, headers=headers or {})
+
+    def test_ttl_rules(self):
+        self.assertEqual(self.cache.ttl_for(self.listing_url), HOUR)
+        self.assertEqual(self.cache.ttl_for(self.job_url), 30 * DAY)
+
+    def test_fresh_entry_is_served_without_request(self):
+        self.session.get.return_value = self.response(headers={'ETag': '"v1"'})
+        self.assertEqual(self.fetcher.get(self.job_url), '<html>page</html>')
+        self.assertEqual(self.fetcher.get(self.job_url), '<html>page</html>')
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_stale_entry_is_revalidated(self):
+        self.cache.store(self.listing_url, '<html>old</html>', etag='"v1"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+        entry = self.cache.lookup(self.listing_url)
+        self.cache._write(self.listing_url, dict(entry, stored_at=time.time() - 2 * HOUR))
+        self.session.get.return_value = self.response(status_code=304, text='')
+
+        self.assertEqual(self.fetcher.get(self.listing_url), '<html>old</html>')
+        headers = self.session.get.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.assertTrue(self.cache.is_fresh(self.listing_url, self.cache.lookup(self.listing_url)))
+
+    def test_eviction_by_size(self):
+        cache = ResponseCache(self.tmpdir.name, max_bytes=1500)
+        for i in range(5):
+            cache.store(f"https://example.com/{i}", 'x' * 500)
+            time.sleep(0.01)
+        files = [f for f in os.listdir(self.tmpdir.name) if f.endswith('.json')]
+
+        self.assertLessEqual(cache._total_bytes, 1500)
+        self.assertEqual(len(files), len(cache._sizes))
+        self.assertIsNone(cache.lookup("https://example.com/0"))
+        self.assertIsNotNone(cache.lookup("https://example.com/4"))
+
+if __name__ == '__main__':
+    unittest.main()
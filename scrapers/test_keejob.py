@@ -1,14 +1,22 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
 import logging
-from scrapers.keejob import scrape_keejob, extract_keejob_meta
+from scrapers.keejob import scrape_keejob, iter_keejob, extract_keejob_meta, JOB_STRAINER
+from scrapers.parsing import make_soup
+from scrapers.parse_pool import ParsePool
+from scrapers.fetcher import Fetcher
+from sqlalchemy import create_engine
+from utils.seen_index import SeenIndex
+from utils.checkpoint import CheckpointStore
 
 class TestKeejobScraper(unittest.TestCase):
     def setUp(self):
         self.logger = logging.getLogger(__name__)
+        self.fetcher = Fetcher(delay=0)
+        self.page_url = "https://www.keejob.com/offres-emploi/?keywords=Business&page={i}"
         self.sample_html = """
         <html>
             <body>
@@ -40,36 +48,105 @@ class TestKeejobScraper(unittest.TestCase):
         </html>
         """
 
-    @patch('scrapers.keejob.requests.get')
-    def test_scrape_keejob(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = self.sample_html
-        mock_response.raise_for_status.return_value = None
-        
-        mock_job_response = MagicMock()
-        mock_job_response.text = self.sample_job_html
-        mock_job_response.raise_for_status.return_value = None
-        
-        mock_get.side_effect = [mock_response, mock_job_response]
-        
-        result = scrape_keejob(self.logger)
+    def serve(self, pages):
+        """Answer fetcher requests from a url -> html mapping."""
+        def get(url):
+            if url not in pages:
+                raise requests.HTTPError(f"404 for {url}")
+            return pages[url]
+        return patch.object(self.fetcher, 'get', side_effect=get)
+
+    def test_scrape_keejob(self):
+        pages = {
+            self.page_url.format(i=1): self.sample_html,
+            self.page_url.format(i=2): '<html><body><div class="block_b row-fluid"></div></body></html>',
+            'https://www.keejob.com/job/123': self.sample_job_html,
+        }
+        with self.serve(pages):
+            result = scrape_keejob(self.logger, "Business", fetcher=self.fetcher)
         
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]['Source'], 'Keejob')
+        self.assertEqual(result[0]['Major'], 'Business')
         self.assertEqual(result[0]['JobTitle'], 'Software Engineer')
         self.assertEqual(result[0]['Entreprise'], 'TechCorp')
 
-    @patch('scrapers.keejob.requests.get')
-    def test_scrape_keejob_no_pagination(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = '<html><body><div class="block_b row-fluid"></div></body></html>'
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+    def test_scrape_keejob_process_pool(self):
+        pages = {
+            self.page_url.format(i=1): self.sample_html,
+            self.page_url.format(i=2): self.sample_html,
+            'https://www.keejob.com/job/123': self.sample_job_html,
+        }
+        with self.serve(pages), ParsePool(workers=2, max_pending=1) as parse_pool:
+            result = scrape_keejob(self.logger, "Business", fetcher=self.fetcher, parse_pool=parse_pool)
+        
+        self.assertEqual([job['JobTitle'] for job in result], ['Software Engineer', 'Software Engineer'])
+        self.assertEqual(result[0]['Published'], datetime(2025, 5, 1))
+
+    def test_scrape_keejob_skips_seen_jobs(self):
+        engine = create_engine('sqlite://')
+        seen = SeenIndex(engine)
+        seen.add(['https://www.keejob.com/job/123'], 'Keejob', 'Business')
+        seen.flush()
+        pages = {
+            self.page_url.format(i=1): self.sample_html,
+            'https://www.keejob.com/job/123': self.sample_job_html,
+        }
+        with self.serve(pages) as mock_get:
+            result = scrape_keejob(self.logger, "Business", fetcher=self.fetcher, seen=SeenIndex(engine))
+        
+        self.assertEqual(result, [])
+        # Page 1 only holds known jobs, so neither the job nor page 2 is fetched
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_scrape_keejob_seen_under_another_major(self):
+        engine = create_engine('sqlite://')
+        seen = SeenIndex(engine)
+        seen.add(['https://www.keejob.com/job/123'], 'Keejob', 'Finance')
+        seen.flush()
+        pages = {
+            self.page_url.format(i=1): self.sample_html,
+            'https://www.keejob.com/job/123': self.sample_job_html,
+        }
+        with self.serve(pages):
+            result = scrape_keejob(self.logger, "Business", fetcher=self.fetcher, seen=SeenIndex(engine))
+
+        self.assertEqual([job['URL'] for job in result], ['https://www.keejob.com/job/123'])
+
+    def test_scrape_keejob_resume(self):
+        engine = create_engine('sqlite://')
+        checkpoint = CheckpointStore(engine)
+        checkpoint.mark_done('Keejob', 'Business', 1)
+        checkpoint.flush()
+        checkpoint = CheckpointStore(engine, resume=True)
+        pages = {
+            self.page_url.format(i=1): self.sample_html,
+            self.page_url.format(i=2): self.sample_html.replace('/job/123', '/job/456'),
+        }
+        with self.serve(pages):
+            result = list(iter_keejob(self.logger, "Business", fetcher=self.fetcher, checkpoint=checkpoint))
         
-        result = scrape_keejob(self.logger)
+        # Page 1 is skipped; the job on page 2 fails and goes to the retry table
+        self.assertEqual(result, [])
+        self.assertEqual(checkpoint.pending_retries(), [('Keejob', 'Business', 'https://www.keejob.com/job/456')])
+
+    def test_scrape_keejob_no_pagination(self):
+        pages = {self.page_url.format(i=1): '<html><body><div class="block_b row-fluid"></div></body></html>'}
+        with self.serve(pages):
+            result = scrape_keejob(self.logger, "Business", fetcher=self.fetcher)
         
         self.assertEqual(len(result), 0)
 
+    def test_scrape_keejob_job_error(self):
+        pages = {
+            self.page_url.format(i=1): self.sample_html,
+            self.page_url.format(i=2): self.sample_html,
+        }
+        with self.serve(pages):
+            result = scrape_keejob(self.logger, "Business", fetcher=self.fetcher)
+        
+        self.assertEqual(result, [])
+
     def test_extract_keejob_meta(self):
         soup = BeautifulSoup(self.sample_job_html, 'html5lib')
         result = extract_keejob_meta(soup)
@@ -87,6 +164,12 @@ class TestKeejobScraper(unittest.TestCase):
         for key in expected:
             self.assertEqual(result[key], expected[key])
 
+    def test_extract_keejob_meta_fast_parser(self):
+        reference = extract_keejob_meta(BeautifulSoup(self.sample_job_html, 'html5lib'))
+        result = extract_keejob_meta(make_soup(self.sample_job_html, JOB_STRAINER))
+        
+        self.assertEqual(result, reference)
+
     def test_extract_keejob_meta_empty(self):
         soup = BeautifulSoup('<html><body></body></html>', 'html5lib')
         result = extract_keejob_meta(soup)
@@ -95,10 +178,9 @@ class TestKeejobScraper(unittest.TestCase):
         self.assertEqual(result.get('Entreprise'), None)
         self.assertEqual(result.get('Description'), None)
 
-    @patch('scrapers.keejob.requests.get')
-    def test_scrape_keejob_request_error(self, mock_get):
-        mock_get.side_effect = requests.RequestException("Connection error")
-        result = scrape_keejob(self.logger)
+    def test_scrape_keejob_request_error(self):
+        with patch.object(self.fetcher, 'get', side_effect=requests.RequestException("Connection error")):
+            result = scrape_keejob(self.logger, "Business", fetcher=self.fetcher)
         
         self.assertEqual(result, [])
 
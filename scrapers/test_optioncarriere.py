@@ -1,13 +1,21 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+import requests
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import logging
-from scrapers.optioncarriere import scrape_optioncarriere, find_number_of_pages, extract_optioncarriere_meta
+from scrapers.optioncarriere import scrape_optioncarriere, find_number_of_pages, extract_optioncarriere_meta, JOB_STRAINER
+from scrapers.parsing import make_soup
+from scrapers.fetcher import Fetcher
+from sqlalchemy import create_engine
+from utils.seen_index import SeenIndex
 
 class TestOptioncarriereScraper(unittest.TestCase):
     def setUp(self):
         self.logger = logging.getLogger(__name__)
+        self.fetcher = Fetcher(delay=0)
+        self.parent_url = "https://www.optioncarriere.tn/emploi?s=Business&l=Tunisie&p={i}"
+        self.empty_html = '<html><body><p class="mb-2">Aucun résultat. Veuillez modifier votre recherche.</p></body></html>'
         self.sample_html = """
         <html>
             <body>
@@ -33,43 +41,65 @@ class TestOptioncarriereScraper(unittest.TestCase):
         </html>
         """
 
-    @patch('scrapers.optioncarriere.requests.get')
-    def test_find_number_of_pages(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = self.sample_html
-        mock_response.raise_for_status.return_value = None
-        
-        mock_empty_response = MagicMock()
-        mock_empty_response.text = '<html><body><p class="mb-2">Aucun résultat. Veuillez modifier votre recherche.</p></body></html>'
-        mock_empty_response.raise_for_status.return_value = None
-        
-        mock_get.side_effect = [mock_response, mock_empty_response]
-        
-        parent_url = "https://www.optioncarriere.tn/emploi?s=Business&l=Tunisie&p={i}"
-        result = find_number_of_pages(parent_url, self.logger)
+    def serve(self, pages):
+        """Answer fetcher requests from a url -> html mapping, empty result page otherwise."""
+        return patch.object(self.fetcher, 'get', side_effect=lambda url: pages.get(url, self.empty_html))
+
+    def test_find_number_of_pages(self):
+        with self.serve({self.parent_url.format(i=1): self.sample_html}):
+            result = find_number_of_pages(self.parent_url, self.logger, self.fetcher)
         
         self.assertEqual(result, 1)
 
-    @patch('scrapers.optioncarriere.requests.get')
-    def test_scrape_optioncarriere(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.text = self.sample_html
-        mock_response.raise_for_status.return_value = None
+    def test_find_number_of_pages_keeps_parsed_pages(self):
+        listing = {self.parent_url.format(i=i): self.sample_html for i in range(1, 6)}
+        pages = {}
+        with self.serve(listing) as mock_get:
+            result = find_number_of_pages(self.parent_url, self.logger, self.fetcher, pages)
         
-        mock_job_response = MagicMock()
-        mock_job_response.text = self.sample_job_html
-        mock_job_response.raise_for_status.return_value = None
-        
-        mock_get.side_effect = [mock_response, mock_job_response, mock_response]
+        self.assertEqual(result, 5)
+        probed = [call.args[0] for call in mock_get.call_args_list]
+        self.assertEqual(probed, [self.parent_url.format(i=i) for i in (1, 2, 4, 8, 6, 5)])
+        self.assertEqual(sorted(pages), [1, 2, 4, 5])
+
+    def test_find_number_of_pages_empty(self):
+        with self.serve({}):
+            result = find_number_of_pages(self.parent_url, self.logger, self.fetcher)
         
-        result = scrape_optioncarriere(self.logger)
+        self.assertEqual(result, 0)
+
+    def test_scrape_optioncarriere(self):
+        pages = {
+            self.parent_url.format(i=1): self.sample_html,
+            'https://www.optioncarriere.tn/job/123': self.sample_job_html,
+        }
+        with self.serve(pages) as mock_get:
+            result = scrape_optioncarriere(self.logger, "Business", fetcher=self.fetcher)
         
+        fetched = [call.args[0] for call in mock_get.call_args_list]
+        self.assertEqual(fetched.count(self.parent_url.format(i=1)), 1)
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]['Source'], 'Optioncarriere')
+        self.assertEqual(result[0]['Major'], 'Business')
         self.assertEqual(result[0]['JobTitle'], 'Food Scientist')
         self.assertEqual(result[0]['Entreprise'], 'Business')
         self.assertEqual(result[0]['WorkLocation'], 'Tunis')
 
+    def test_scrape_optioncarriere_stops_at_known_page(self):
+        engine = create_engine('sqlite://')
+        seen = SeenIndex(engine)
+        seen.add(['https://www.optioncarriere.tn/job/123'], 'Optioncarriere', 'Business')
+        seen.flush()
+        listing = {self.parent_url.format(i=i): self.sample_html for i in range(1, 51)}
+        with self.serve(listing) as mock_get:
+            result = scrape_optioncarriere(self.logger, "Business", fetcher=self.fetcher, seen=SeenIndex(engine))
+
+        self.assertEqual(result, [])
+        # Only the pages probed for the page count are fetched, page 1 ends pagination
+        fetched = [call.args[0] for call in mock_get.call_args_list]
+        self.assertEqual(len(fetched), len(set(fetched)))
+        self.assertNotIn(self.parent_url.format(i=3), fetched)
+
     def test_extract_optioncarriere_meta(self):
         soup = BeautifulSoup(self.sample_job_html, 'html5lib')
         result = extract_optioncarriere_meta(soup)
@@ -97,6 +127,12 @@ class TestOptioncarriereScraper(unittest.TestCase):
             else:
                 self.assertEqual(result[key], expected[key])
 
+    def test_extract_optioncarriere_meta_fast_parser(self):
+        reference = extract_optioncarriere_meta(BeautifulSoup(self.sample_job_html, 'html5lib'))
+        result = extract_optioncarriere_meta(make_soup(self.sample_job_html, JOB_STRAINER))
+        
+        self.assertEqual(result, reference)
+
     def test_extract_optioncarriere_meta_empty(self):
         soup = BeautifulSoup('<html><body></body></html>', 'html5lib')
         result = extract_optioncarriere_meta(soup)
@@ -106,10 +142,9 @@ class TestOptioncarriereScraper(unittest.TestCase):
         self.assertEqual(result.get('Description'), None)
         self.assertEqual(result.get('WorkLocation'), None)
 
-    @patch('scrapers.optioncarriere.requests.get')
-    def test_scrape_optioncarriere_request_error(self, mock_get):
-        mock_get.side_effect = requests.RequestException("Connection error")
-        result = scrape_optioncarriere(self.logger)
+    def test_scrape_optioncarriere_request_error(self):
+        with patch.object(self.fetcher, 'get', side_effect=requests.RequestException("Connection error")):
+            result = scrape_optioncarriere(self.logger, "Business", fetcher=self.fetcher)
         
         self.assertEqual(result, [])
 
@@ -0,0 +1,59 @@
+import unittest
+import logging
+import threading
+import time
+from scrapers.scheduler import ScrapeScheduler
+
+class TestScrapeScheduler(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(__name__)
+
+    def test_runs_tasks_concurrently(self):
+        barrier = threading.Barrier(4, timeout=5)
+
+        def scraper(logger, major):
+            barrier.wait()  # Only passes if all four tasks run at once
+            return [{'Major': major}]
+
+        scheduler = ScrapeScheduler(self.logger, max_tasks=4)
+        for source in ('A', 'B'):
+            for major in ('Business', 'Finance'):
+                scheduler.add(source, major, scraper)
+        collected = []
+        results = scheduler.run(on_result=lambda task, jobs: collected.extend(jobs))
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(collected), 4)
+        self.assertTrue(all(task.status == 'done' for task in scheduler.tasks))
+
+    def test_retries_with_backoff(self):
+        calls = []
+
+        def flaky(logger, major):
+            calls.append(time.monotonic())
+            if len(calls) < 3:
+                raise RuntimeError("temporary failure")
+            return [{'Major': major}]
+
+        scheduler = ScrapeScheduler(self.logger, max_tasks=2, max_retries=2, backoff=0.05)
+        task = scheduler.add('A', 'Business', flaky)
+        results = scheduler.run()
+
+        self.assertEqual(results['A/Business'], [{'Major': 'Business'}])
+        self.assertEqual(task.attempts, 3)
+        self.assertGreaterEqual(calls[2] - calls[1], 0.1)
+
+    def test_gives_up_after_retries(self):
+        def broken(logger, major):
+            raise RuntimeError("permanent failure")
+
+        scheduler = ScrapeScheduler(self.logger, max_retries=1, backoff=0)
+        task = scheduler.add('A', 'Business', broken)
+        results = scheduler.run()
+
+        self.assertEqual(results, {})
+        self.assertEqual(task.status, 'failed')
+        self.assertEqual(task.attempts, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# utils/bulk_load.py
+import csv
+import io
+import json
+import logging
+import uuid
+from contextlib import nullcontext
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.engine import Engine
+
+from config.config import DB_WRITE_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Written for None, so that empty strings stay empty strings
+NULL = '\\N'
+
+
+def _copy_value(value):
+    if value is None:
+        return NULL
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\x' + bytes(value).hex()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def copy_from_stdin(table, conn, keys, data_iter):
+    """pandas `to_sql` method loading the rows of a chunk with PostgreSQL COPY FROM STDIN."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in data_iter:
+        writer.writerow([_copy_value(value) for value in row])
+        count += 1
+    buffer.seek(0)
+
+    name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    columns = ', '.join(f'"{key}"' for key in keys)
+    sql = f"COPY {name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+    with conn.connection.cursor() as cursor:
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    return count
+
+
+def insert_method(conn):
+    """Return the `to_sql` method for a connection: COPY on PostgreSQL, batched INSERTs elsewhere."""
+    return copy_from_stdin if conn.dialect.name == 'postgresql' else None
+
+
+def to_sql_bulk(df, table, conn, if_exists='append', chunksize=DB_WRITE_CHUNK_SIZE, dtype=None):
+    """Write a DataFrame to a table in chunks of `chunksize` rows with the fastest method of the database."""
+    return df.to_sql(table, conn, if_exists=if_exists, index=False, chunksize=chunksize,
+                     method=insert_method(conn), dtype=dtype)
+
+
+def begin(connectable):
+    """Return a context manager giving a connection in a transaction, from an Engine or a Connection."""
+    return connectable.begin() if isinstance(connectable, Engine) else nullcontext(connectable)
+
+
+def add_missing_columns(conn, table, columns):
+    """Add the given text columns to an existing table created before they were introduced."""
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return
+    existing = {column['name'] for column in inspector.get_columns(table)}
+    for column in columns:
+        if column not in existing:
+            logger.info(f"Adding column '{column}' to table '{table}'.")
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" TEXT'))
+
+
+def upsert_bulk(df, table, conn, key='ID', keep_columns=(), chunksize=DB_WRITE_CHUNK_SIZE):
+    """Insert the rows of a DataFrame, updating the existing rows with the same `key`.
+
+    The rows are bulk loaded into a staging table shaped like the target, then
+    merged with a single INSERT ... SELECT ... ON CONFLICT, so only the delta is
+    written. `keep_columns` are left as they are on existing rows (e.g. the
+    date a posting was first scraped). Conflicts are detected on the primary key
+    of the table; a table without one is given a unique index on `key`, and is
+    created on first use.
+    """
+    df = df.drop_duplicates(subset=[key], keep='last')
+    columns = list(df.columns)
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        df.head(0).to_sql(table, conn, index=False)
+        inspector = inspect(conn)
+    else:
+        add_missing_columns(conn, table, columns)
+    conflict = inspector.get_pk_constraint(table).get('constrained_columns') or [key]
+    if conflict == [key]:
+        conn.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_{key.lower()} ON {table} ("{key}")'))
+
+    staging = f'{table}_staging_{uuid.uuid4().hex[:8]}'
+    quoted = ', '.join(f'"{column}"' for column in columns)
+    conn.execute(text(f'CREATE TABLE {staging} AS SELECT {quoted} FROM {table} WHERE 1 = 0'))
+    try:
+        to_sql_bulk(df, staging, conn, chunksize=chunksize)
+        conflict_columns = ', '.join(f'"{column}"' for column in conflict)
+        updates = [column for column in columns if column not in conflict and column not in keep_columns]
+        if updates:
+            action = 'DO UPDATE SET ' + ', '.join(f'"{column}" = excluded."{column}"' for column in updates)
+        else:
+            action = 'DO NOTHING'
+        conn.execute(text(
+            # "WHERE true" lets SQLite tell the ON CONFLICT clause from a join constraint
+            f'INSERT INTO {table} ({quoted}) SELECT {quoted} FROM {staging} WHERE true '
+            f'ON CONFLICT ({conflict_columns}) {action}'
+        ))
+    finally:
+        conn.execute(text(f'DROP TABLE {staging}'))
+
+
+def in_chunks(sql, name, values, chunk_size=500, **params):
+    """Yield (statement, parameters) pairs running `sql` on successive chunks of `values`.
+
+    `sql` takes the values as an expanding `IN :<name>` parameter, so each
+    statement stays under the database's limit on bound parameters. `params`
+    are passed to every statement.
+    """
+    statement = text(sql).bindparams(bindparam(name, expanding=True))
+    values = list(values)
+    for start in range(0, len(values), chunk_size):
+        yield statement, {**params, name: values[start:start + chunk_size]}
+
+
+def delete_by_ids(conn, table, ids, key='ID'):
+    """Delete the rows of a table whose `key` is one of `ids`."""
+    ids = list(ids)
+    if not ids or not inspect(conn).has_table(table):
+        return
+    for statement, params in in_chunks(f'DELETE FROM {table} WHERE "{key}" IN :ids', 'ids', ids):
+        conn.execute(statement, params)
@@ -0,0 +1,105 @@
+# utils/checkpoint.py
+import logging
+import threading
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from utils.bulk_load import to_sql_bulk
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """Durable scrape progress: completed (source, Major, page) checkpoints and a retry table of failed URLs.
+
+    A fresh run clears the checkpoints of the previous one; a resumed run keeps
+    them so completed pages are skipped. Failed job URLs are kept across runs,
+    per Major like the postings, until they are scraped successfully or fail
+    `max_attempts` times.
+    """
+
+    def __init__(self, engine, resume=False, checkpoint_table='scrape_checkpoints',
+                 retry_table='scrape_retries', max_attempts=3):
+        self.engine = engine
+        self.checkpoint_table = checkpoint_table
+        self.retry_table = retry_table
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._done = set()
+        self._pending_done = []
+        self._retries = {}
+        self._retries_dirty = False
+        self._load(resume)
+
+    def _load(self, resume):
+        tables = inspect(self.engine)
+        if tables.has_table(self.checkpoint_table):
+            if resume:
+                with self.engine.connect() as conn:
+                    rows = conn.execute(text(f'SELECT "Source", "Major", "Page" FROM {self.checkpoint_table}'))
+                    self._done = {(source, major, int(page)) for source, major, page in rows}
+                logger.info(f"Resuming: {len(self._done)} pages already completed.")
+            else:
+                with self.engine.begin() as conn:
+                    conn.execute(text(f'DELETE FROM {self.checkpoint_table}'))
+        if tables.has_table(self.retry_table):
+            df = pd.read_sql_table(self.retry_table, self.engine)
+            self._retries = {(row['URL'], row['Major']): row for row in df.to_dict(orient='records')}
+            logger.info(f"{len(self._retries)} failed job URLs waiting for a retry.")
+
+    def is_done(self, source, major, page):
+        """Return True if the page was completed by the run being resumed."""
+        return (source, major, page) in self._done
+
+    def mark_done(self, source, major, page):
+        """Record a page whose jobs are saved; persisted on the next `flush`."""
+        with self._lock:
+            if (source, major, page) not in self._done:
+                self._done.add((source, major, page))
+                self._pending_done.append((source, major, page))
+
+    def record_failure(self, source, major, url, error):
+        """Add a job URL that could not be fetched for a Major to the retry table."""
+        with self._lock:
+            previous = self._retries.get((url, major))
+            self._retries[(url, major)] = {
+                'URL': url,
+                'Source': source,
+                'Major': major,
+                'Error': str(error)[:500],
+                'Attempts': (previous['Attempts'] if previous else 0) + 1,
+                'LastAttempt': datetime.now(),
+            }
+            self._retries_dirty = True
+
+    def resolve(self, url, major):
+        """Remove a URL from the retry table after it was scraped for a Major."""
+        with self._lock:
+            if self._retries.pop((url, major), None) is not None:
+                self._retries_dirty = True
+
+    def pending_retries(self):
+        """Return the (source, Major, URL) of failed job URLs that can still be retried."""
+        with self._lock:
+            return [
+                (row['Source'], row['Major'], row['URL'])
+                for row in self._retries.values()
+                if row['Attempts'] < self.max_attempts
+            ]
+
+    def flush(self):
+        """Persist new checkpoints and the retry table."""
+        with self._lock:
+            done, self._pending_done = self._pending_done, []
+            retries = list(self._retries.values()) if self._retries_dirty else None
+            self._retries_dirty = False
+        with self.engine.begin() as conn:
+            if done:
+                df = pd.DataFrame(done, columns=['Source', 'Major', 'Page'])
+                df['Completed'] = datetime.now()
+                to_sql_bulk(df, self.checkpoint_table, conn)
+            if retries is not None:
+                df = pd.DataFrame(retries, columns=['URL', 'Source', 'Major', 'Error', 'Attempts', 'LastAttempt'])
+                to_sql_bulk(df, self.retry_table, conn, if_exists='replace')
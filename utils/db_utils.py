@@ -1,46 +1,240 @@
 # utils/db_utils.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.pool import QueuePool
 import pandas as pd
+import os
 import uuid
 import logging
+import threading
+import time
 from datetime import datetime
+from config.config import (DB_READ_CHUNK_SIZE, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                           DB_POOL_RECYCLE, DB_POOL_PRE_PING)
+from utils.bulk_load import begin, in_chunks, upsert_bulk
+from utils.language import LanguageCache, description_hash
+from utils.schema import NON_DUPE_TABLE, conform, ensure_partitions, partitioned, posting_columns
 logger = logging.getLogger(__name__)
 
+# Engine of each database URL, shared by every stage of the process
+_engines = {}
+_engines_lock = threading.Lock()
+
+def pool_options(database_url):
+    """Return the connection pool arguments of `create_engine` for a database URL."""
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options  # One connection per thread, nothing to size
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                   pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE)
+    return options
+
 def get_engine(database_url):
-    """Create and return a SQLAlchemy engine."""
-    return create_engine(database_url)
+    """Return the process-wide SQLAlchemy engine of a database, created with the configured pool on first use."""
+    with _engines_lock:
+        engine = _engines.get(database_url)
+        if engine is None:
+            engine = create_engine(database_url, **pool_options(database_url))
+            _engines[database_url] = engine
+        return engine
+
+def pool_stats(engine):
+    """Return the connection counts of an engine's pool."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                     overflow=pool.overflow())
+    return stats
+
+def dispose_engines():
+    """Close the connections of every engine and forget them."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+def _after_fork_in_child():
+    # A forked worker must not reuse the connections of its parent
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def read_table_chunks(engine, table, columns=None, where=None, params=None, order_by=None,
+                      chunksize=DB_READ_CHUNK_SIZE):
+    """Yield the rows of a table as DataFrames of at most `chunksize` rows.
 
-def save_to_db_non_dupe(job_data, engine):
-    """Save job postings to PostgreSQL database."""
+    Only `columns` are selected (all if None), filtered by the SQL `where` clause
+    with bound `params` and sorted by the `order_by` column. Rows are streamed
+    from a server-side cursor where the database supports it (PostgreSQL), so
+    memory does not grow with the table.
+    """
+    selected = ', '.join(f'"{column}"' for column in columns) if columns else '*'
+    query = f'SELECT {selected} FROM {table}'
+    if where:
+        query += f' WHERE {where}'
+    if order_by:
+        query += f' ORDER BY "{order_by}"'
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+        yield from pd.read_sql(text(query), conn, params=params, chunksize=chunksize)
+
+# Columns of the job postings tables
+COLUMNS = [column.name for column in posting_columns()]
+
+def job_id(job):
+    """Return the ID of a job posting, derived from its URL and Major, or from its content if it has no URL.
+
+    The same posting always gets the same ID, so scraping it again updates its row,
+    while a posting listed under several Majors keeps one row per Major.
+    """
+    url = job.get('URL')
+    major = job.get('Major') or ''
+    if isinstance(url, str) and url:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{url}|{major}"))
+    content = '|'.join(str(job.get(column) or '') for column in ('Source', 'Major', 'JobTitle', 'Entreprise'))
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{content}|{description_hash(job.get('Description'))}"))
+
+def save_to_db_non_dupe(job_data, engine, table=NON_DUPE_TABLE):
+    """Upsert deduplicated job postings, keeping their IDs, into the non-dupe table."""
     if not job_data:
         logger.info("No new job postings to save.")
         return
     
-    df = pd.DataFrame(job_data)
-    df['ID'] = [str(uuid.uuid4()) for _ in range(len(df))]
-
-    columns = ["ID","Major","JobTitle", "Published", "JobType", "WorkLocation", "Experience", 
-               "Education", "Availability", "Langues", "Entreprise", 
-               "Sector", "Size", "Description", "Source","Scraped"]
-    df = df.reindex(columns=columns)
+    df = pd.DataFrame(job_data).reindex(columns=COLUMNS)
     
-    with engine.connect() as conn:
-        df.to_sql('job_postings', conn, if_exists='replace', index=False)
+    with begin(engine) as conn:
+        upsert_bulk(conform(df, conn, table), table, conn)
     logger.info(f"Successfully saved {len(df)} non duped job postings to database.")
-def save_to_db(job_data, engine):
-    """Save job postings to PostgreSQL database."""
+def _first_scraped(conn, ids, table='job_postings'):
+    """Return the 'Scraped' date of the stored postings among `ids`, as an {ID: date} dict."""
+    query = f'SELECT "ID", MIN("Scraped") FROM {table} WHERE "ID" IN :ids GROUP BY "ID"'
+    return {row[0]: row[1] for statement, params in in_chunks(query, 'ids', set(ids))
+            for row in conn.execute(statement, params)}
+
+def save_to_db(job_data, engine, languages=None):
+    """Upsert job postings into PostgreSQL database, with the language and hash of their description.
+
+    A posting scraped again keeps its ID and first 'Scraped' date, its other fields
+    are updated. `languages` is the LanguageCache used to identify the language of descriptions.
+    """
     if not job_data:
         logger.info("No new job postings to save.")
         return
     
     df = pd.DataFrame(job_data)
-    df['ID'] = [str(uuid.uuid4()) for _ in range(len(df))]
+    df['ID'] = [job_id(job) for job in job_data]
     df['Scraped'] = datetime.now().date()
-    columns = ["ID","Major","JobTitle", "Published", "JobType", "WorkLocation", "Experience", 
-               "Education", "Availability", "Langues", "Entreprise", 
-               "Sector", "Size", "Description", "Source","Scraped",]
-    df = df.reindex(columns=columns)
+    descriptions = df['Description'].fillna("").tolist() if 'Description' in df.columns else [""] * len(df)
+    df['Language'] = (languages or LanguageCache(engine)).languages(descriptions)
+    df['DescriptionHash'] = [description_hash(description) for description in descriptions]
+    df = df.reindex(columns=COLUMNS)
     
-    with engine.connect() as conn:
-        df.to_sql('job_postings', conn, if_exists='append', index=False)
-    logger.info(f"Successfully saved {len(df)} new job postings to database.")
+    with engine.begin() as conn:
+        if partitioned(conn):
+            # The primary key of a partitioned job_postings includes 'Scraped', so a posting
+            # scraped again is written under its first date to update its row
+            first = _first_scraped(conn, df['ID'])
+            df['Scraped'] = [first.get(job, scraped) for job, scraped in zip(df['ID'], df['Scraped'])]
+        ensure_partitions(conn, 'job_postings', df['Scraped'])
+        upsert_bulk(conform(df, conn, 'job_postings'), 'job_postings', conn, keep_columns=['Scraped'])
+    logger.info(f"Successfully saved {len(df)} job postings to database.")
+
+
+class JobWriter:
+    """Streams scraped job postings into the database in micro-batches.
+
+    Jobs are buffered until `flush_size` of them are waiting or `flush_interval`
+    seconds passed since the last flush, then saved with `save_to_db`; a
+    background thread flushes a batch left waiting past the interval. If a
+    SeenIndex is given, the URLs of each saved batch are marked as seen for their
+    Major, and if a CheckpointStore is given, the pages of each saved batch are
+    checkpointed. A batch that fails to save is put back in the buffer for the
+    next flush.
+
+    Safe to share between scrape threads. Adding jobs only waits for the buffer,
+    except for the thread whose `add` makes a batch due: it saves the batch
+    itself, after any save in progress, so scrapers are held back when the
+    database falls behind instead of the buffer growing.
+    """
+
+    def __init__(self, engine, flush_size=200, flush_interval=60, seen=None, checkpoint=None):
+        self.engine = engine
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.seen = seen
+        self.checkpoint = checkpoint
+        self.languages = LanguageCache(engine)
+        self.saved = 0
+        self._buffer = []
+        self._pages = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()  # Guards the buffer
+        self._flush_lock = threading.Lock()  # One batch is saved at a time
+        self._closed = threading.Event()
+        self._timer = None
+        if flush_interval:
+            self._timer = threading.Thread(target=self._flush_periodically, name='job-writer', daemon=True)
+            self._timer.start()
+
+    def add(self, jobs, page=None):
+        """Buffer jobs, flushing on this thread if the batch is full or the interval elapsed.
+
+        `page` is the (source, Major, page number) the jobs complete, checkpointed once they are saved.
+        """
+        with self._lock:
+            self._buffer.extend(jobs)
+            if page is not None:
+                self._pages.append(page)
+            due = (len(self._buffer) >= self.flush_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Save every buffered job."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                pages, self._pages = self._pages, []
+                self._last_flush = time.monotonic()
+            try:
+                if batch:
+                    save_to_db(batch, self.engine, languages=self.languages)
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = batch
+                    self._pages[:0] = pages
+                raise
+            with self._lock:
+                self.saved += len(batch)
+            if self.seen is not None and batch:
+                for job in batch:
+                    self.seen.add([job.get('URL')], job.get('Source'), job.get('Major'))
+                self.seen.flush()
+            if self.checkpoint is not None:
+                for page in pages:
+                    self.checkpoint.mark_done(*page)
+                self.checkpoint.flush()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval / 4):
+            with self._lock:
+                due = self._buffer and time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Periodic flush of {len(self._buffer)} jobs failed, will retry: {e}")
+
+    def close(self):
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,298 @@
+# utils/dedup_index.py
+import json
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy import inspect, text
+
+from config.config import DB_READ_CHUNK_SIZE, DEDUP_REFIT_UNSEEN
+from utils.bulk_load import in_chunks, to_sql_bulk
+from utils.db_utils import NON_DUPE_TABLE, save_to_db_non_dupe
+from utils.deduplicate_jobs import (
+    SUPPORTED_LANGUAGES, DedupPool, get_stop_words, job_languages, keep_earliest,
+    lsh_band_keys, lsh_candidate_pairs, row_cosine,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DedupIndex:
+    """Persisted deduplication state, so each run only compares the new postings.
+
+    The index table holds, for every posting already deduplicated, its language
+    and whether it was kept; the band table holds the LSH band keys of the
+    MinHash signatures of the kept postings one per row, indexed, so a run only
+    reads the kept postings sharing a band with a new one. The vectorizer
+    table holds the TF-IDF vocabulary and idf weights of each language. They are
+    fitted on the first run and on `rebuild`, and refitted on the kept and new
+    postings when more than `refit_unseen` of the words of the new postings are
+    missing from the vocabulary.
+
+    `update` takes the postings of the source table missing from the index,
+    `chunk_size` at a time and earliest scraped first, finds their near
+    duplicates among themselves and among the kept postings, and appends the
+    ones to keep to the target table. Each chunk is indexed before the next one
+    is read, so memory does not grow with the number of new postings. A posting
+    that duplicates an already kept one is dropped, since it was not scraped
+    earlier. `n_jobs` worker processes share the TF-IDF, MinHash and similarity
+    work, see DedupPool.
+    """
+
+    def __init__(self, engine, source_table='job_postings', target_table=NON_DUPE_TABLE,
+                 index_table='dedup_index', vectorizer_table='dedup_vectorizers',
+                 similarity_threshold=0.92, num_perm=128, bands=32, n_jobs=1, refit_unseen=DEDUP_REFIT_UNSEEN,
+                 chunk_size=DB_READ_CHUNK_SIZE):
+        self.engine = engine
+        self.source_table = source_table
+        self.target_table = target_table
+        self.index_table = index_table
+        self.band_table = f'{index_table}_bands'
+        self.vectorizer_table = vectorizer_table
+        self.refit_unseen = refit_unseen
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+
+    def exists(self):
+        """Return True if an index was built before."""
+        return inspect(self.engine).has_table(self.index_table)
+
+    def rebuild(self):
+        """Drop the index and the vectorizers, empty the target table, then deduplicate every posting again.
+
+        The vectorizers are fitted again, picking up the words that appeared since.
+        """
+        logger.info("Rebuilding the deduplication index from scratch.")
+        with self.engine.begin() as conn:
+            for table in (self.index_table, self.band_table, self.vectorizer_table):
+                conn.execute(text(f'DROP TABLE IF EXISTS {table}'))
+            if inspect(conn).has_table(self.target_table):
+                conn.execute(text(f'DELETE FROM {self.target_table}'))
+        return self._update()
+
+    def update(self):
+        """Deduplicate the postings added since the last run and return {'new': ..., 'kept': ...}."""
+        if not self.exists():
+            return self.rebuild()
+        return self._update()
+
+    def _new_postings(self):
+        """Return the next `chunk_size` postings missing from the index, earliest scraped first.
+
+        Only the columns needed for deduplication are read.
+        """
+        available = {column['name'] for column in inspect(self.engine).get_columns(self.source_table)}
+        columns = [column for column in ('ID', 'Description', 'Scraped', 'Language') if column in available]
+        selected = ', '.join(f'"{column}"' for column in columns)
+        query = f'SELECT {selected} FROM {self.source_table}'
+        if self.exists():
+            query += f' WHERE "ID" NOT IN (SELECT "ID" FROM {self.index_table})'
+        query += f' ORDER BY "Scraped", "ID" LIMIT {int(self.chunk_size)}'
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(query), conn)
+
+    def _save_kept(self, conn, ids):
+        """Copy the full rows of the kept postings from the source table to the target table."""
+        for statement, params in in_chunks(f'SELECT * FROM {self.source_table} WHERE "ID" IN :ids', 'ids', ids):
+            rows = pd.read_sql(statement, conn, params=params)
+            save_to_db_non_dupe(rows.to_dict(orient='records'), conn, table=self.target_table)
+
+    def _load_vectorizer(self, lang_code, stop_words):
+        if not inspect(self.engine).has_table(self.vectorizer_table):
+            return None
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text(f'SELECT "Vocabulary", "Idf" FROM {self.vectorizer_table} WHERE "Lang" = :lang'),
+                {'lang': lang_code},
+            ).fetchone()
+        if row is None:
+            return None
+        vectorizer = TfidfVectorizer(stop_words=stop_words, vocabulary=json.loads(row[0]))
+        vectorizer.idf_ = np.array(json.loads(row[1]))
+        return vectorizer
+
+    @staticmethod
+    def _band_rows(ids, lang_code, band_keys):
+        """Rows of the band table: one per posting and band, the uint64 key stored as int64."""
+        keys = np.ascontiguousarray(band_keys, dtype=np.uint64).view(np.int64)
+        bands = keys.shape[1] if keys.ndim == 2 else 0
+        return pd.DataFrame({
+            'ID': np.repeat(np.asarray(ids, dtype=object), bands),
+            'Lang': lang_code,
+            'Band': np.tile(np.arange(bands), len(ids)),
+            'Key': keys.reshape(-1),
+        })
+
+    def _write_bands(self, conn, band_df):
+        to_sql_bulk(band_df, self.band_table, conn)
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{self.band_table}_key '
+                          f'ON {self.band_table} ("Lang", "Band", "Key")'))
+
+    def _kept_candidates(self, new_keys, new_mask, lang_code):
+        """Return (new row, kept ID) pairs of the new postings sharing a band key with a kept posting."""
+        if not inspect(self.engine).has_table(self.band_table):
+            return set()
+        signed = np.ascontiguousarray(new_keys, dtype=np.uint64).view(np.int64)
+        candidates = set()
+        query = (f'SELECT "Key", "ID" FROM {self.band_table} '
+                 f'WHERE "Lang" = :lang AND "Band" = :band AND "Key" IN :keys')
+        with self.engine.connect() as conn:
+            for band in range(self.bands):
+                rows_by_key = {}
+                for row in np.flatnonzero(new_mask):
+                    rows_by_key.setdefault(int(signed[row, band]), []).append(row)
+                for statement, params in in_chunks(query, 'keys', sorted(rows_by_key), lang=lang_code, band=band):
+                    for key, kept_id in conn.execute(statement, params):
+                        candidates.update((row, kept_id) for row in rows_by_key[key])
+        return candidates
+
+    def _kept_descriptions(self, ids):
+        descriptions = {}
+        query = f'SELECT "ID", "Description" FROM {self.target_table} WHERE "ID" IN :ids'
+        with self.engine.connect() as conn:
+            for statement, params in in_chunks(query, 'ids', ids):
+                descriptions.update((row[0], row[1] or "") for row in conn.execute(statement, params))
+        return descriptions
+
+    def _matches_kept(self, new_keys, new_mask, lang_code, descriptions, vectorizer):
+        """Return a boolean mask of the new postings similar to an already kept one."""
+        duplicate = np.zeros(len(new_keys), dtype=bool)
+        candidates = self._kept_candidates(new_keys, new_mask, lang_code)
+        if not candidates:
+            return duplicate
+
+        candidates = sorted(candidates)
+        rows = np.array([row for row, _ in candidates])
+        kept_ids = sorted({kept_id for _, kept_id in candidates})
+        kept_positions = {kept_id: p for p, kept_id in enumerate(kept_ids)}
+        kept_descriptions = self._kept_descriptions(kept_ids)
+        kept_matrix = vectorizer.transform([kept_descriptions.get(kept_id, "") for kept_id in kept_ids])
+        new_matrix = vectorizer.transform([descriptions[row] for row in rows])
+        similarities = row_cosine(new_matrix, np.arange(len(rows)), kept_matrix,
+                                  np.array([kept_positions[kept_id] for _, kept_id in candidates]))
+        duplicate[rows[similarities >= self.similarity_threshold]] = True
+        return duplicate
+
+    def _unseen_share(self, vectorizer, descriptions):
+        """Return the share of the words of `descriptions` missing from the vectorizer's vocabulary."""
+        analyze = vectorizer.build_analyzer()
+        vocabulary = vectorizer.vocabulary
+        words = [word for description in descriptions for word in analyze(description)]
+        if not words:
+            return 0.0
+        return sum(word not in vocabulary for word in words) / len(words)
+
+    def _kept_ids(self, lang_code):
+        if not self.exists():
+            return []
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(f'SELECT "ID" FROM {self.index_table} WHERE "Kept" = :kept AND "Lang" = :lang'),
+                {'kept': True, 'lang': lang_code},
+            )
+            return [row[0] for row in rows]
+
+    def _update(self):
+        with DedupPool(self.n_jobs) as pool:
+            return self._deduplicate(pool)
+
+    def _deduplicate(self, pool):
+        result = {'new': 0, 'kept': 0}
+        while True:
+            df = self._new_postings()
+            if df.empty:
+                break
+            kept = self._deduplicate_chunk(pool, df)
+            result['new'] += len(df)
+            result['kept'] += kept
+        if not result['new']:
+            logger.info("No new postings to deduplicate.")
+        return result
+
+    def _deduplicate_chunk(self, pool, df):
+        """Deduplicate a chunk of new postings, index them and return how many were kept."""
+        logger.info(f"Deduplicating {len(df)} new postings against the index.")
+
+        df['Scraped'] = pd.to_datetime(df['Scraped'], errors='coerce')
+        df['lang'] = job_languages(df)
+
+        to_keep = set()
+        index_rows = []
+        band_frames = []
+        vectorizer_rows = []
+        for lang_code, group in df.groupby('lang'):
+            if lang_code not in SUPPORTED_LANGUAGES:
+                logger.warning(f"Skipping unsupported language: {lang_code}")
+                index_rows.extend((job_id, lang_code, False) for job_id in group['ID'])
+                continue
+
+            stop_words = get_stop_words(lang_code)
+            descriptions = group['Description'].fillna("").tolist()
+            vectorizer = self._load_vectorizer(lang_code, stop_words)
+            if vectorizer is not None:
+                unseen = self._unseen_share(vectorizer, descriptions)
+                if unseen > self.refit_unseen:
+                    logger.info(f"{unseen:.0%} of the words of the new '{lang_code}' postings are not in the "
+                                f"vocabulary, refitting it.")
+                    vectorizer = None
+            if vectorizer is None:
+                kept_descriptions = list(self._kept_descriptions(self._kept_ids(lang_code)).values())
+                vectorizer, tfidf_matrix = pool.tfidf(kept_descriptions + descriptions, stop_words)
+                tfidf_matrix = tfidf_matrix[len(kept_descriptions):]
+                vectorizer_rows.append({
+                    'Lang': lang_code,
+                    'Vocabulary': json.dumps({term: int(k) for term, k in vectorizer.vocabulary_.items()}),
+                    'Idf': json.dumps(vectorizer.idf_.tolist()),
+                    'Fitted': datetime.now(),
+                })
+            else:
+                tfidf_matrix = vectorizer.transform(descriptions)
+
+            signatures, mask = pool.signatures(descriptions, stop_words, num_perm=self.num_perm)
+            band_keys = lsh_band_keys(signatures, bands=self.bands)
+
+            # Near duplicates of postings kept by earlier runs are dropped
+            duplicate = self._matches_kept(band_keys, mask, lang_code, descriptions, vectorizer)
+            logger.info(f"{duplicate.sum()} of {len(group)} new '{lang_code}' postings match a kept posting")
+
+            # The rest are deduplicated among themselves
+            rows_i, rows_j = lsh_candidate_pairs(band_keys, mask & ~duplicate)
+            if len(rows_i):
+                similar = pool.cosine(tfidf_matrix, rows_i, rows_j) >= self.similarity_threshold
+                rows_i, rows_j = rows_i[similar], rows_j[similar]
+            group_indices = group.index.tolist()
+            candidates = [k for k in range(len(group_indices)) if not duplicate[k]]
+            positions = {k: p for p, k in enumerate(candidates)}
+            kept = keep_earliest([group_indices[k] for k in candidates], df['Scraped'],
+                                 [positions[i] for i in rows_i], [positions[j] for j in rows_j])
+            to_keep |= kept
+
+            for k, job_id in enumerate(group['ID']):
+                index_rows.append((job_id, lang_code, group_indices[k] in kept))
+            kept_rows = [k for k in range(len(group_indices)) if mask[k] and group_indices[k] in kept]
+            band_frames.append(self._band_rows(group['ID'].iloc[kept_rows].tolist(), lang_code,
+                                               band_keys[kept_rows]))
+
+        kept_ids = df.loc[sorted(to_keep), 'ID'].tolist()
+        index_df = pd.DataFrame(index_rows, columns=['ID', 'Lang', 'Kept'])
+        index_df['Indexed'] = datetime.now()
+
+        with self.engine.begin() as conn:
+            self._save_kept(conn, kept_ids)
+            to_sql_bulk(index_df, self.index_table, conn)
+            if band_frames:
+                self._write_bands(conn, pd.concat(band_frames, ignore_index=True))
+            if vectorizer_rows:
+                if inspect(conn).has_table(self.vectorizer_table):
+                    for row in vectorizer_rows:
+                        conn.execute(text(f'DELETE FROM {self.vectorizer_table} WHERE "Lang" = :lang'),
+                                     {'lang': row['Lang']})
+                to_sql_bulk(pd.DataFrame(vectorizer_rows), self.vectorizer_table, conn)
+
+        logger.info(f"Completed deduplication. Keeping {len(kept_ids)} of {len(df)} new postings")
+        return len(kept_ids)
@@ -1,10 +1,16 @@
+import re
+import zlib
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from langdetect import detect
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
 from nltk.corpus import stopwords
 import nltk
 import logging
+from utils import language
+from utils.shared_sparse import SharedCSR, call_on_shared
 import sys
 
 # Configure logging
@@ -18,20 +24,287 @@ logger = logging.getLogger(__name__)
 # Download stopwords if not already downloaded
 nltk.download('stopwords')
 
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')  # Same tokens as TfidfVectorizer
+
+# Languages that are deduplicated, with their NLTK stop word list
+SUPPORTED_LANGUAGES = {'en': 'english', 'fr': 'french'}
+
 def detect_language(text):
+    return language.detect_language(text)
+
+def job_languages(df):
+    """
+    Returns the language of each job: its stored 'Language' where there is one,
+    otherwise detected from its description.
+    """
+    if 'Language' in df.columns:
+        languages = df['Language'].astype(object)
+    else:
+        languages = pd.Series(None, index=df.index, dtype=object)
+    missing = languages.isna()
+    if missing.any():
+        languages = languages.copy()
+        languages[missing] = df.loc[missing, 'Description'].fillna("").apply(detect_language)
+    return languages
+
+def get_stop_words(lang_code):
+    """Returns the stop words of a supported language."""
+    return stopwords.words(SUPPORTED_LANGUAGES[lang_code])
+
+def minhash_signatures(texts, stop_words, num_perm=128, seed=42):
+    """
+    Computes a MinHash signature of the token set of each text.
+
+    Returns a (len(texts), num_perm) uint64 array and a boolean mask of the
+    texts that have at least one token.
+    """
+    rng = np.random.default_rng(seed)
+    # Multiply-shift hash family: h(x) = (a * x + b) >> 32 with odd a, wrapping in 64 bits
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    stop_words = set(stop_words)
+
+    token_hashes = {}
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    has_tokens = np.zeros(len(texts), dtype=bool)
+    for row, text in enumerate(texts):
+        tokens = {t for t in TOKEN_PATTERN.findall(text.lower()) if t not in stop_words}
+        if not tokens:
+            continue
+        hashes = np.array([
+            token_hashes[t] if t in token_hashes else token_hashes.setdefault(t, zlib.crc32(t.encode('utf-8')))
+            for t in tokens
+        ], dtype=np.uint64)
+        signatures[row] = ((a[:, None] * hashes[None, :] + b[:, None]) >> np.uint64(32)).min(axis=1)
+        has_tokens[row] = True
+    return signatures, has_tokens
+
+def lsh_band_keys(signatures, bands=32, seed=7):
+    """
+    Hashes each band of each signature to a single uint64 bucket key.
+
+    Returns a (len(signatures), bands) array; two signatures share the bucket of
+    a band when their keys for that band are equal.
+    """
+    rows_per_band = signatures.shape[1] // bands
+    multipliers = np.random.default_rng(seed).integers(1, 2**63, size=rows_per_band, dtype=np.uint64) | np.uint64(1)
+    banded = signatures[:, :bands * rows_per_band].reshape(len(signatures), bands, rows_per_band)
+    return (banded * multipliers).sum(axis=2, dtype=np.uint64)
+
+def lsh_candidate_pairs(band_keys, mask):
+    """
+    Returns the (i, j) row pairs, i < j, that share the bucket of at least one
+    band. Rows where `mask` is False are ignored.
+    """
+    rows = np.flatnonzero(mask)
+    candidates = set()
+    for band in range(band_keys.shape[1]):
+        _, bucket, counts = np.unique(band_keys[rows, band], return_inverse=True, return_counts=True)
+        shared = counts[bucket] > 1
+        if not shared.any():
+            continue
+        order = np.argsort(bucket[shared], kind='stable')
+        members, starts = rows[shared][order], np.flatnonzero(np.diff(bucket[shared][order], prepend=-1))
+        for bucket_rows in np.split(members, starts[1:]):
+            for x in range(len(bucket_rows)):
+                for y in range(x + 1, len(bucket_rows)):
+                    candidates.add((bucket_rows[x], bucket_rows[y]))
+    if not candidates:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    pairs = np.array(sorted(candidates))
+    return pairs[:, 0], pairs[:, 1]
+
+def row_cosine(matrix_a, rows_a, matrix_b, rows_b):
+    """Cosine similarity of matrix_a[rows_a[k]] and matrix_b[rows_b[k]] for L2-normalized TF-IDF rows."""
+    return np.asarray(matrix_a[rows_a].multiply(matrix_b[rows_b]).sum(axis=1)).ravel()
+
+def similar_pairs_minhash(descriptions, tfidf_matrix, stop_words, similarity_threshold, num_perm=128, bands=32):
+    """
+    Finds the (i, j) row pairs, i < j, whose TF-IDF cosine similarity reaches the
+    threshold, only scoring the candidate pairs proposed by MinHash LSH.
+    """
+    signatures, mask = minhash_signatures(descriptions, stop_words, num_perm=num_perm)
+    rows_i, rows_j = lsh_candidate_pairs(lsh_band_keys(signatures, bands=bands), mask)
+    if len(rows_i) == 0:
+        return rows_i, rows_j
+    keep = row_cosine(tfidf_matrix, rows_i, tfidf_matrix, rows_j) >= similarity_threshold
+    return rows_i[keep], rows_j[keep]
+
+def _exact_pairs_chunk(tfidf_matrix, transposed, start, stop, similarity_threshold):
+    """Similar pairs (i, j), i < j, with i in rows start:stop, from one sparse block product."""
+    block = (tfidf_matrix[start:stop] @ transposed).tocoo()
+    keep = (block.data >= similarity_threshold) & (block.col > block.row + start)
+    return block.row[keep] + start, block.col[keep].copy()
+
+def _sorted_pairs(chunks):
+    if not chunks:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    rows_i = np.concatenate([rows for rows, _ in chunks])
+    rows_j = np.concatenate([rows for _, rows in chunks])
+    order = np.lexsort((rows_j, rows_i))
+    return rows_i[order], rows_j[order]
+
+def similar_pairs_exact(tfidf_matrix, similarity_threshold, chunk_size=1000):
+    """
+    Finds the (i, j) row pairs, i < j, whose cosine similarity reaches the threshold.
+
+    Similarities are computed as sparse products of `chunk_size` rows at a time
+    against the whole matrix, so the dense n x n matrix is never built.
+    """
+    tfidf_matrix = sparse.csr_matrix(tfidf_matrix)
+    transposed = tfidf_matrix.T.tocsr()
+    return _sorted_pairs([
+        _exact_pairs_chunk(tfidf_matrix, transposed, start, start + chunk_size, similarity_threshold)
+        for start in range(0, tfidf_matrix.shape[0], chunk_size)
+    ])
+
+def _count_chunk(texts, stop_words):
+    """Term counts of some texts, with the sorted terms of their columns."""
+    counter = CountVectorizer(stop_words=stop_words)
     try:
-        return detect(text)
-    except:
-        return 'unknown'
+        counts = counter.fit_transform(texts)
+    except ValueError:  # Only stop words
+        return [], sparse.csr_matrix((len(texts), 0), dtype=np.int64)
+    return counter.get_feature_names_out().tolist(), counts
 
-def deduplicate_jobs_by_description(job_data, similarity_threshold=0.92):
+def _cosine_chunk(tfidf_matrix, rows_i, rows_j):
+    return row_cosine(tfidf_matrix, rows_i, tfidf_matrix, rows_j)
+
+class DedupPool:
+    """
+    Runs the TF-IDF, MinHash and similarity work of deduplication on `n_jobs`
+    worker processes.
+
+    The rows of each language group are split into chunks of `chunk_size`, so a
+    large group keeps every worker busy. TF-IDF matrices are handed to the workers
+    through shared memory rather than pickled once per chunk. Results are the same
+    as with the single-process functions; with n_jobs <= 1 those run inline.
+    """
+
+    def __init__(self, n_jobs=1, chunk_size=1000):
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+        if self._executor:
+            logger.info(f"Deduplicating with {n_jobs} worker processes")
+
+    def _ranges(self, n):
+        return [(start, min(start + self.chunk_size, n)) for start in range(0, n, self.chunk_size)]
+
+    def tfidf(self, texts, stop_words):
+        """Fits a TfidfVectorizer on the texts and returns it with their TF-IDF matrix."""
+        if self._executor is None or len(texts) <= self.chunk_size:
+            vectorizer = TfidfVectorizer(stop_words=stop_words)
+            return vectorizer, vectorizer.fit_transform(texts)
+
+        # Each worker counts the terms of a chunk; the counts are merged on the sorted
+        # union of the chunk vocabularies, which is the column order TfidfVectorizer uses
+        futures = [self._executor.submit(_count_chunk, texts[start:stop], stop_words)
+                   for start, stop in self._ranges(len(texts))]
+        chunks = [future.result() for future in futures]
+        terms = sorted(set().union(*(chunk_terms for chunk_terms, _ in chunks)))
+        if not terms:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+        vocabulary = {term: column for column, term in enumerate(terms)}
+        blocks = []
+        for chunk_terms, counts in chunks:
+            columns = np.array([vocabulary[term] for term in chunk_terms], dtype=np.int64)
+            counts = counts.tocoo()
+            blocks.append(sparse.csr_matrix((counts.data, (counts.row, columns[counts.col])),
+                                            shape=(counts.shape[0], len(terms))))
+        transformer = TfidfTransformer()
+        tfidf_matrix = transformer.fit_transform(sparse.vstack(blocks).tocsr())
+
+        vectorizer = TfidfVectorizer(stop_words=stop_words, vocabulary=vocabulary)
+        vectorizer.idf_ = transformer.idf_
+        return vectorizer, tfidf_matrix
+
+    def signatures(self, texts, stop_words, num_perm=128):
+        """Same as `minhash_signatures`, by chunks."""
+        if self._executor is None:
+            return minhash_signatures(texts, stop_words, num_perm=num_perm)
+        futures = [self._executor.submit(minhash_signatures, texts[start:stop], stop_words, num_perm)
+                   for start, stop in self._ranges(len(texts))]
+        chunks = [future.result() for future in futures]
+        if not chunks:
+            return minhash_signatures(texts, stop_words, num_perm=num_perm)
+        return np.vstack([sig for sig, _ in chunks]), np.concatenate([mask for _, mask in chunks])
+
+    def cosine(self, tfidf_matrix, rows_i, rows_j):
+        """Cosine similarity of the row pairs (rows_i[k], rows_j[k]) of a TF-IDF matrix, by chunks."""
+        if self._executor is None or len(rows_i) <= self.chunk_size:
+            return _cosine_chunk(tfidf_matrix, rows_i, rows_j)
+        with SharedCSR(tfidf_matrix) as shared:
+            futures = [self._executor.submit(call_on_shared, _cosine_chunk, [shared.spec],
+                                             rows_i[start:stop], rows_j[start:stop])
+                       for start, stop in self._ranges(len(rows_i))]
+            return np.concatenate([future.result() for future in futures])
+
+    def similar_pairs_minhash(self, descriptions, tfidf_matrix, stop_words, similarity_threshold,
+                              num_perm=128, bands=32):
+        """Same as `similar_pairs_minhash`, with signatures and cosine scores computed by chunks."""
+        signatures, mask = self.signatures(descriptions, stop_words, num_perm=num_perm)
+        rows_i, rows_j = lsh_candidate_pairs(lsh_band_keys(signatures, bands=bands), mask)
+        if len(rows_i) == 0:
+            return rows_i, rows_j
+        keep = self.cosine(tfidf_matrix, rows_i, rows_j) >= similarity_threshold
+        return rows_i[keep], rows_j[keep]
+
+    def similar_pairs_exact(self, tfidf_matrix, similarity_threshold):
+        """Same as `similar_pairs_exact`, with each block of rows scored by a worker."""
+        if self._executor is None:
+            return similar_pairs_exact(tfidf_matrix, similarity_threshold, chunk_size=self.chunk_size)
+        tfidf_matrix = sparse.csr_matrix(tfidf_matrix)
+        with SharedCSR(tfidf_matrix) as shared, SharedCSR(tfidf_matrix.T.tocsr()) as shared_transposed:
+            futures = [self._executor.submit(call_on_shared, _exact_pairs_chunk, [shared.spec, shared_transposed.spec],
+                                             start, stop, similarity_threshold)
+                       for start, stop in self._ranges(tfidf_matrix.shape[0])]
+            return _sorted_pairs([future.result() for future in futures])
+
+    def close(self):
+        """Shut the worker processes down."""
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def cluster_labels(n, rows_i, rows_j):
+    """
+    Labels the n rows with their duplicate cluster: rows linked by a chain of
+    similar pairs share a label (union-find over the pairs).
+    """
+    graph = sparse.coo_matrix((np.ones(len(rows_i), dtype=bool), (rows_i, rows_j)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+def keep_earliest(group_indices, scraped, rows_i, rows_j):
+    """
+    Clusters the rows of a group linked by similar pairs and returns the index of
+    the earliest 'Scraped' job of each cluster, the first one on ties.
+    """
+    labels = cluster_labels(len(group_indices), np.asarray(rows_i, dtype=int), np.asarray(rows_j, dtype=int))
+    # Jobs without a date are only kept when their whole cluster has none
+    dates = scraped.loc[group_indices].fillna(pd.Timestamp.max)
+    return set(dates.groupby(labels, sort=False).idxmin())
+
+def deduplicate_jobs_by_description(job_data, similarity_threshold=0.92, method='minhash', num_perm=128, bands=32,
+                                    n_jobs=1):
     """
     Removes duplicate job descriptions using cosine similarity, grouped by language.
-    Keeps the job with the earliest 'Scraped' date.
+    Jobs linked by a chain of similar descriptions form one cluster, of which the
+    job with the earliest 'Scraped' date is kept.
 
     Parameters:
     - job_data (list of dict): List of job postings, each with 'Description' and 'Scraped'.
     - similarity_threshold (float): Threshold above which descriptions are considered duplicates.
+    - method (str): 'minhash' only scores the candidate pairs found by MinHash LSH over
+      description tokens, in close to linear time; 'exact' scores every pair, in sparse row blocks.
+    - num_perm, bands (int): MinHash signature length and number of LSH bands.
+    - n_jobs (int): Worker processes sharing the work of each language group.
 
     Returns:
     - List of deduplicated job dicts.
@@ -51,42 +324,32 @@ def deduplicate_jobs_by_description(job_data, similarity_threshold=0.92):
 
     # Detect language
     logger.info("Detecting language of job descriptions")
-    df['lang'] = df['Description'].fillna("").apply(detect_language)
+    df['lang'] = job_languages(df)
 
     # Prepare output
     to_keep = set()
 
-    for lang_code, group in df.groupby('lang'):
-        logger.info(f"Processing language group: {lang_code} with {len(group)} entries")
+    with DedupPool(n_jobs) as pool:
+        for lang_code, group in df.groupby('lang'):
+            logger.info(f"Processing language group: {lang_code} with {len(group)} entries")
 
-        if lang_code not in ['en', 'fr']:
-            logger.warning(f"Skipping unsupported language: {lang_code}")
-            continue
-
-        stop_words = stopwords.words('english') if lang_code == 'en' else stopwords.words('french')
-
-        vectorizer = TfidfVectorizer(stop_words=stop_words)
-        tfidf_matrix = vectorizer.fit_transform(group['Description'].fillna(""))
-
-        similarity_matrix = cosine_similarity(tfidf_matrix)
-
-        local_seen = set()
-        group_indices = group.index.tolist()
-
-        for i, idx_i in enumerate(group_indices):
-            if idx_i in local_seen:
+            if lang_code not in SUPPORTED_LANGUAGES:
+                logger.warning(f"Skipping unsupported language: {lang_code}")
                 continue
 
-            dup_group = [idx_i]
+            stop_words = get_stop_words(lang_code)
+
+            descriptions = group['Description'].fillna("").tolist()
+            _, tfidf_matrix = pool.tfidf(descriptions, stop_words)
 
-            for j in range(i + 1, len(group_indices)):
-                idx_j = group_indices[j]
-                if similarity_matrix[i][j] >= similarity_threshold:
-                    dup_group.append(idx_j)
-                    local_seen.add(idx_j)
+            if method == 'minhash':
+                rows_i, rows_j = pool.similar_pairs_minhash(descriptions, tfidf_matrix, stop_words,
+                                                            similarity_threshold, num_perm=num_perm, bands=bands)
+            else:
+                rows_i, rows_j = pool.similar_pairs_exact(tfidf_matrix, similarity_threshold)
+            logger.info(f"Found {len(rows_i)} similar pairs in language group {lang_code}")
 
-            earliest_index = df.loc[dup_group]['Scraped'].idxmin()
-            to_keep.add(earliest_index)
+            to_keep |= keep_earliest(group.index.tolist(), df['Scraped'], rows_i, rows_j)
 
     logger.info(f"Completed deduplication. Keeping {len(to_keep)} unique jobs out of {len(df)}")
     return df.loc[list(to_keep)].to_dict(orient='records')
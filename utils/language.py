@@ -0,0 +1,110 @@
+# utils/language.py
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+import pandas as pd
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+from sqlalchemy import inspect
+
+from config.config import LANGUAGE_BACKEND, LANGUAGE_PREFIX_CHARS
+from utils.bulk_load import in_chunks, to_sql_bulk
+
+try:
+    import langid  # Optional, faster than langdetect
+except ImportError:
+    langid = None
+
+logger = logging.getLogger(__name__)
+
+# langdetect samples at random; a fixed seed gives the same answer on every run
+DetectorFactory.seed = 0
+
+
+def description_hash(description):
+    """Return the hex SHA-1 of a job description."""
+    return hashlib.sha1((description or "").encode('utf-8')).hexdigest()
+
+
+def _langdetect(text):
+    try:
+        return detect(text)
+    except LangDetectException:
+        return 'unknown'
+
+
+def _langid(text):
+    return langid.classify(text)[0]
+
+
+# Language identification backends, each a function of a text returning an ISO 639-1 code
+BACKENDS = {'langdetect': _langdetect}
+if langid is not None:
+    BACKENDS['langid'] = _langid
+
+
+def get_backend(name=LANGUAGE_BACKEND):
+    """Return the backend registered under `name`."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable language backend '{name}', choose from {sorted(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def detect_language(text, backend=None, prefix_chars=LANGUAGE_PREFIX_CHARS):
+    """Return the language code of a text from its first `prefix_chars` characters, or 'unknown'."""
+    text = (text or "").strip()[:prefix_chars]
+    if not text:
+        return 'unknown'
+    return (backend or get_backend())(text)
+
+
+class LanguageCache:
+    """Language of job descriptions, cached in the database by description hash.
+
+    Each distinct description is only classified once, by the first run that
+    saves it; later lookups read the cache table, and repeated ones are served
+    from memory.
+    """
+
+    def __init__(self, engine, table='language_cache', backend=LANGUAGE_BACKEND,
+                 prefix_chars=LANGUAGE_PREFIX_CHARS):
+        self.engine = engine
+        self.table = table
+        self.backend = backend
+        self.prefix_chars = prefix_chars
+        self._known = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, hashes):
+        if not hashes or not inspect(self.engine).has_table(self.table):
+            return {}
+        found = {}
+        query = f'SELECT "DescriptionHash", "Language" FROM {self.table} WHERE "DescriptionHash" IN :hashes'
+        with self.engine.connect() as conn:
+            for statement, params in in_chunks(query, 'hashes', hashes):
+                found.update((row[0], row[1]) for row in conn.execute(statement, params))
+        return found
+
+    def languages(self, descriptions):
+        """Return the language of each description, detecting and caching the unknown ones."""
+        hashes = [description_hash(description) for description in descriptions]
+        with self._lock:
+            missing = sorted({h for h in hashes if h not in self._known})
+            self._known.update(self._lookup(missing))
+
+            backend = get_backend(self.backend)
+            detected = {}
+            for h, description in zip(hashes, descriptions):
+                if h not in self._known and h not in detected:
+                    detected[h] = detect_language(description, backend=backend, prefix_chars=self.prefix_chars)
+            if detected:
+                df = pd.DataFrame(list(detected.items()), columns=['DescriptionHash', 'Language'])
+                df['Backend'] = self.backend
+                df['Detected'] = datetime.now()
+                with self.engine.begin() as conn:
+                    to_sql_bulk(df, self.table, conn)
+                self._known.update(detected)
+                logger.info(f"Detected the language of {len(detected)} new descriptions.")
+            return [self._known[h] for h in hashes]
@@ -0,0 +1,59 @@
+# utils/processing_state.py
+import logging
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from utils.db_utils import COLUMNS
+from utils.schema import NON_DUPE_TABLE
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_TABLE = 'merged_data_processed'
+
+
+def pending_condition(source=NON_DUPE_TABLE, processed=PROCESSED_TABLE):
+    """SQL condition on `source` rows that have no processed result for their current description.
+
+    A posting is pending if its ID is not in `processed`, or if it was processed
+    with a different description hash (the posting changed since).
+    """
+    return (
+        f'NOT EXISTS (SELECT 1 FROM {processed} p WHERE p."ID" = {source}."ID" '
+        f'AND COALESCE(p."DescriptionHash", \'\') = COALESCE({source}."DescriptionHash", \'\'))'
+    )
+
+
+def pending_batches(engine, source=NON_DUPE_TABLE, processed=PROCESSED_TABLE, columns=COLUMNS,
+                    batch_size=100, reprocess=False):
+    """Yield the postings of `source` that still need processing, as DataFrames of `batch_size` rows.
+
+    With `reprocess`, every posting is yielded. Batches are read by ID ranges
+    (keyset pagination), each with its own short query, so results can be written
+    between batches, and a posting failing to process is not selected again in the
+    same run.
+    """
+    conditions = ['"ID" > :after']
+    if not reprocess and inspect(engine).has_table(processed):
+        conditions.append(pending_condition(source, processed))
+    selected = ', '.join(f'"{column}"' for column in columns)
+    query = text(f'SELECT {selected} FROM {source} WHERE {" AND ".join(conditions)} '
+                 f'ORDER BY "ID" LIMIT {int(batch_size)}')
+
+    after = ''
+    while True:
+        with engine.connect() as conn:
+            batch = pd.read_sql(query, conn, params={'after': after})
+        if batch.empty:
+            return
+        after = batch['ID'].iloc[-1]
+        yield batch
+
+
+def count_pending(engine, source=NON_DUPE_TABLE, processed=PROCESSED_TABLE):
+    """Return the number of postings of `source` that still need processing."""
+    query = f'SELECT COUNT(*) FROM {source}'
+    if inspect(engine).has_table(processed):
+        query += f' WHERE {pending_condition(source, processed)}'
+    with engine.connect() as conn:
+        return conn.execute(text(query)).scalar()
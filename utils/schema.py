@@ -0,0 +1,241 @@
+# utils/schema.py
+import json
+import logging
+from datetime import date, datetime
+
+import pandas as pd
+
+from sqlalchemy import (
+    Column, Date, DateTime, Float, Index, Integer, MetaData, PrimaryKeyConstraint, String, Table, Text,
+    inspect, text,
+)
+
+from config.config import DB_PARTITION_JOB_POSTINGS
+
+logger = logging.getLogger(__name__)
+
+NON_DUPE_TABLE = 'job_postings_non_dupe'
+MIGRATIONS_TABLE = 'schema_migrations'
+
+# Fields extracted by the LLM analysis, stored on the processed tables
+ANALYSIS_COLUMNS = [
+    ("company_sector", Text), ("company_size", Text), ("Contract_type", Text), ("job_category", Text),
+    ("years_of_experience", Float), ("educational_qualifications", Text), ("technical_skills", Text),
+    ("certifications", Text), ("behavioral_skills", Text), ("languages", Text),
+]
+
+
+def posting_columns():
+    """Columns of a job postings table."""
+    return [
+        Column("ID", String(36), nullable=False),
+        Column("Major", Text),
+        Column("JobTitle", Text),
+        Column("Published", Date),
+        Column("JobType", Text),
+        Column("WorkLocation", Text),
+        Column("Experience", Text),
+        Column("Education", Text),
+        Column("Availability", Text),
+        Column("Langues", Text),
+        Column("Entreprise", Text),
+        Column("Sector", Text),
+        Column("Size", Text),
+        Column("Description", Text),
+        Column("Source", String(32)),
+        Column("Scraped", Date, nullable=False),
+        Column("Language", String(16)),
+        Column("DescriptionHash", String(40)),
+        Column("URL", Text),
+    ]
+
+
+def posting_indexes(name):
+    return [Index(f"ix_{name}_{column.lower()}", column) for column in ("Source", "Major", "Published", "Scraped")]
+
+
+def build_metadata(partition_job_postings=False):
+    """Return the MetaData of the managed tables.
+
+    With `partition_job_postings` (PostgreSQL only), job_postings is partitioned by
+    month of 'Scraped'; its primary key then has to include 'Scraped'.
+    """
+    metadata = MetaData()
+    if partition_job_postings:
+        Table("job_postings", metadata, *posting_columns(), PrimaryKeyConstraint("ID", "Scraped"),
+              *posting_indexes("job_postings"), postgresql_partition_by='RANGE ("Scraped")')
+    else:
+        Table("job_postings", metadata, *posting_columns(), PrimaryKeyConstraint("ID"),
+              *posting_indexes("job_postings"))
+    Table(NON_DUPE_TABLE, metadata, *posting_columns(), PrimaryKeyConstraint("ID"),
+          *posting_indexes(NON_DUPE_TABLE))
+    Table("merged_data_processed", metadata, *posting_columns(),
+          *(Column(name, type_) for name, type_ in ANALYSIS_COLUMNS),
+          PrimaryKeyConstraint("ID"), *posting_indexes("merged_data_processed"),
+          Index("ix_merged_data_processed_job_category", "job_category"))
+    Table("melted_data_processed", metadata, *posting_columns(),
+          *(Column(name, type_) for name, type_ in ANALYSIS_COLUMNS),
+          Column("skill_type", String(32)), Column("skill_name", Text),
+          Index("ix_melted_data_processed_id", "ID"),
+          Index("ix_melted_data_processed_skill", "skill_type", "skill_name"),
+          *posting_indexes("melted_data_processed")[:2])
+    return metadata
+
+
+def partitioned(conn):
+    """Return True if job_postings is created partitioned on this connection."""
+    return bool(DB_PARTITION_JOB_POSTINGS) and conn.dialect.name == 'postgresql'
+
+
+def table_columns(conn, table):
+    """Return the column names of a managed table."""
+    return [column.name for column in build_metadata(partitioned(conn)).tables[table].columns]
+
+
+def conform(df, conn, table):
+    """Reindex a DataFrame to the columns of a managed table, converting values to the column types.
+
+    Lists (e.g. skills) are stored as JSON text; DataFrames for other tables are returned as they are.
+    """
+    metadata = build_metadata(partitioned(conn))
+    if table not in metadata.tables:
+        return df
+    columns = metadata.tables[table].columns
+    df = df.reindex(columns=[column.name for column in columns])
+    for column in columns:
+        if isinstance(column.type, Float):
+            df[column.name] = pd.to_numeric(df[column.name], errors='coerce')
+        elif isinstance(column.type, Date):
+            dates = pd.to_datetime(df[column.name], errors='coerce', format='mixed')
+            df[column.name] = pd.Series([value.date() if pd.notna(value) else None for value in dates],
+                                        index=df.index, dtype=object)
+        elif isinstance(column.type, Text):
+            df[column.name] = df[column.name].map(
+                lambda value: json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+            )
+    return df
+
+
+def _month(value):
+    return date(value.year, value.month, 1)
+
+
+def _months_between(first, last):
+    """Return the first day of each month from the month of `first` to the month of `last`."""
+    if first is None or last is None:
+        return []
+    months, month = [], _month(first)
+    while month <= _month(last):
+        months.append(month)
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return months
+
+
+def ensure_partitions(conn, table, dates):
+    """Create the monthly partitions of a partitioned table that rows with the given dates go to."""
+    if not partitioned(conn) or table != 'job_postings':
+        return
+    for start in sorted({_month(value) for value in dates if value is not None}):
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {table}_{start:%Y_%m} PARTITION OF {table} '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+
+
+def _cast(column, dialect):
+    if isinstance(column.type, Float):
+        # Free text from the LLM, e.g. "3-5 years" or "null": the first number, as in
+        # LLM.analysis_schema._number_value, or NULL
+        number = f"REPLACE(substring(CAST(\"{column.name}\" AS TEXT) from '[0-9]+(?:[.,][0-9]+)?'), ',', '.')"
+        return f'CAST({number} AS {column.type.compile(dialect=dialect)})'
+    return f'CAST("{column.name}" AS {column.type.compile(dialect=dialect)})'
+
+
+def _create_or_convert(conn, table):
+    """Create a managed table, converting a table of the same name created by `to_sql`.
+
+    The old rows are copied into the new table, cast to the new column types,
+    and rows repeating a primary key are dropped.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table.name):
+        table.create(conn)
+        if table.name == 'job_postings' and partitioned(conn):
+            conn.execute(text('CREATE TABLE IF NOT EXISTS job_postings_default PARTITION OF job_postings DEFAULT'))
+        return
+
+    legacy = f"{table.name}_legacy"
+    logger.info(f"Converting table '{table.name}' to the managed schema.")
+    old_columns = {column['name'] for column in inspector.get_columns(table.name)}
+    # Index names are global in PostgreSQL, drop the old ones with the old table
+    for index in inspector.get_indexes(table.name):
+        conn.execute(text(f'DROP INDEX IF EXISTS {index["name"]}'))
+    conn.execute(text(f'ALTER TABLE {table.name} RENAME TO {legacy}'))
+    table.create(conn)
+    if table.name == 'job_postings' and partitioned(conn):
+        conn.execute(text('CREATE TABLE IF NOT EXISTS job_postings_default PARTITION OF job_postings DEFAULT'))
+        if 'Scraped' in old_columns:
+            # Rows copied into the default partition would stop the months they fall in from
+            # being created later, so the months of the old rows are created first
+            first, last = conn.execute(text(
+                f'SELECT MIN(CAST("Scraped" AS DATE)), MAX(CAST("Scraped" AS DATE)) FROM {legacy}'
+            )).one()
+            ensure_partitions(conn, table.name, _months_between(first, last))
+
+    columns = [column for column in table.columns if column.name in old_columns]
+    quoted = ', '.join(f'"{column.name}"' for column in columns)
+    if conn.dialect.name == 'postgresql':
+        selected = ', '.join(_cast(column, conn.dialect) for column in columns)
+    else:
+        selected = quoted  # SQLite does not enforce types
+    if 'Scraped' in old_columns:
+        # Keep the earliest scraped of the rows sharing a key
+        where, order = ' WHERE "Scraped" IS NOT NULL', ' ORDER BY "Scraped"'
+    else:
+        where, order = ' WHERE true', ''
+    key = ', '.join(f'"{column.name}"' for column in table.primary_key.columns)
+    conflict = f' ON CONFLICT ({key}) DO NOTHING' if key else ''
+    conn.execute(text(f'INSERT INTO {table.name} ({quoted}) SELECT {selected} FROM {legacy}{where}{order}{conflict}'))
+    conn.execute(text(f'DROP TABLE {legacy}'))
+
+
+def _create_managed_tables(conn):
+    metadata = build_metadata(partitioned(conn))
+    for table in metadata.sorted_tables:
+        _create_or_convert(conn, table)
+
+
+# (version, description, function applying it to a connection), in order
+MIGRATIONS = [
+    (1, "typed job posting and processed tables with primary keys and indexes", _create_managed_tables),
+]
+
+
+def applied_versions(conn):
+    if not inspect(conn).has_table(MIGRATIONS_TABLE):
+        return set()
+    return {row[0] for row in conn.execute(text(f'SELECT version FROM {MIGRATIONS_TABLE}'))}
+
+
+def migrate(engine):
+    """Apply the pending migrations, each in its own transaction, and return their versions."""
+    with engine.begin() as conn:
+        Table(MIGRATIONS_TABLE, MetaData(),
+              Column("version", Integer, primary_key=True),
+              Column("description", Text),
+              Column("applied_at", DateTime)).create(conn, checkfirst=True)
+
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        with engine.begin() as conn:
+            if version in applied_versions(conn):
+                continue
+            logger.info(f"Applying schema migration {version}: {description}")
+            apply(conn)
+            conn.execute(
+                text(f'INSERT INTO {MIGRATIONS_TABLE} (version, description, applied_at) VALUES (:v, :d, :t)'),
+                {'v': version, 'd': description, 't': datetime.now()},
+            )
+            applied.append(version)
+    return applied
@@ -0,0 +1,82 @@
+# utils/seen_index.py
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from utils.bulk_load import to_sql_bulk
+
+logger = logging.getLogger(__name__)
+
+
+def url_hash(url, major=None):
+    """Return the hex SHA-1 of a job URL scraped for a Major."""
+    return hashlib.sha1(f"{url}|{major or ''}".encode('utf-8')).hexdigest()
+
+
+class SeenIndex:
+    """Persistent index of the (job URL, Major) pairs that were already scraped.
+
+    A posting listed under several Majors is stored once per Major, so it is
+    seen under a Major only once scraped for that Major. Hashes are loaded once
+    into memory; new URLs are buffered with `add` and written with `flush`,
+    which should only be called once the matching postings are stored so a
+    crash never marks unsaved jobs as seen. Membership only reflects URLs stored
+    before the index was loaded.
+    """
+
+    def __init__(self, engine, table='scraped_urls'):
+        self.engine = engine
+        self.table = table
+        self._known = set()
+        self._hashes = set()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load the stored URL hashes."""
+        if not inspect(self.engine).has_table(self.table):
+            logger.info(f"Seen-URL table '{self.table}' does not exist yet.")
+            return
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f'SELECT url_hash FROM {self.table}'))
+            self._known = {row[0] for row in rows}
+        self._hashes = set(self._known)
+        logger.info(f"Loaded {len(self._known)} already scraped job URLs.")
+
+    def __contains__(self, url_major):
+        url, major = url_major
+        return url_hash(url, major) in self._known
+
+    def __len__(self):
+        return len(self._known)
+
+    def add(self, urls, source=None, major=None):
+        """Mark URLs as scraped for a Major; they are persisted on the next `flush`."""
+        with self._lock:
+            for url in urls:
+                if not url:
+                    continue
+                key = url_hash(url, major)
+                if key not in self._hashes:
+                    self._hashes.add(key)
+                    self._pending[key] = (url, source, major)
+
+    def flush(self):
+        """Write the URLs added since the last flush."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        df = pd.DataFrame(
+            [(key, *row) for key, row in pending.items()],
+            columns=['url_hash', 'URL', 'Source', 'Major'],
+        )
+        df['Seen'] = datetime.now().date()
+        with self.engine.begin() as conn:
+            to_sql_bulk(df, self.table, conn)
+        logger.info(f"Recorded {len(df)} newly scraped job URLs.")
@@ -0,0 +1,76 @@
+# utils/shared_sparse.py
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from scipy import sparse
+
+
+class SharedCSR:
+    """A CSR matrix copied once into shared memory.
+
+    Worker processes receive the small `spec` instead of a pickled copy of the
+    matrix and rebuild it over the shared buffers with `call_on_shared`. The
+    owner must `close` it (or use it as a context manager) to free the memory.
+    """
+
+    def __init__(self, matrix):
+        matrix = sparse.csr_matrix(matrix)
+        self._segments = []
+        arrays = []
+        for array in (matrix.data, matrix.indices, matrix.indptr):
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+            self._segments.append(segment)
+            arrays.append((segment.name, array.dtype.str, array.shape))
+        self.spec = (matrix.shape, arrays)
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _open_untracked(name):
+    # Only the owner tracks a segment: if a worker registered it with its resource
+    # tracker, the segment would be unlinked (or reported leaked) when the worker exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _attach(spec, segments):
+    shape, arrays = spec
+    buffers = []
+    for name, dtype, array_shape in arrays:
+        segment = _open_untracked(name)
+        segments.append(segment)
+        buffers.append(np.ndarray(array_shape, dtype=dtype, buffer=segment.buf))
+    return sparse.csr_matrix(tuple(buffers), shape=shape, copy=False)
+
+
+def call_on_shared(func, specs, *args):
+    """Call `func(*matrices, *args)` with the shared matrices described by `specs`.
+
+    Meant to run in a worker process; `func` must not return views of the matrices.
+    """
+    segments = []
+    matrices = [_attach(spec, segments) for spec in specs]
+    try:
+        return func(*matrices, *args)
+    finally:
+        del matrices  # The buffers can only be released once no array uses them
+        for segment in segments:
+            segment.close()
@@ -0,0 +1,63 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pandas as pd
+from sqlalchemy import create_engine
+from utils.bulk_load import copy_from_stdin, delete_by_ids, in_chunks, insert_method, to_sql_bulk, upsert_bulk
+
+class TestBulkLoad(unittest.TestCase):
+    def test_copy_from_stdin(self):
+        cursor = MagicMock()
+        cursor.copy_expert.side_effect = lambda sql, buffer: setattr(self, 'copied', (sql, buffer.read()))
+        conn = MagicMock()
+        conn.connection.cursor.return_value.__enter__.return_value = cursor
+        table = SimpleNamespace(schema=None, name='job_postings')
+
+        rows = [('1', 'Engineer, "senior"', None), ('2', '', b'\x01\xff')]
+        count = copy_from_stdin(table, conn, ['ID', 'JobTitle', 'Bands'], iter(rows))
+
+        sql, data = self.copied
+        self.assertEqual(count, 2)
+        self.assertEqual(sql, 'COPY "job_postings" ("ID", "JobTitle", "Bands") FROM STDIN WITH (FORMAT csv, NULL \'\\N\')')
+        self.assertEqual(data, '1,"Engineer, ""senior""",\\N\r\n2,,\\x01ff\r\n')
+
+    def test_falls_back_to_inserts(self):
+        engine = create_engine('sqlite://')
+        self.assertIsNone(insert_method(engine))
+
+        df = pd.DataFrame({'ID': [str(i) for i in range(5)], 'JobTitle': ['Engineer', None, '', 'a', 'b']})
+        to_sql_bulk(df, 'job_postings', engine, chunksize=2)
+        to_sql_bulk(df, 'job_postings', engine, chunksize=2)
+        self.assertEqual(len(pd.read_sql_table('job_postings', engine)), 10)
+
+        self.assertIs(insert_method(SimpleNamespace(dialect=SimpleNamespace(name='postgresql'))), copy_from_stdin)
+
+    def test_upsert(self):
+        engine = create_engine('sqlite://')
+        with engine.begin() as conn:
+            upsert_bulk(pd.DataFrame({'ID': ['a', 'b'], 'Title': ['A', 'B'], 'Scraped': ['d1', 'd1']}),
+                        'jobs', conn, keep_columns=['Scraped'])
+        with engine.begin() as conn:
+            upsert_bulk(pd.DataFrame({'ID': ['b', 'c', 'c'], 'Title': ['B2', 'C', 'C2'], 'Scraped': ['d2'] * 3}),
+                        'jobs', conn, keep_columns=['Scraped'])
+
+        df = pd.read_sql('SELECT * FROM jobs ORDER BY "ID"', engine)
+        self.assertEqual(df.values.tolist(), [['a', 'A', 'd1'], ['b', 'B2', 'd1'], ['c', 'C2', 'd2']])
+        self.assertEqual(sorted(pd.read_sql("SELECT name FROM sqlite_master WHERE type = 'table'", engine)['name']),
+                         ['jobs'])
+
+    def test_in_chunks(self):
+        engine = create_engine('sqlite://')
+        pd.DataFrame({'ID': [f'job{i}' for i in range(5)], 'Kind': ['a', 'b'] * 2 + ['a']}).to_sql(
+            'jobs', engine, index=False)
+        with engine.begin() as conn:
+            found = [row[0] for statement, params in in_chunks('SELECT "ID" FROM jobs WHERE "Kind" = :kind '
+                                                               'AND "ID" IN :ids', 'ids', ['job0', 'job1', 'job4'],
+                                                               chunk_size=2, kind='a')
+                     for row in conn.execute(statement, params)]
+            delete_by_ids(conn, 'jobs', ['job0', 'job1', 'job2'])
+        self.assertEqual(found, ['job0', 'job4'])
+        self.assertEqual(sorted(pd.read_sql('SELECT "ID" FROM jobs', engine)['ID']), ['job3', 'job4'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine, text
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from utils.db_utils import (JobWriter, save_to_db, job_id, read_table_chunks, get_engine, pool_stats,
+                            dispose_engines)
+from utils.seen_index import SeenIndex
+from utils.checkpoint import CheckpointStore
+from utils.schema import build_metadata
+
+class TestJobWriter(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        self.jobs = [
+            {'JobTitle': f'Job {i}', 'Description': f'Description {i}', 'Source': 'Keejob',
+             'Major': 'Business', 'URL': f'https://www.keejob.com/job/{i}'}
+            for i in range(5)
+        ]
+
+    def count_rows(self):
+        return pd.read_sql('SELECT COUNT(*) AS n FROM job_postings', self.engine)['n'][0]
+
+    def test_flushes_in_micro_batches(self):
+        writer = JobWriter(self.engine, flush_size=2, flush_interval=3600)
+        writer.add(self.jobs[:2])
+        self.assertEqual(self.count_rows(), 2)
+
+        writer.add(self.jobs[2:3])
+        self.assertEqual(writer.saved, 2)
+
+        writer.close()
+        self.assertEqual(self.count_rows(), 3)
+        self.assertEqual(writer.saved, 3)
+
+    def test_same_posting_updates_its_row(self):
+        save_to_db(self.jobs[:2], self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text('UPDATE job_postings SET "Scraped" = \'2025-01-01\''))
+
+        save_to_db([dict(self.jobs[0], JobTitle='Renamed'), self.jobs[2]], self.engine)
+
+        df = pd.read_sql('SELECT * FROM job_postings', self.engine).set_index('URL')
+        self.assertEqual(len(df), 3)
+        first = df.loc['https://www.keejob.com/job/0']
+        self.assertEqual(first['JobTitle'], 'Renamed')
+        self.assertEqual(first['Scraped'], '2025-01-01')
+        self.assertEqual(first['ID'], job_id(self.jobs[0]))
+
+    def test_same_posting_updates_its_row_when_partitioned(self):
+        # The key of a partitioned job_postings is (ID, Scraped)
+        build_metadata(partition_job_postings=True).tables['job_postings'].create(self.engine)
+        with patch('utils.db_utils.partitioned', new=lambda conn: True):
+            save_to_db(self.jobs[:1], self.engine)
+            with self.engine.begin() as conn:
+                conn.execute(text('UPDATE job_postings SET "Scraped" = \'2025-01-01\''))
+            save_to_db([dict(self.jobs[0], JobTitle='Renamed')], self.engine)
+
+        df = pd.read_sql('SELECT * FROM job_postings', self.engine)
+        self.assertEqual(df[['JobTitle', 'Scraped']].values.tolist(), [['Renamed', '2025-01-01']])
+
+    def test_keeps_one_row_per_major(self):
+        cross_listed = [dict(self.jobs[0], Major='Business'), dict(self.jobs[0], Major='Finance')]
+        save_to_db(cross_listed, self.engine)
+        save_to_db(cross_listed[:1], self.engine)
+
+        df = pd.read_sql('SELECT "Major", "URL" FROM job_postings ORDER BY "Major"', self.engine)
+        self.assertEqual(df['Major'].tolist(), ['Business', 'Finance'])
+        self.assertEqual(df['URL'].nunique(), 1)
+
+    def test_job_id_without_url(self):
+        job = {'JobTitle': 'Job', 'Description': 'Description', 'Source': 'Keejob'}
+        self.assertEqual(job_id(job), job_id(dict(job)))
+        self.assertNotEqual(job_id(job), job_id(dict(job, Description='Other')))
+
+    def test_stores_language_and_description_hash(self):
+        # A table created before the columns existed
+        save_to_db([{'Description': 'Old posting'}], self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE job_postings DROP COLUMN "Language"'))
+            conn.execute(text('ALTER TABLE job_postings DROP COLUMN "DescriptionHash"'))
+            conn.execute(text('''UPDATE job_postings SET "ID" = 'old' '''))
+        with JobWriter(self.engine, flush_size=10) as writer:
+            writer.add([dict(self.jobs[0], Description="We are hiring an accountant to join our team in Tunis.")])
+
+        df = pd.read_sql('SELECT * FROM job_postings WHERE "ID" != \'old\'', self.engine)
+        self.assertEqual(df['Language'].tolist(), ['en'])
+        self.assertEqual(df['DescriptionHash'].str.len()[0], 40)
+
+    def test_marks_saved_urls_as_seen(self):
+        with JobWriter(self.engine, flush_size=10, seen=SeenIndex(self.engine)) as writer:
+            writer.add(self.jobs)
+
+        seen = SeenIndex(self.engine)
+        self.assertEqual(len(seen), 5)
+        self.assertIn(('https://www.keejob.com/job/0', 'Business'), seen)
+        # The same posting listed under another Major is not seen yet
+        self.assertNotIn(('https://www.keejob.com/job/0', 'Finance'), seen)
+
+    def test_checkpoints_pages_once_saved(self):
+        checkpoint = CheckpointStore(self.engine)
+        writer = JobWriter(self.engine, flush_size=10, checkpoint=checkpoint)
+        writer.add(self.jobs[:2], page=('Keejob', 'Business', 1))
+        self.assertFalse(CheckpointStore(self.engine, resume=True).is_done('Keejob', 'Business', 1))
+
+        writer.close()
+        self.assertTrue(CheckpointStore(self.engine, resume=True).is_done('Keejob', 'Business', 1))
+        # A fresh run starts over
+        self.assertFalse(CheckpointStore(self.engine).is_done('Keejob', 'Business', 1))
+
+    def test_failed_save_keeps_the_batch(self):
+        writer = JobWriter(self.engine, flush_size=3, flush_interval=3600)
+        writer.add(self.jobs[:2], page=('Keejob', 'Business', 1))  # Buffered by another task
+        with patch('utils.db_utils.save_to_db', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                writer.add(self.jobs[2:3])
+
+        writer.close()
+        self.assertEqual(self.count_rows(), 3)
+        self.assertEqual(writer.saved, 3)
+
+    def test_adding_does_not_wait_for_a_save(self):
+        writer = JobWriter(self.engine, flush_size=100, flush_interval=3600)
+        writer.add(self.jobs[:1])
+        saving, release = threading.Event(), threading.Event()
+        with patch('utils.db_utils.save_to_db', side_effect=lambda *args, **kwargs: saving.set() or release.wait(5)):
+            flusher = threading.Thread(target=writer.flush)
+            flusher.start()
+            saving.wait(5)
+            start = time.monotonic()
+            writer.add(self.jobs[1:2])
+            self.assertLess(time.monotonic() - start, 1)
+            release.set()
+            flusher.join()
+        self.assertEqual(writer._buffer, self.jobs[1:2])
+
+    def test_flushes_after_the_interval_without_new_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'jobs.db')}")
+            writer = JobWriter(engine, flush_size=100, flush_interval=0.2)
+            writer.add(self.jobs[:1])
+            for _ in range(50):
+                if writer.saved:
+                    break
+                time.sleep(0.05)
+            writer.close()
+            self.assertEqual(writer.saved, 1)
+            engine.dispose()
+
+class TestReadTableChunks(unittest.TestCase):
+    def test_streams_selected_columns(self):
+        engine = create_engine('sqlite://')
+        pd.DataFrame({'ID': [f'{i:02d}' for i in range(7)], 'Description': ['x'] * 7, 'Source': ['Keejob'] * 7}) \
+            .to_sql('job_postings', engine, index=False)
+
+        chunks = list(read_table_chunks(engine, 'job_postings', columns=['ID', 'Description'],
+                                        where='"ID" >= :start', params={'start': '02'}, order_by='ID', chunksize=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(list(chunks[0].columns), ['ID', 'Description'])
+        self.assertEqual(chunks[0]['ID'].tolist(), ['02', '03'])
+
+class TestEngineRegistry(unittest.TestCase):
+    def test_shares_one_pooled_engine(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(dispose_engines)
+        url = f"sqlite:///{os.path.join(directory.name, 'jobs.db')}"
+
+        engine = get_engine(url)
+        self.assertIs(get_engine(url), engine)
+        with engine.connect():
+            stats = pool_stats(engine)
+        self.assertEqual(stats['pool'], 'QueuePool')
+        self.assertEqual(stats['checked_out'], 1)
+        self.assertEqual(pool_stats(engine)['checked_out'], 0)
+
+        self.assertNotIn('checked_out', pool_stats(get_engine('sqlite://')))
+
+class TestCheckpointStore(unittest.TestCase):
+    def test_retry_table(self):
+        engine = create_engine('sqlite://')
+        checkpoint = CheckpointStore(engine, max_attempts=2)
+        checkpoint.record_failure('Keejob', 'Business', 'https://www.keejob.com/job/1', 'timeout')
+        checkpoint.record_failure('Keejob', 'Business', 'https://www.keejob.com/job/2', 'timeout')
+        checkpoint.flush()
+
+        checkpoint = CheckpointStore(engine, max_attempts=2)
+        checkpoint.record_failure('Keejob', 'Business', 'https://www.keejob.com/job/1', 'timeout')
+        checkpoint.resolve('https://www.keejob.com/job/2', 'Business')
+        checkpoint.flush()
+
+        # job/1 used up its attempts, job/2 was scraped
+        self.assertEqual(CheckpointStore(engine, max_attempts=2).pending_retries(), [])
+        self.assertEqual(len(CheckpointStore(engine, max_attempts=3).pending_retries()), 1)
+
+    def test_retries_per_major(self):
+        engine = create_engine('sqlite://')
+        checkpoint = CheckpointStore(engine)
+        for major in ('Business', 'Finance'):
+            checkpoint.record_failure('Keejob', major, 'https://www.keejob.com/job/1', 'timeout')
+        checkpoint.flush()
+
+        checkpoint = CheckpointStore(engine)
+        self.assertEqual(sorted(checkpoint.pending_retries()),
+                         [('Keejob', major, 'https://www.keejob.com/job/1') for major in ('Business', 'Finance')])
+        checkpoint.resolve('https://www.keejob.com/job/1', 'Business')
+        checkpoint.flush()
+        self.assertEqual(CheckpointStore(engine).pending_retries(),
+                         [('Keejob', 'Finance', 'https://www.keejob.com/job/1')])
+
+if __name__ == '__main__':
+    unittest.main()
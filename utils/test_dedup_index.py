@@ -0,0 +1,115 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+from sqlalchemy import create_engine
+from utils.dedup_index import DedupIndex
+from utils.deduplicate_jobs import deduplicate_jobs_by_description
+from utils.test_deduplicate_jobs import STOP_WORDS, make_jobs
+
+class TestDedupIndex(unittest.TestCase):
+    def setUp(self):
+        patcher_sw = patch('utils.deduplicate_jobs.stopwords', new=MagicMock(**{'words.return_value': STOP_WORDS}))
+        patcher_lang = patch('utils.deduplicate_jobs.detect_language', new=lambda text: 'en')
+        patcher_sw.start()
+        patcher_lang.start()
+        self.addCleanup(patcher_sw.stop)
+        self.addCleanup(patcher_lang.stop)
+        self.engine = create_engine('sqlite://')
+
+    def add_postings(self, jobs):
+        pd.DataFrame(jobs).to_sql('job_postings', self.engine, if_exists='append', index=False)
+
+    def kept_ids(self):
+        return sorted(pd.read_sql('SELECT "ID" FROM job_postings_non_dupe', self.engine)['ID'])
+
+    def vocabulary(self):
+        vocabulary = pd.read_sql('SELECT "Vocabulary" FROM dedup_vectorizers WHERE "Lang" = \'en\'', self.engine)
+        self.assertEqual(len(vocabulary), 1)
+        return json.loads(vocabulary['Vocabulary'].iloc[0])
+
+    def add_new_terms(self):
+        new_jobs = [{'ID': f'new{i}', 'Scraped': '2025-05-04',
+                     'Description': f'Quantum cryptography researcher {i} needed for zebrafish genomics '
+                                    f'and blockchain telemetry, variant {i * 7} of the role'}
+                    for i in range(5)]
+        self.add_postings(new_jobs)
+
+    def test_first_run_matches_full_deduplication(self):
+        jobs = make_jobs()
+        self.add_postings(jobs)
+
+        result = DedupIndex(self.engine).update()
+
+        expected = sorted(job['ID'] for job in deduplicate_jobs_by_description(jobs))
+        self.assertEqual(self.kept_ids(), expected)
+        self.assertEqual(result, {'new': len(jobs), 'kept': len(expected)})
+
+    def test_reads_new_postings_in_chunks(self):
+        jobs = make_jobs()
+        self.add_postings(jobs)
+
+        result = DedupIndex(self.engine, chunk_size=7).update()
+
+        expected = sorted(job['ID'] for job in deduplicate_jobs_by_description(jobs))
+        self.assertEqual(self.kept_ids(), expected)
+        self.assertEqual(result, {'new': len(jobs), 'kept': len(expected)})
+
+    def test_only_new_postings_are_compared(self):
+        jobs = make_jobs(n_unique=30)
+        self.add_postings(jobs[:20])
+        DedupIndex(self.engine).update()
+        kept_before = self.kept_ids()
+
+        # A later repost of an indexed job, plus the rest of the jobs
+        repost = dict(jobs[0], ID='job0-again', Scraped='2025-05-03')
+        self.add_postings(jobs[20:] + [repost])
+        result = DedupIndex(self.engine).update()
+
+        self.assertEqual(result['new'], len(jobs) - 20 + 1)
+        kept = self.kept_ids()
+        self.assertNotIn('job0-again', kept)
+        self.assertTrue(set(kept_before) <= set(kept))
+
+        # Nothing left to do on the next run
+        self.assertEqual(DedupIndex(self.engine).update(), {'new': 0, 'kept': 0})
+
+    def test_rebuild(self):
+        jobs = make_jobs()
+        self.add_postings(jobs)
+        index = DedupIndex(self.engine)
+        index.update()
+        kept = self.kept_ids()
+
+        result = index.rebuild()
+
+        self.assertEqual(result['new'], len(jobs))
+        self.assertEqual(self.kept_ids(), kept)
+
+    def test_rebuild_refits_vocabulary(self):
+        self.add_postings(make_jobs())
+        DedupIndex(self.engine).update()
+        self.assertNotIn('zebrafish', self.vocabulary())
+
+        # Below the threshold the vocabulary of the first run is kept
+        self.add_new_terms()
+        DedupIndex(self.engine, refit_unseen=1.0).update()
+        self.assertNotIn('zebrafish', self.vocabulary())
+
+        DedupIndex(self.engine, refit_unseen=1.0).rebuild()
+        self.assertIn('zebrafish', self.vocabulary())
+
+    def test_unseen_vocabulary_triggers_refit(self):
+        self.add_postings(make_jobs())
+        DedupIndex(self.engine).update()
+        kept = self.kept_ids()
+
+        self.add_new_terms()
+        result = DedupIndex(self.engine, refit_unseen=0.1).update()
+
+        self.assertIn('zebrafish', self.vocabulary())
+        self.assertEqual(result['new'], 5)
+        self.assertTrue(set(kept) <= set(self.kept_ids()))
+
+if __name__ == '__main__':
+    unittest.main()
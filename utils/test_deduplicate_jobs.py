@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import random
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from utils.deduplicate_jobs import (deduplicate_jobs_by_description, minhash_signatures, lsh_band_keys,
+                                    lsh_candidate_pairs, similar_pairs_exact, DedupPool)
+
+STOP_WORDS = ['the', 'and', 'of', 'to', 'in', 'a', 'with', 'for']
+
+def make_jobs(n_unique=30, seed=0):
+    """Random English-like postings, some reposted with a small edit on a later day."""
+    rng = random.Random(seed)
+    vocabulary = [f"skill{i}" for i in range(400)]
+    jobs = []
+    for k in range(n_unique):
+        words = rng.sample(vocabulary, 60)
+        description = ' '.join(words)
+        jobs.append({'ID': f'job{k}', 'Description': description, 'Scraped': '2025-05-02'})
+        if k % 3 == 0:
+            edited = ' '.join(words[:-1] + ['extra'])
+            jobs.append({'ID': f'job{k}-repost', 'Description': edited, 'Scraped': '2025-05-01'})
+    return jobs
+
+class TestDeduplicateJobs(unittest.TestCase):
+    def setUp(self):
+        patcher_sw = patch('utils.deduplicate_jobs.stopwords', new=MagicMock(**{'words.return_value': STOP_WORDS}))
+        patcher_lang = patch('utils.deduplicate_jobs.detect_language', new=lambda text: 'en')
+        patcher_sw.start()
+        patcher_lang.start()
+        self.addCleanup(patcher_sw.stop)
+        self.addCleanup(patcher_lang.stop)
+
+    def kept_ids(self, jobs, **kwargs):
+        return sorted(job['ID'] for job in deduplicate_jobs_by_description(jobs, **kwargs))
+
+    def test_keeps_earliest_scraped(self):
+        kept = self.kept_ids(make_jobs())
+        
+        self.assertEqual(len(kept), 30)
+        self.assertIn('job0-repost', kept)
+        self.assertNotIn('job0', kept)
+        self.assertIn('job1', kept)
+
+    def test_minhash_matches_exact(self):
+        jobs = make_jobs(n_unique=60, seed=1)
+        
+        self.assertEqual(self.kept_ids(jobs, method='minhash'), self.kept_ids(jobs, method='exact'))
+
+    def test_clusters_are_transitive(self):
+        # Each posting is close to the next one but the first and the last are not
+        words = [f"skill{i}" for i in range(100)]
+        jobs = [
+            {'ID': f'job{k}', 'Description': ' '.join(words[k * 4:] + [f"new{i}" for i in range(k * 4)]),
+             'Scraped': f'2025-05-0{k + 1}'}
+            for k in range(3)
+        ]
+
+        self.assertEqual(self.kept_ids(jobs, similarity_threshold=0.9, method='exact'), ['job0'])
+
+    def test_exact_pairs_by_blocks(self):
+        texts = [job['Description'] for job in make_jobs(n_unique=40, seed=2)]
+        tfidf_matrix = TfidfVectorizer().fit_transform(texts)
+        rows_i, rows_j = similar_pairs_exact(tfidf_matrix, 0.92)
+        chunked_i, chunked_j = similar_pairs_exact(tfidf_matrix, 0.92, chunk_size=7)
+
+        self.assertEqual(len(rows_i), 14)
+        self.assertEqual(list(zip(rows_i, rows_j)), list(zip(chunked_i, chunked_j)))
+        self.assertTrue((rows_i < rows_j).all())
+
+    def test_pool_matches_single_process(self):
+        texts = [job['Description'] for job in make_jobs(n_unique=40, seed=3)]
+        with DedupPool(n_jobs=2, chunk_size=7) as pool:
+            vectorizer, tfidf_matrix = pool.tfidf(texts, STOP_WORDS)
+            minhash_pairs = pool.similar_pairs_minhash(texts, tfidf_matrix, STOP_WORDS, 0.92)
+            exact_pairs = pool.similar_pairs_exact(tfidf_matrix, 0.92)
+
+        expected_vectorizer = TfidfVectorizer(stop_words=STOP_WORDS)
+        expected_matrix = expected_vectorizer.fit_transform(texts)
+        self.assertEqual(vectorizer.vocabulary_, expected_vectorizer.vocabulary_)
+        self.assertAlmostEqual(abs(tfidf_matrix - expected_matrix).max(), 0)
+        self.assertAlmostEqual(abs(vectorizer.transform(texts) - expected_matrix).max(), 0)
+
+        expected = similar_pairs_exact(expected_matrix, 0.92)
+        for rows_i, rows_j in (minhash_pairs, exact_pairs):
+            self.assertEqual(list(zip(rows_i, rows_j)), list(zip(*expected)))
+
+    def test_parallel_deduplication(self):
+        jobs = make_jobs(n_unique=60, seed=1)
+        self.assertEqual(self.kept_ids(jobs, n_jobs=2), self.kept_ids(jobs))
+
+    def test_lsh_candidates(self):
+        texts = ['alpha beta gamma delta epsilon', 'alpha beta gamma delta epsilon', 'zeta eta theta iota kappa', '']
+        signatures, mask = minhash_signatures(texts, STOP_WORDS)
+        rows_i, rows_j = lsh_candidate_pairs(lsh_band_keys(signatures), mask)
+        
+        self.assertEqual(list(zip(rows_i, rows_j)), [(0, 1)])
+        self.assertFalse(mask[3])
+
+    def test_missing_columns(self):
+        with self.assertRaises(ValueError):
+            deduplicate_jobs_by_description(pd.DataFrame([{'Description': 'x'}]))
+
+if __name__ == '__main__':
+    unittest.main()
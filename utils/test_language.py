@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from sqlalchemy import create_engine
+from utils import language
+from utils.language import LanguageCache, detect_language, description_hash
+from utils.deduplicate_jobs import job_languages
+
+FRENCH = "Nous recherchons un comptable expérimenté pour rejoindre notre équipe à Tunis."
+ENGLISH = "We are looking for an experienced accountant to join our team in Tunis."
+
+class TestDetectLanguage(unittest.TestCase):
+    def test_detects_languages(self):
+        self.assertEqual(detect_language(FRENCH), 'fr')
+        self.assertEqual(detect_language(ENGLISH), 'en')
+        self.assertEqual(detect_language("   "), 'unknown')
+
+    def test_deterministic(self):
+        text = "Python SQL Excel Tunis"
+        self.assertEqual({detect_language(text) for _ in range(10)}, {detect_language(text)})
+
+    def test_classifies_prefix(self):
+        seen = []
+        detect_language(ENGLISH * 100, backend=lambda text: seen.append(text) or 'en', prefix_chars=50)
+        self.assertEqual(seen, [ENGLISH[:50]])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            language.get_backend('nope')
+
+class TestLanguageCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        self.calls = []
+        backend = lambda text: self.calls.append(text) or ('fr' if 'Nous' in text else 'en')
+        patcher = patch.dict(language.BACKENDS, {'test': backend})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_detects_each_description_once(self):
+        cache = LanguageCache(self.engine, backend='test')
+        self.assertEqual(cache.languages([FRENCH, ENGLISH, FRENCH]), ['fr', 'en', 'fr'])
+        self.assertEqual(len(self.calls), 2)
+
+        # A later run reads the database
+        self.assertEqual(LanguageCache(self.engine, backend='test').languages([ENGLISH]), ['en'])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_job_languages_prefers_stored_column(self):
+        df = pd.DataFrame({'Description': [FRENCH, ENGLISH], 'Language': ['fr', None]})
+        self.assertEqual(job_languages(df).tolist(), ['fr', 'en'])
+        self.assertEqual(description_hash(None), description_hash(""))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from utils.bulk_load import upsert_bulk
+from utils.db_utils import save_to_db_non_dupe
+from utils.processing_state import count_pending, pending_batches
+from utils.schema import conform, migrate
+
+class TestProcessingState(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        migrate(self.engine)
+        self.postings = pd.DataFrame({
+            'ID': [f'job{i}' for i in range(5)],
+            'Description': [f'Description {i}' for i in range(5)],
+            'DescriptionHash': [f'hash{i}' for i in range(5)],
+            'Scraped': ['2025-05-01'] * 5,
+        })
+        save_to_db_non_dupe(self.postings.to_dict('records'), self.engine)
+
+    def process(self, postings):
+        with self.engine.begin() as conn:
+            merged = conform(postings.assign(job_category='IT'), conn, 'merged_data_processed')
+            upsert_bulk(merged, 'merged_data_processed', conn)
+
+    def pending_ids(self, **kwargs):
+        return [job_id for batch in pending_batches(self.engine, **kwargs) for job_id in batch['ID']]
+
+    def test_only_unprocessed_postings_are_pending(self):
+        self.assertEqual(self.pending_ids(batch_size=2), [f'job{i}' for i in range(5)])
+
+        self.process(self.postings.iloc[:3])
+        self.assertEqual(self.pending_ids(batch_size=2), ['job3', 'job4'])
+        self.assertEqual(count_pending(self.engine), 2)
+
+    def test_changed_postings_are_pending_again(self):
+        self.process(self.postings)
+        changed = self.postings.iloc[[1]].assign(Description='New description', DescriptionHash='new')
+        save_to_db_non_dupe(changed.to_dict('records'), self.engine)
+
+        self.assertEqual(self.pending_ids(), ['job1'])
+
+    def test_reprocess_selects_everything(self):
+        self.process(self.postings)
+        self.assertEqual(self.pending_ids(), [])
+        self.assertEqual(len(self.pending_ids(reprocess=True, batch_size=3)), 5)
+
+    def test_results_written_between_batches(self):
+        for batch in pending_batches(self.engine, batch_size=2):
+            self.process(batch)
+        self.assertEqual(count_pending(self.engine), 0)
+
+if __name__ == '__main__':
+    unittest.main()
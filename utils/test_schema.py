@@ -0,0 +1,71 @@
+import re
+import unittest
+import pandas as pd
+from datetime import date
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.dialects import postgresql
+from LLM.analysis_schema import _number_value
+from utils.db_utils import save_to_db
+from utils.schema import migrate, conform, build_metadata, MIGRATIONS, _cast, _months_between
+
+class TestSchema(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+
+    def test_creates_tables(self):
+        self.assertEqual(migrate(self.engine), [version for version, _, _ in MIGRATIONS])
+        self.assertEqual(migrate(self.engine), [])
+
+        inspector = inspect(self.engine)
+        self.assertEqual(inspector.get_pk_constraint('job_postings')['constrained_columns'], ['ID'])
+        self.assertEqual(inspector.get_pk_constraint('merged_data_processed')['constrained_columns'], ['ID'])
+        indexed = {tuple(index['column_names']) for index in inspector.get_indexes('job_postings')}
+        self.assertTrue({('Source',), ('Major',), ('Published',), ('Scraped',)} <= indexed)
+
+        save_to_db([{'JobTitle': 'Job', 'Description': 'Description', 'URL': 'https://www.keejob.com/job/1'}],
+                   self.engine)
+        save_to_db([{'JobTitle': 'Job 2', 'Description': 'Description', 'URL': 'https://www.keejob.com/job/1'}],
+                   self.engine)
+        df = pd.read_sql_table('job_postings', self.engine)
+        self.assertEqual(df['JobTitle'].tolist(), ['Job 2'])
+
+    def test_converts_tables_created_by_to_sql(self):
+        pd.DataFrame([
+            {'ID': 'a', 'JobTitle': 'Repost', 'Scraped': '2025-05-02'},
+            {'ID': 'a', 'JobTitle': 'First', 'Scraped': '2025-05-01'},
+            {'ID': 'b', 'JobTitle': 'Other', 'Scraped': '2025-05-01'},
+        ]).to_sql('job_postings', self.engine, index=False)
+
+        migrate(self.engine)
+
+        df = pd.read_sql('SELECT "ID", "JobTitle" FROM job_postings ORDER BY "ID"', self.engine)
+        self.assertEqual(df.values.tolist(), [['a', 'First'], ['b', 'Other']])
+        self.assertEqual(inspect(self.engine).get_pk_constraint('job_postings')['constrained_columns'], ['ID'])
+        self.assertFalse(inspect(self.engine).has_table('job_postings_legacy'))
+
+    def test_months_between(self):
+        # The partitions created before converting a partitioned job_postings
+        self.assertEqual(_months_between(date(2024, 11, 20), date(2025, 1, 3)),
+                         [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1)])
+        self.assertEqual(_months_between(None, None), [])
+
+    def test_cast_keeps_first_number(self):
+        # The PostgreSQL conversion of years_of_experience reads the number _number_value reads
+        column = build_metadata().tables['merged_data_processed'].c.years_of_experience
+        cast = _cast(column, postgresql.dialect())
+        pattern = re.search(r"from '([^']+)'", cast).group(1)
+        for value in ['3', '3-5 years', '2 à 3 ans', '1,5 an', 'null']:
+            match = re.search(pattern, value)
+            self.assertEqual(float(match.group().replace(',', '.')) if match else None, _number_value(value))
+
+    def test_conform(self):
+        df = pd.DataFrame([{'ID': 'a', 'technical_skills': ['Python', 'SQL'], 'years_of_experience': '3',
+                            'unexpected': 1}])
+        with self.engine.connect() as conn:
+            conformed = conform(df, conn, 'merged_data_processed')
+        self.assertNotIn('unexpected', conformed.columns)
+        self.assertEqual(conformed['technical_skills'][0], '["Python", "SQL"]')
+        self.assertEqual(conformed['years_of_experience'][0], 3.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from utils.text_utils import (GAP, collapse_near_duplicates, estimate_tokens, prepare_description,
+                              prepare_descriptions, remove_extra_spaces, split_segments)
+
+REQUIREMENTS = "Profil recherché: Diplôme Bac+5 en informatique. Expérience de 3 ans en Python."
+
+def long_description(n_missions=80):
+    missions = " ".join(f"Mission {i}: piloter le lot {i} avec l'équipe {i * 7} et le client {i * 13}."
+                        for i in range(n_missions))
+    return f"Entreprise industrielle à Sfax. {missions}\n{REQUIREMENTS} Contact: rh@example.com."
+
+class TestTextUtils(unittest.TestCase):
+    def test_remove_extra_spaces(self):
+        self.assertEqual(remove_extra_spaces("  a   b \n\n c "), "a b c")
+        self.assertIsNone(remove_extra_spaces(None))
+
+    def test_strips_boilerplate(self):
+        text = "Description de l'annonce: Comptable confirmé. Postuler maintenant Partager cette offre"
+        self.assertEqual(prepare_description(text), "Comptable confirmé.")
+
+    def test_collapses_near_duplicates(self):
+        segments = split_segments("Nous recrutons un développeur Python confirmé à Tunis. "
+                                  "Maîtrise de Django. Nous recrutons un développeur Python confirmé basé à Tunis. "
+                                  "Maîtrise de Django.")
+        self.assertEqual(collapse_near_duplicates(segments),
+                         ["Nous recrutons un développeur Python confirmé à Tunis.", "Maîtrise de Django."])
+
+    def test_truncates_keeping_requirements(self):
+        text = long_description()
+        prepared = prepare_description(text, max_tokens=200)
+        self.assertLessEqual(estimate_tokens(prepared), 220)
+        self.assertTrue(prepared.startswith("Entreprise industrielle à Sfax."))
+        self.assertIn(REQUIREMENTS, prepared)
+        self.assertIn(GAP.strip(), prepared)
+
+    def test_short_descriptions_are_kept(self):
+        text = f"Entreprise à Tunis. {REQUIREMENTS}"
+        self.assertEqual(prepare_description(text, max_tokens=200), text)
+        self.assertEqual(prepare_description(long_description(), max_tokens=0).count("Mission"), 80)
+
+    def test_oversized_single_segment(self):
+        prepared = prepare_description("x" * 10000, max_tokens=100)
+        self.assertLess(len(prepared), 500)
+
+    def test_reports_tokens_saved(self):
+        prepared, stats = prepare_descriptions([long_description(), ""], max_tokens=200)
+        self.assertEqual(prepared[1], "")
+        self.assertEqual(stats['tokens_saved'], stats['tokens_before'] - stats['tokens_after'])
+        self.assertGreater(stats['tokens_saved'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,132 @@
 # utils/text_utils.py
 import re
 
+from config.config import LLM_DESCRIPTION_TOKENS
+
 def remove_extra_spaces(text):
     """Remove extra spaces from text."""
     if text:
         return re.sub(r'\s{2,}', ' ', text.strip())
     return None
+
+def estimate_tokens(text):
+    """Rough token count of a text (about 4 characters per token)."""
+    return len(text or "") // 4 + 1
+
+# Site boilerplate (apply, share and report links, page labels) found in scraped descriptions
+BOILERPLATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"\bpostuler( maintenant| à cette offre| en ligne)?\b",
+    r"\b(partager|signaler|imprimer|sauvegarder) (cette|l')\s?(offre|annonce)\b",
+    r"\bvoir (toutes )?les offres( similaires| de (cette|l')\s?entreprise)?\b",
+    r"\benvoyer (à|a) un ami\b",
+    r"\b(apply now|share this job|report this (job|offer)|save this job)\b",
+    r"\bdescription de l'(annonce|offre)\s*:?",
+    r"\b(annonce|offre) (publiée|mise à jour) (le|il y a) [^.\n]*",
+    r"\b(trouvé|vu) sur (keejob|optioncarriere)[^.\n]*",
+)]
+
+# Headers and keywords of the sections describing the required profile, kept first when shortening
+REQUIREMENT_PATTERN = re.compile(
+    r"\b(profil|exigences?|pr[ée]requis|comp[ée]tences?|qualifications?|requirements?|skills?|"
+    r"dipl[ôo]me|formation|bac ?\+ ?\d|exp[ée]rience|ma[îi]trise|connaissances?|langues?|"
+    r"vous (avez|êtes|disposez)|you (have|are|will)|must have|required|degree)\b",
+    re.IGNORECASE,
+)
+
+_SEGMENT_BOUNDARY = re.compile(r'\n+|(?<=[.!?;:])\s+(?=[A-ZÀ-ÖØ-Þ•\-\d])')
+_WORD = re.compile(r'\w+')
+GAP = ' [...] '
+
+def split_segments(text):
+    """Split a description into lines and sentences."""
+    return [segment.strip() for segment in _SEGMENT_BOUNDARY.split(text or "") if segment.strip()]
+
+def strip_boilerplate(segment):
+    for pattern in BOILERPLATE_PATTERNS:
+        segment = pattern.sub(' ', segment)
+    return re.sub(r'\s{2,}', ' ', segment).strip(' -|•').lstrip(': ')
+
+def _near_duplicate(words, seen, threshold):
+    for other in seen:
+        if len(words & other) / len(words | other) >= threshold:
+            return True
+    return False
+
+def collapse_near_duplicates(segments, threshold=0.8):
+    """Drop the segments repeating an earlier one (same words, or a Jaccard similarity of `threshold`)."""
+    kept, seen = [], []
+    for segment in segments:
+        words = set(_WORD.findall(segment.lower()))
+        if not words:
+            continue
+        if words in seen or (len(words) >= 5 and _near_duplicate(words, seen, threshold)):
+            continue
+        seen.append(words)
+        kept.append(segment)
+    return kept
+
+def truncate_segments(segments, max_tokens, head_share=0.3):
+    """Keep segments within an estimated `max_tokens` budget, marking the gaps with GAP.
+
+    The segments are chosen by priority: the head of the description up to
+    `head_share` of the budget, then the requirement segments, then the tail,
+    then the rest of the head. A text that is one oversized segment keeps its
+    first and last characters.
+    """
+    costs = [estimate_tokens(segment) for segment in segments]
+    if sum(costs) <= max_tokens:
+        return ' '.join(segments)
+
+    head = []
+    used = 0
+    for index, cost in enumerate(costs):
+        if used + cost > max_tokens * head_share:
+            break
+        head.append(index)
+        used += cost
+    requirements = [index for index, segment in enumerate(segments) if REQUIREMENT_PATTERN.search(segment)]
+    tail = list(range(len(segments) - 1, -1, -1))
+
+    selected, used = set(), 0
+    for index in head + requirements + tail:
+        if index not in selected and used + costs[index] <= max_tokens:
+            selected.add(index)
+            used += costs[index]
+    if not selected:
+        text = ' '.join(segments)
+        chars = max_tokens * 4
+        return text[:int(chars * 0.7)] + GAP + text[-int(chars * 0.3):]
+
+    parts, previous = [], -1
+    for index in sorted(selected):
+        if index != previous + 1:
+            parts.append(GAP.strip())
+        parts.append(segments[index])
+        previous = index
+    if previous != len(segments) - 1:
+        parts.append(GAP.strip())
+    return ' '.join(parts)
+
+def prepare_description(text, max_tokens=LLM_DESCRIPTION_TOKENS):
+    """Clean a job description for LLM analysis.
+
+    Strips site boilerplate, drops near-duplicate lines and sentences, and
+    shortens the text to `max_tokens` estimated tokens (0 for no limit), keeping
+    the requirement sections.
+    """
+    segments = [strip_boilerplate(segment) for segment in split_segments(text)]
+    segments = collapse_near_duplicates([segment for segment in segments if segment])
+    if max_tokens:
+        return truncate_segments(segments, max_tokens)
+    return ' '.join(segments)
+
+def prepare_descriptions(descriptions, max_tokens=LLM_DESCRIPTION_TOKENS):
+    """Prepare descriptions with `prepare_description`.
+
+    Returns the prepared descriptions and a dict with the estimated tokens
+    before, after and saved.
+    """
+    prepared = [prepare_description(text, max_tokens) for text in descriptions]
+    before = sum(estimate_tokens(text) for text in descriptions)
+    after = sum(estimate_tokens(text) for text in prepared)
+    return prepared, {'tokens_before': before, 'tokens_after': after, 'tokens_saved': before - after}